@@ -1,9 +1,11 @@
 # __init__.py
 
 from flask import Flask
-import json
 import os
 from app.routes import main
+from app.storage import get_store
+from app.commands import register_commands
+from app import sessions
 
 def create_app():
     app = Flask(__name__)
@@ -12,28 +14,60 @@ def create_app():
     # Path to JSON data folder
     app.config['DATA_PATH'] = os.path.join(os.path.dirname(__file__), 'data')
 
+    # Storage backend: 'log' journals transaction writes, 'json' rewrites whole files,
+    # 'sqlite' / 'mysql' keep the data in an indexed database (import it with `flask migrate-data`)
+    app.config['STORAGE_BACKEND'] = 'log'
+    app.config['LOG_COMPACT_THRESHOLD'] = 1000  # journal entries before folding into the snapshot
+    # On-disk format of the data files: 'json' (compact), 'orjson' (same files, faster codec)
+    # or 'msgpack'; files in any of them are read. `flask export-data DIR` writes indented JSON.
+    app.config['DATA_FORMAT'] = 'json'
+    app.config['FSYNC_WRITES'] = False  # fsync every data file write (durable across power loss, slower)
+    app.config['SQLITE_DATABASE'] = None  # defaults to DATA_PATH/budget.db
+    app.config['MYSQL_CONNECTION'] = {'host': 'localhost', 'user': 'root', 'password': '', 'database': 'budget_planner'}
+    app.config['MYSQL_POOL_SIZE'] = 5  # connections per worker process; match the worker's thread count
+
+    # Recent activity: rows on the dashboard, and the largest page /api/recent-activity serves
+    app.config['RECENT_TRANSACTIONS_LIMIT'] = 5
+    app.config['RECENT_ACTIVITY_MAX_LIMIT'] = 100
+    # Expenses/income listings: rows per page, and the largest page /api/expenses and /api/income serve
+    app.config['TRANSACTIONS_PAGE_SIZE'] = 50
+    app.config['TRANSACTIONS_PAGE_MAX'] = 500
+    app.config['IMPORT_ERRORS_SHOWN'] = 20  # invalid rows listed when a bulk import is rejected
+
+    # bcrypt cost for new hashes (older hashes are upgraded at the next login), and the
+    # worker processes that hash/verify passwords off the request threads (0 = inline)
+    app.config['BCRYPT_ROUNDS'] = 12
+    app.config['PASSWORD_HASH_WORKERS'] = 2
+    # Where sessions live: 'files' (DATA_PATH/sessions, shared by worker processes), 'memory'
+    # (this process only), 'cookie' (Flask's signed cookie) or a backend object with get/set/delete
+    app.config['SESSION_BACKEND'] = 'files'
+    app.config['SESSION_SWEEP_INTERVAL'] = 3600  # seconds between removals of expired session files
+    # Cache-Control of the ETag-validated JSON endpoints: per user, always revalidated (cheap 304s)
+    app.config['API_CACHE_CONTROL'] = 'private, no-cache'
+    # Rendered dashboard/expenses/income/budgets pages kept per process (LRU; 0 disables)
+    app.config['PAGE_CACHE_MAX_BYTES'] = 32 * 1024 * 1024
+
     # Ensure data folder exists
     if not os.path.exists(app.config['DATA_PATH']):
         os.makedirs(app.config['DATA_PATH'])
 
-    # Helper function to load JSON files
+    # Helper function to load JSON files (served from the shared in-memory store)
     def load_json(filename):
-        file_path = os.path.join(app.config['DATA_PATH'], filename)
-        if os.path.exists(file_path):
-            with open(file_path, 'r') as file:
-                return json.load(file)
-        return []
+        return get_store(app.config['DATA_PATH'], app.config).load(filename)
 
-    # Helper function to save JSON files
+    # Helper function to save JSON files (atomic replace under the store's write lock)
     def save_json(filename, data):
-        file_path = os.path.join(app.config['DATA_PATH'], filename)
-        with open(file_path, 'w') as file:
-            json.dump(data, file, indent=4)
+        get_store(app.config['DATA_PATH'], app.config).save(filename, data)
 
     # Attach helper functions to app context
     app.load_json = load_json
     app.save_json = save_json
 
+    interface = sessions.session_interface(app.config['SESSION_BACKEND'])
+    if interface is not None:
+        app.session_interface = interface
+
     app.register_blueprint(main)
+    register_commands(app)
     return app
 
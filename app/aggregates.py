@@ -0,0 +1,126 @@
+from datetime import date, timedelta
+
+
+# -------------------- RUNNING TOTALS --------------------
+# aggregates.json keeps, for every user and transaction type, the overall
+# total, the total per category, the per-category totals per month and the
+# total per day over the last DAY_WINDOW days (what the day and week charts
+# are bucketed from; older days are dropped, so the table stays bounded):
+#
+#   {"version": 4, "count": 13, "users": {"1": {"expense": {
+#       "total": 750.0,
+#       "categories": {"6": 250.0, "7": 500.0},
+#       "months": {"2025-07": {"6": 250.0, "7": 500.0}},
+#       "days": {"2025-07-01": 250.0, "2025-07-02": 500.0}}}}}
+#
+# Keys are strings because the table is stored as JSON. "count" is the number
+# of transactions folded in and is used to spot a table that has drifted;
+# "version" changes whenever the layout does, so older tables get rebuilt.
+VERSION = 4
+DAY_WINDOW = 400  # days kept in the per-day rollup
+
+
+def day_cutoff():
+    """First day ("YYYY-MM-DD") the per-day rollup covers."""
+    return (date.today() - timedelta(days=DAY_WINDOW)).isoformat()
+
+
+def empty_aggregates():
+    return {"version": VERSION, "count": 0, "users": {}}
+
+
+def _bump(bucket, key, amount):
+    value = round(bucket.get(key, 0) + amount, 2)
+    if value:
+        bucket[key] = value
+    else:
+        bucket.pop(key, None)
+
+
+def apply_transaction(aggregates, t, sign=1):
+    """Fold one transaction into the table (``sign=-1`` takes it back out).
+
+    Returns the change as a journal entry (see apply_entry), so stores can
+    persist it without rewriting the table.
+    """
+    amount = sign * float(t["amount"])
+    category = str(int(t["category_id"]))
+    day = str(t.get("transaction_date") or "")[:10]
+    month = day[:7]
+
+    user = aggregates["users"].setdefault(str(int(t["user_id"])), {})
+    totals = user.setdefault(t["type"], {"total": 0.0, "categories": {}, "months": {}, "days": {}})
+    totals["total"] = round(totals["total"] + amount, 2)
+    _bump(totals["categories"], category, amount)
+    _bump(totals["months"].setdefault(month, {}), category, amount)
+    if not totals["months"][month]:
+        del totals["months"][month]
+    cutoff = day_cutoff()
+    if day >= cutoff:
+        days = totals["days"]
+        if day not in days:
+            for stale in [d for d in days if d < cutoff]:  # ✅ Aged out of the window
+                del days[stale]
+        _bump(days, day, amount)
+
+    aggregates["count"] += sign
+    return {"sign": sign, "row": {k: t[k] for k in ENTRY_FIELDS}}
+
+
+ENTRY_FIELDS = ("user_id", "category_id", "type", "amount", "transaction_date")
+
+
+def apply_entry(aggregates, entry):
+    """Replay a journal entry made by apply_transaction."""
+    apply_transaction(aggregates, entry["row"], entry["sign"])
+
+
+def build_aggregates(transactions):
+    aggregates = empty_aggregates()
+    for t in transactions:
+        apply_transaction(aggregates, t)
+    return aggregates
+
+
+def is_current(aggregates, transactions):
+    """Cheap drift check: the table must exist, have the current layout and cover every transaction."""
+    return (
+        isinstance(aggregates, dict)
+        and aggregates.get("version") == VERSION
+        and aggregates.get("count") == len(transactions)
+    )
+
+
+def _type_totals(aggregates, user_id, t_type):
+    return aggregates["users"].get(str(int(user_id)), {}).get(t_type)
+
+
+def total(aggregates, user_id, t_type):
+    totals = _type_totals(aggregates, user_id, t_type)
+    return totals["total"] if totals else 0.0
+
+
+def category_totals(aggregates, user_id, t_type, month=None):
+    """{category_id: total} for one user and type, optionally for one "YYYY-MM" month."""
+    totals = _type_totals(aggregates, user_id, t_type)
+    if not totals:
+        return {}
+    bucket = totals["months"].get(month, {}) if month else totals["categories"]
+    return {int(category_id): amount for category_id, amount in bucket.items()}
+
+
+def monthly_totals(aggregates, user_id, t_type):
+    """{"YYYY-MM": total} for one user and type."""
+    totals = _type_totals(aggregates, user_id, t_type)
+    if not totals:
+        return {}
+    return {month: round(sum(bucket.values()), 2) for month, bucket in totals["months"].items()}
+
+
+def daily_totals(aggregates, user_id, t_type):
+    """{"YYYY-MM-DD": total} for one user and type, for the days from day_cutoff() on."""
+    totals = _type_totals(aggregates, user_id, t_type)
+    if not totals:
+        return {}
+    cutoff = day_cutoff()
+    return {day: amount for day, amount in totals["days"].items() if day >= cutoff}
@@ -0,0 +1,77 @@
+import io
+import csv
+import json
+import os
+
+
+# -------------------- BULK FORMATS --------------------
+# Transactions move in and out in bulk as CSV (with a header row) or JSON
+# Lines (one object per line). Both are read and written one record at a
+# time, so a file never has to fit in memory as a whole.
+FORMATS = ('csv', 'jsonl')
+EXTENSIONS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'jsonl'}
+MIMETYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+CHUNK_SIZE = 64 * 1024  # characters buffered per yielded piece of an export
+
+
+def detect_format(filename, fmt=None):
+    """``fmt`` if given, else the format implied by ``filename``'s extension."""
+    fmt = fmt or EXTENSIONS.get(os.path.splitext(filename or '')[1].lower())
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown import format for {filename!r}; use one of: {', '.join(FORMATS)}")
+    return fmt
+
+
+def text_stream(binary):
+    """Decode an uploaded (binary) file lazily; tolerates a UTF-8 byte order mark."""
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+
+def read_records(stream, fmt):
+    """Yield one dict per record of a text stream in ``fmt``.
+
+    Blank JSON Lines are skipped; a malformed line (in either format) raises
+    ValueError naming it.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        try:
+            yield from reader
+        except csv.Error as e:
+            raise ValueError(f"Line {reader.line_num}: {e}")
+        return
+    for n, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            raise ValueError(f"Line {n}: not valid JSON")
+        if not isinstance(record, dict):
+            raise ValueError(f"Line {n}: expected a JSON object")
+        yield record
+
+
+def write_records(records, fmt, fields):
+    """Yield ``records`` as text in ``fmt``: a CSV header and one row per record,
+    or one JSON object per line. Only ``fields`` are written, in that order.
+
+    Output is yielded in pieces of about CHUNK_SIZE characters, so memory
+    stays constant however many records there are.
+    """
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.DictWriter(buffer, fields, extrasaction='ignore')
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        write = lambda record: buffer.write(json.dumps({f: record.get(f) for f in fields}) + '\n')
+
+    for record in records:
+        write(record)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
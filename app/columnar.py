@@ -0,0 +1,131 @@
+import threading
+from datetime import date, timedelta
+from app.indexes import cached_view, peek_view
+
+try:
+    import numpy as np
+except ImportError:  # optional: reports fall back to plain Python loops
+    np = None
+
+
+# -------------------- COLUMNAR TRANSACTIONS --------------------
+TYPE_CODES = {"expense": 0, "income": 1}
+COLUMNS = (
+    ("user_id", "i8"),
+    ("category_id", "i8"),
+    ("type_code", "i1"),
+    ("amount", "f8"),
+    ("day", "i4"),  # days since 1970-01-01
+)
+EPOCH = date(1970, 1, 1)
+
+
+def available():
+    return np is not None
+
+
+def epoch_day(value):
+    """Days since 1970-01-01 of a "YYYY-MM-DD[ HH:MM:SS]" date."""
+    return (date.fromisoformat(str(value)[:10]) - EPOCH).days
+
+
+def _group_sum(keys, amounts):
+    """(unique keys, summed amounts) of a vectorized group-by."""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return unique, np.bincount(inverse, weights=amounts, minlength=len(unique))
+
+
+class TransactionTable:
+    """Transactions as NumPy columns, for vectorized totals.
+
+    The table follows its source list: rows appended to it are picked up on
+    the next query, and writers that change or remove rows call
+    ``invalidate()`` so the columns are rebuilt on next use. Columns keep
+    spare capacity so appends do not copy the whole table.
+    """
+
+    def __init__(self, transactions):
+        self._source = transactions
+        self._lock = threading.Lock()
+        self._stale = True
+        self._arrays = {}
+        self.size = 0
+
+    def invalidate(self):
+        self._stale = True
+
+    @staticmethod
+    def _extract(rows):
+        n = len(rows)
+        return {
+            "user_id": np.fromiter((int(t["user_id"]) for t in rows), "i8", n),
+            "category_id": np.fromiter((int(t["category_id"]) for t in rows), "i8", n),
+            "type_code": np.fromiter((TYPE_CODES.get(t["type"], -1) for t in rows), "i1", n),
+            "amount": np.fromiter((float(t["amount"]) for t in rows), "f8", n),
+            "day": np.fromiter((epoch_day(t["transaction_date"]) for t in rows), "i4", n),
+        }
+
+    def columns(self):
+        """{column name: array} over the current rows."""
+        with self._lock:
+            n = len(self._source)
+            if self._stale or n < self.size:
+                self._stale = False
+                self._arrays = self._extract(self._source)
+                self.size = n
+            elif n > self.size:
+                tail = self._extract(self._source[self.size:n])
+                capacity = len(self._arrays["amount"])
+                if n > capacity:
+                    grown = max(n, 2 * capacity)
+                    for name, dtype in COLUMNS:
+                        array = np.empty(grown, dtype)
+                        array[:self.size] = self._arrays[name][:self.size]
+                        self._arrays[name] = array
+                for name, _ in COLUMNS:
+                    self._arrays[name][self.size:n] = tail[name]
+                self.size = n
+            return {name: array[:self.size] for name, array in self._arrays.items()}
+
+    def _select(self, t_type, user_id=None, start=None, end=None):
+        """Columns plus the mask of rows of one type (and user, and date range)."""
+        columns = self.columns()
+        mask = columns["type_code"] == TYPE_CODES.get(t_type, -2)
+        if user_id is not None:
+            mask &= columns["user_id"] == int(user_id)
+        if start is not None:
+            mask &= columns["day"] >= (start - EPOCH).days
+        if end is not None:
+            mask &= columns["day"] <= (end - EPOCH).days
+        return columns, mask
+
+    # ---------- totals ----------
+    def category_totals(self, t_type, user_id=None):
+        """{category_id: total} for one type, for one user or everyone."""
+        columns, mask = self._select(t_type, user_id)
+        keys, sums = _group_sum(columns["category_id"][mask], columns["amount"][mask])
+        return {int(k): round(float(s), 2) for k, s in zip(keys, sums)}
+
+    def daily_totals(self, t_type, user_id=None, start=None, end=None):
+        """[("YYYY-MM-DD", total)] in date order, optionally within [start, end]."""
+        columns, mask = self._select(t_type, user_id, start, end)
+        keys, sums = _group_sum(columns["day"][mask], columns["amount"][mask])
+        return [((EPOCH + timedelta(days=int(k))).isoformat(), round(float(s), 2)) for k, s in zip(keys, sums)]
+
+    def monthly_totals(self, t_type, user_id=None, start=None, end=None):
+        """[("YYYY-MM", total)] in date order, optionally within [start, end]."""
+        columns, mask = self._select(t_type, user_id, start, end)
+        months = columns["day"][mask].astype("datetime64[D]").astype("datetime64[M]").astype("i8")
+        keys, sums = _group_sum(months, columns["amount"][mask])
+        return [(f"{1970 + k // 12:04d}-{k % 12 + 1:02d}", round(float(s), 2)) for k, s in zip(keys.tolist(), sums)]
+
+
+def transaction_table(transactions):
+    return cached_view("transaction_table", transactions, TransactionTable)
+
+
+def invalidate(transactions):
+    """Mark the table over ``transactions`` (if one was built) for a rebuild."""
+    table = peek_view("transaction_table", transactions)
+    if table is not None:
+        table.invalidate()
@@ -0,0 +1,84 @@
+import os
+import click
+from flask import current_app
+from app import bulk, models
+from app.storage import LogStore, get_store
+
+
+DATA_FILES = ('users.json', 'categories.json', 'transactions.json', 'budgets.json')
+
+
+# -------------------- CLI COMMANDS --------------------
+def register_commands(app):
+    """Attach the maintenance commands (run with ``flask --app run <command>``)."""
+
+    @app.cli.command('rebuild-aggregates')
+    def rebuild_aggregates():
+        """Recompute aggregates.json from transactions.json."""
+        aggregates = models.rebuild_aggregates()
+        click.echo(f"Rebuilt running totals for {aggregates['count']} transactions.")
+
+    @app.cli.command('migrate-dates')
+    def migrate_dates():
+        """Rewrite legacy 'YYYY-MM-DD' transaction dates as 'YYYY-MM-DD HH:MM:SS'."""
+        count = models.migrate_transaction_dates()
+        click.echo(f"Migrated {count} transaction dates.")
+
+    @app.cli.command('renumber-ids')
+    def renumber_ids():
+        """Give transactions and budgets that share an id a fresh one."""
+        for filename, count in models.renumber_duplicate_ids().items():
+            click.echo(f"{filename}: {count} rows renumbered.")
+
+    @app.cli.command('compact-data')
+    def compact_data():
+        """Fold the transaction journal into transactions.json and rewrite
+        the data files in the configured DATA_FORMAT."""
+        store = get_store()
+        store.compact()
+        click.echo("Journals compacted.")
+        if store.supports_sql:
+            return
+        with store.transaction():
+            for filename in DATA_FILES:
+                if os.path.exists(store.path(filename)):
+                    store.save(filename, store.load(filename))
+        click.echo(f"Data files rewritten as {store.data_format}.")
+
+    @app.cli.command('export-data')
+    @click.argument('output', type=click.Path(file_okay=False))
+    def export_data(output):
+        """Write the data files to OUTPUT as indented JSON."""
+        store = get_store()
+        os.makedirs(output, exist_ok=True)
+        for filename in DATA_FILES:
+            store.export(filename, os.path.join(output, filename))
+        click.echo(f"Exported {len(DATA_FILES)} files to {output}.")
+
+    @app.cli.command('import-transactions')
+    @click.argument('user_id', type=int)
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(bulk.FORMATS), help="Default: from the file extension.")
+    def import_transactions(user_id, path, fmt):
+        """Bulk-import a CSV or JSON Lines file of transactions for USER_ID."""
+        try:
+            fmt = bulk.detect_format(path, fmt)
+            with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+                count = models.import_transactions(user_id, bulk.read_records(f, fmt))
+        except models.ImportValidationError as e:
+            for error in e.errors[:current_app.config.get('IMPORT_ERRORS_SHOWN', 20)]:
+                click.echo(error, err=True)
+            raise click.ClickException(f"{len(e.errors)} problem(s) found, nothing imported.")
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Imported {count} transactions.")
+
+    @app.cli.command('migrate-data')
+    def migrate_data():
+        """Import the JSON data files into the configured SQL backend."""
+        store = get_store()
+        if not store.supports_sql:
+            raise click.ClickException("Set STORAGE_BACKEND to an SQL backend before migrating.")
+        counts = store.import_from(LogStore(current_app.config['DATA_PATH']))
+        for filename, count in counts.items():
+            click.echo(f"{filename}: {count} rows imported.")
@@ -0,0 +1,70 @@
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, has_request_context
+
+
+# -------------------- REQUEST CONTEXT --------------------
+# One RequestContext per request, on flask.g. Model reads decorated with
+# request_cached run once per request and argument list; a write clears
+# them (and bypasses them while it holds the lock), so a request still sees
+# its own writes.
+class RequestContext:
+    """Everything loaded during one request, by (function, arguments)."""
+
+    def __init__(self):
+        self._memo = {}
+        self.writes = 0  # nesting depth of writes in progress
+        self.hits = 0
+
+    def get(self, key, load):
+        if self.writes:
+            return load()
+        try:
+            if key in self._memo:
+                self.hits += 1
+                return self._memo[key]
+        except TypeError:  # unhashable arguments: not memoized
+            return load()
+        value = self._memo[key] = load()
+        return value
+
+    def clear(self):
+        self._memo.clear()
+
+
+def current():
+    """This request's context, or None outside a request (CLI, tests, threads)."""
+    if not has_request_context():
+        return None
+    ctx = g.get('budget_context')
+    if ctx is None:
+        ctx = g.budget_context = RequestContext()
+    return ctx
+
+
+def request_cached(func):
+    """Memoize ``func`` for the rest of the request (a no-op outside one)."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        ctx = current()
+        if ctx is None:
+            return func(*args, **kwargs)
+        key = (func.__qualname__, args, tuple(sorted(kwargs.items())))
+        return ctx.get(key, lambda: func(*args, **kwargs))
+    return wrapper
+
+
+@contextmanager
+def writing():
+    """Mark a write: memoized reads are dropped before and after it, and skipped during it."""
+    ctx = current()
+    if ctx is None:
+        yield
+        return
+    ctx.clear()
+    ctx.writes += 1
+    try:
+        yield
+    finally:
+        ctx.writes -= 1
+        ctx.clear()
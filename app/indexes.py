@@ -0,0 +1,351 @@
+import bisect
+import threading
+from datetime import datetime
+
+
+# -------------------- VIEW CACHE --------------------
+_views = {}
+_views_lock = threading.Lock()
+
+
+def cached_view(name, data, build):
+    """Return ``build(data)``, memoized for as long as ``data`` is the same object.
+
+    The store hands out the same list until the file changes on disk, so a
+    view built here lives exactly as long as the data it was built from.
+    Writers that mutate the list in place must update the view themselves
+    (fetch it *before* mutating, then call its add/update/remove methods).
+    """
+    cached = _views.get(name)
+    if cached is None or cached[0] is not data:
+        with _views_lock:
+            cached = _views.get(name)
+            if cached is None or cached[0] is not data:
+                cached = (data, build(data))
+                _views[name] = cached
+    return cached[1]
+
+
+def peek_view(name, data):
+    """The view ``cached_view`` built for ``data``, or None if there is none yet."""
+    cached = _views.get(name)
+    return cached[1] if cached is not None and cached[0] is data else None
+
+
+def drop_view(name):
+    """Forget the view cached under ``name``; the next ``cached_view`` call rebuilds it."""
+    with _views_lock:
+        _views.pop(name, None)
+
+
+def drop_views():
+    """Forget every cached view (after a failed write may have left them half-updated)."""
+    with _views_lock:
+        _views.clear()
+
+
+def _discard(items, item):
+    """Remove ``item`` from ``items`` by identity."""
+    for i, existing in enumerate(items):
+        if existing is item:
+            del items[i]
+            return
+
+
+# -------------------- TRANSACTION INDEX --------------------
+def canonical_date(value, time_from=None):
+    """'YYYY-MM-DD HH:MM:SS' form of a transaction date.
+
+    A bare (legacy) 'YYYY-MM-DD' gets the time of day of ``time_from`` if it
+    has one, else midnight.
+    """
+    value = str(value)
+    if len(value) > 10:
+        return value
+    time_from = str(time_from or "")
+    return value + (time_from[10:] if len(time_from) > 10 else " 00:00:00")
+
+
+def normalize_transaction(t):
+    """Typed copy of a transaction, its date canonical and parsed once (``transaction_datetime``)."""
+    row = {
+        **t,
+        "category_id": int(t["category_id"]),
+        "user_id": int(t["user_id"]),
+        "amount": float(t["amount"])
+    }
+    if t.get("transaction_date"):
+        row["transaction_date"] = canonical_date(t["transaction_date"])
+        row["transaction_datetime"] = datetime.fromisoformat(row["transaction_date"])
+    return row
+
+
+class _UserTransactions:
+    __slots__ = ("by_type", "by_id", "dated")
+
+    def __init__(self):
+        self.by_type = {}   # type -> category_id -> [row]
+        self.by_id = {}     # transaction id -> [raw transaction]
+        self.dated = []     # [(date_key, row)] in ascending (date, id) order
+
+
+class TransactionIndex:
+    """Secondary index over transactions: user_id → type → category_id → rows.
+
+    Every transaction is normalized (int ids, float amount) once, when it
+    enters the index, and each user also gets a date-ordered view. Rows
+    handed out are shared; callers that modify them must copy first.
+    """
+
+    def __init__(self, transactions=()):
+        self._users = {}
+        self._entries = {}  # id(raw transaction) -> (raw, row, date_key)
+        self._seq = 0
+        self.max_id = 0     # highest transaction id seen; never lowered by removals
+        self.extend(transactions)
+
+    def extend(self, transactions):
+        """Add many transactions, sorting each touched date order once."""
+        touched = {}
+        for t in transactions:
+            user = self.add(t, insort=False)
+            touched[id(user)] = user
+        for user in touched.values():
+            user.dated.sort()  # keys are unique, so rows themselves are never compared
+
+    def add(self, t, insort=True):
+        row = normalize_transaction(t)
+        # Ties on date fall back to id, like SQL's ORDER BY transaction_date, id
+        # (so keyset cursors work the same on both), then to insertion order.
+        self._seq += 1
+        key = (row.get("transaction_date") or "", int(row["id"]), self._seq)
+
+        user = self._users.get(row["user_id"])
+        if user is None:
+            user = self._users[row["user_id"]] = _UserTransactions()
+        user.by_type.setdefault(row["type"], {}).setdefault(row["category_id"], []).append(row)
+        user.by_id.setdefault(int(row["id"]), []).append(t)
+        self.max_id = max(self.max_id, int(row["id"]))
+        if insort:
+            bisect.insort(user.dated, (key, row))
+        else:
+            user.dated.append((key, row))  # extend() sorts afterwards
+        self._entries[id(t)] = (t, row, key)
+        return user
+
+    def remove(self, t):
+        """Drop a transaction; works even if ``t`` was already modified in place."""
+        _, row, key = self._entries.pop(id(t))
+        user = self._users[row["user_id"]]
+
+        categories = user.by_type[row["type"]]
+        _discard(categories[row["category_id"]], row)
+        if not categories[row["category_id"]]:
+            del categories[row["category_id"]]
+
+        same_id = user.by_id[int(row["id"])]
+        _discard(same_id, t)
+        if not same_id:
+            del user.by_id[int(row["id"])]
+
+        del user.dated[bisect.bisect_left(user.dated, (key,))]
+
+    def update(self, t):
+        """Re-index a transaction after it was modified in place."""
+        self.remove(t)
+        self.add(t)
+
+    # ---------- queries ----------
+    def rows(self, user_id, t_type=None, category_id=None):
+        """Normalized rows for one user, oldest first (category lookups keep insert order)."""
+        user = self._users.get(int(user_id))
+        if user is None:
+            return []
+        if category_id is not None:
+            return list(user.by_type.get(t_type, {}).get(int(category_id), ()))
+        if t_type is not None:
+            return [row for _, row in user.dated if row["type"] == t_type]
+        return [row for _, row in user.dated]
+
+    def recent(self, user_id, limit, offset=0):
+        """The user's newest ``limit`` rows after skipping ``offset``, oldest of them first.
+
+        Slices the maintained date order, so a page costs O(limit).
+        """
+        user = self._users.get(int(user_id))
+        if user is None:
+            return []
+        end = max(0, len(user.dated) - offset)
+        return [row for _, row in user.dated[max(0, end - limit):end]]
+
+    def walk(self, user_id, start=None, end=None, after=None, descending=False):
+        """Iterate the user's rows in (date, id) order, within ``start <= date < end``.
+
+        ``after`` is a (date, id) keyset position: iteration resumes just past
+        it in the walk's direction. The bounds are found by bisection, so a
+        page costs O(log n) plus the rows actually consumed.
+        """
+        user = self._users.get(int(user_id))
+        if user is None:
+            return iter(())
+        dated = user.dated
+        lo = bisect.bisect_left(dated, ((start,),)) if start else 0
+        hi = bisect.bisect_left(dated, ((end,),)) if end else len(dated)
+        if after is not None:
+            date, tx_id = after[0], int(after[1])
+            if descending:
+                hi = min(hi, bisect.bisect_left(dated, ((date, tx_id),)))
+            else:
+                lo = max(lo, bisect.bisect_left(dated, ((date, tx_id + 1),)))
+        positions = range(hi - 1, lo - 1, -1) if descending else range(lo, hi)
+        return (dated[i][1] for i in positions)
+
+    def categories(self, user_id, t_type):
+        """Map of category_id → rows for one user and transaction type."""
+        user = self._users.get(int(user_id))
+        return user.by_type.get(t_type, {}) if user else {}
+
+    def find(self, user_id, tx_id, t_type=None):
+        """Raw transactions of ``user_id`` with the given id (and type)."""
+        user = self._users.get(int(user_id))
+        if user is None:
+            return []
+        found = user.by_id.get(int(tx_id), ())
+        if t_type is None:
+            return list(found)
+        return [t for t in found if t["type"] == t_type]
+
+
+def transaction_index(transactions):
+    return cached_view("transactions", transactions, TransactionIndex)
+
+
+# -------------------- CATEGORY REGISTRY --------------------
+class CategoryRegistry:
+    """Categories by id and by type ('income' / 'expense'), in file order.
+
+    Categories change rarely, so writers drop the registry (``drop_view``)
+    rather than patch it. Rows are shared: callers must not modify them.
+    """
+
+    def __init__(self, categories=()):
+        self._by_id = {}
+        self._by_type = {}
+        for c in categories:
+            self._by_id.setdefault(int(c["id"]), c)
+            self._by_type.setdefault(c["type"], []).append(c)
+
+    def get(self, category_id):
+        return self._by_id.get(int(category_id))
+
+    def of_type(self, t_type):
+        return self._by_type.get(t_type, [])
+
+
+def category_registry(categories):
+    return cached_view("categories", categories, CategoryRegistry)
+
+
+# -------------------- BUDGET INDEX --------------------
+def budget_key(user_id, category_id, month, year):
+    return (int(user_id), int(category_id), int(month), int(year))
+
+
+class BudgetIndex:
+    """Budgets by (user_id, category_id, month, year), by id and by user.
+
+    Holds the raw rows, so a budget found here can be changed in place and
+    handed to the store. For a key with several rows the earliest wins, as
+    with a linear scan. Writers that change a row's key fields call
+    ``update`` afterwards.
+    """
+
+    def __init__(self, budgets=()):
+        self._by_key = {}   # budget_key -> [raw budget]
+        self._by_id = {}    # budget id -> raw budget
+        self._by_user = {}  # user_id -> [raw budget]
+        self._keys = {}     # id(raw budget) -> budget_key
+        for b in budgets:
+            self.add(b)
+
+    def add(self, b):
+        key = budget_key(b["user_id"], b["category_id"], b["month"], b["year"])
+        self._keys[id(b)] = key
+        self._by_key.setdefault(key, []).append(b)
+        if b.get("id") is not None:  # SQL stores assign it on insert
+            self._by_id.setdefault(int(b["id"]), b)
+        self._by_user.setdefault(key[0], []).append(b)
+
+    def remove(self, b):
+        """Drop a budget; works even if ``b`` was already modified in place."""
+        key = self._keys.pop(id(b))
+        for bucket, name in ((self._by_key, key), (self._by_user, key[0])):
+            _discard(bucket[name], b)
+            if not bucket[name]:
+                del bucket[name]
+        if b.get("id") is not None and self._by_id.get(int(b["id"])) is b:
+            del self._by_id[int(b["id"])]
+
+    def update(self, b):
+        """Re-index a budget after its key fields were modified in place."""
+        self.remove(b)
+        self.add(b)
+
+    # ---------- queries ----------
+    def find(self, user_id, category_id, month, year):
+        """The budget row for one category and month, or None."""
+        rows = self._by_key.get(budget_key(user_id, category_id, month, year))
+        return rows[0] if rows else None
+
+    def get(self, budget_id):
+        return self._by_id.get(int(budget_id))
+
+    def for_user(self, user_id, month=None, year=None):
+        """The user's budget rows, optionally for a single month."""
+        rows = self._by_user.get(int(user_id), ())
+        if month is None:
+            return list(rows)
+        return [b for b in rows if int(b["month"]) == int(month) and int(b["year"]) == int(year)]
+
+
+def budget_index(budgets):
+    return cached_view("budgets", budgets, BudgetIndex)
+
+
+# -------------------- USER INDEX --------------------
+def username_key(username):
+    """Usernames are unique regardless of case."""
+    return str(username).casefold()
+
+
+class UserIndex:
+    """Users by case-folded username, for O(1) logins and sign-up checks.
+
+    Holds the raw rows. Login still matches the username exactly; the folded
+    key only decides whether a name is taken.
+    """
+
+    def __init__(self, users=()):
+        self._by_name = {}  # username_key -> [raw user]
+        self._by_id = {}    # user id -> raw user
+        for u in users:
+            self.add(u)
+
+    def add(self, u):
+        self._by_name.setdefault(username_key(u["username"]), []).append(u)
+        if u.get("id") is not None:
+            self._by_id.setdefault(int(u["id"]), u)
+
+    def by_id(self, user_id):
+        return self._by_id.get(int(user_id))
+
+    def get(self, username):
+        """The user with exactly this username, or None."""
+        return next((u for u in self._by_name.get(username_key(username), ()) if u["username"] == username), None)
+
+    def taken(self, username):
+        return username_key(username) in self._by_name
+
+
+def user_index(users):
+    return cached_view("users", users, UserIndex)
@@ -1,105 +1,341 @@
-import os
 import json
-import bcrypt
-from flask import current_app
-from datetime import datetime
+import threading
+import base64
+from flask import current_app, has_app_context
+from datetime import datetime, timedelta
 import calendar
+from functools import wraps
+from contextlib import contextmanager
+from itertools import islice
 from werkzeug.security import generate_password_hash
+from app.storage import get_store
+from app.indexes import budget_index, canonical_date, category_registry, drop_view, drop_views, transaction_index, user_index
+from app import aggregates as agg
+from app import columnar
+from app import timeseries
+from app import passwords
+from app import context
+from app import pagecache
+from app.context import request_cached
 
 # -------------------- JSON UTILS --------------------
+# Reads marked @request_cached run once per request (see app.context); writes
+# go through write_transaction / _write_lock, which drop those memoized reads.
+@request_cached
 def load_json(filename):
-    file_path = os.path.join(current_app.config['DATA_PATH'], filename)
-    if not os.path.exists(file_path):
-        with open(file_path, 'w') as f:
-            json.dump([], f)
-    with open(file_path, 'r') as f:
-        return json.load(f)
+    """Return the cached contents of a data file, creating it if missing."""
+    return get_store().load(filename, create=True)
 
 def save_json(filename, data):
-    file_path = os.path.join(current_app.config['DATA_PATH'], filename)
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=4)
+    get_store().save(filename, data)
+
+def write_transaction(func):
+    """Run a model write under the store's write lock.
+
+    Its load→modify→save then cannot interleave with another thread's or
+    process's write (e.g. two budget checks both passing before either
+    consumed amount is saved). Reads are not affected.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with _write_lock():
+            return func(*args, **kwargs)
+    return wrapper
+
+@contextmanager
+def _write_lock():
+    """The store's write lock, with this request's memoized reads set aside.
+
+    The data versions of whatever the write reported through ``_touched`` are
+    bumped once the outermost write completes. Writers change the store's
+    cached lists and the views over them in place, so if the write raises
+    those are all dropped and the next read starts again from disk.
+    """
+    outermost = getattr(_writes, 'scopes', None) is None
+    if outermost:
+        _writes.scopes = set()
+    try:
+        with get_store().transaction(), context.writing():
+            try:
+                yield
+            except BaseException:
+                get_store().invalidate()
+                drop_views()
+                raise
+            if outermost and _writes.scopes:
+                get_store().bump_versions(sorted(_writes.scopes))
+                pagecache.invalidate(_writes.scopes)
+    finally:
+        if outermost:
+            _writes.scopes = None
+
+# -------------------- DATA VERSIONS --------------------
+# Each user's data has a version that every write to it bumps ('*' covers
+# data everyone sees, e.g. categories). Together they make a cheap validator
+# for anything derived from the user's data (see routes._conditional_json).
+GLOBAL_SCOPE = '*'
+_writes = threading.local()  # scopes changed by the write in progress on this thread
+
+def _touched(user_id=None):
+    """Record that the current write changes ``user_id``'s data (everyone's if None)."""
+    _writes.scopes.add(GLOBAL_SCOPE if user_id is None else str(int(user_id)))
+
+def data_version(user_id):
+    """Opaque token that changes whenever the user's data (or shared data) changes."""
+    return "%d.%d" % get_store().data_version(GLOBAL_SCOPE, str(int(user_id)))
 
 # -------------------- PASSWORD UTILS --------------------
+# bcrypt runs at BCRYPT_ROUNDS, on the PASSWORD_HASH_WORKERS pool (see app.passwords)
 def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return passwords.hash_password(password)
 
 def verify_password(stored_password, provided_password):
-    return bcrypt.checkpw(provided_password.encode('utf-8'), stored_password.encode('utf-8'))
+    return passwords.verify_password(stored_password, provided_password)
 
 def parse_datetime(dt_str):
     """Parse date strings that may be 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS'."""
-    try:
-        return datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
-    except ValueError:
-        return datetime.strptime(dt_str, "%Y-%m-%d")
+    if isinstance(dt_str, datetime):
+        return dt_str
+    return datetime.fromisoformat(dt_str)  # ✅ Both formats, no strptime / exception round-trip
+
+def row_datetime(t):
+    """A transaction's date as a datetime (pre-parsed on indexed rows)."""
+    return t.get('transaction_datetime') or parse_datetime(t['transaction_date'])
 
 
 # -------------------- USER FUNCTIONS --------------------
+@request_cached
 def get_user_by_username(username):
-    users = load_json('users.json')
-    return next((u for u in users if u['username'] == username), None)
+    sql = _sql_store()
+    if sql:
+        return sql.find_user(username)
+    return user_index(load_json('users.json')).get(username)
+
+@request_cached
+def user_profile(user_id):
+    """What pages show about a user (no password hash), or None if there is no such user."""
+    sql = _sql_store()
+    user = sql.get_user(user_id) if sql else user_index(load_json('users.json')).by_id(user_id)
+    if user is None:
+        return None
+    return {"id": user["id"], "username": user["username"], "type": user.get("type", "user")}
+
+def _check_username_free(username):
+    """Raise ValueError if ``username`` is taken (case-folded index lookup)."""
+    sql = _sql_store()
+    if sql.users_named(username) if sql else user_index(load_json('users.json')).taken(username):
+        raise ValueError("Username already exists.")
 
 def register_user_model(username, password):
     """Handles user registration logic and saves to users.json."""
-    users = load_json('users.json')
-
-    # ✅ Check if username already exists
-    if any(u['username'].lower() == username.lower() for u in users):
-        raise ValueError("Username already exists.")
-
-    # ✅ Hash the password using bcrypt
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-    # ✅ Create new user entry
-    new_user = {
-        "id": (max([u['id'] for u in users]) + 1) if users else 1,
-        "username": username,
-        "password": hashed_password,
-        "type": "user",
-        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
+    # ✅ Reject a taken name before paying for a hash
+    _check_username_free(username)
+
+    # ✅ Hash the password using bcrypt (before taking the write lock: it is slow on purpose)
+    hashed_password = hash_password(password)
+
+    with _write_lock():
+        sql = _sql_store()
+        users = None if sql else load_json('users.json')
+        _check_username_free(username)  # ✅ Again under the lock: it may have been taken meanwhile
+
+        # ✅ Create new user entry
+        new_user = {
+            "id": get_store().next_id('users.json'),
+            "username": username,
+            "password": hashed_password,
+            "type": "user",
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
 
-    users.append(new_user)
-    save_json('users.json', users)
+        if sql:
+            sql.insert('users.json', None, [new_user])  # the database assigns the id
+        else:
+            index = user_index(users)
+            users.append(new_user)
+            index.add(new_user)
+            save_json('users.json', users)
     return new_user
 
+def authenticate(username, password):
+    """The user if ``password`` is theirs, else None.
+
+    A hash made with a different bcrypt cost than BCRYPT_ROUNDS is replaced
+    while the plain password is at hand, so changing the cost needs no reset.
+    """
+    user = get_user_by_username(username)
+    if not user or not verify_password(user['password'], password):
+        return None
+    if passwords.needs_rehash(user['password']):
+        _rehash_password(username, hash_password(password))
+    return user
+
+def _rehash_password(username, hashed_password):
+    with _write_lock():
+        sql = _sql_store()
+        users = None if sql else load_json('users.json')
+        user = sql.find_user(username) if sql else user_index(users).get(username)
+        if user is not None:
+            user['password'] = hashed_password
+            get_store().update('users.json', users, [user])
+
+# -------------------- AGGREGATE FUNCTIONS --------------------
+@write_transaction
+def rebuild_aggregates():
+    """Recompute aggregates.json from transactions.json (e.g. after hand edits)."""
+    aggregates = agg.build_aggregates(load_json('transactions.json'))
+    save_json('aggregates.json', aggregates)
+    return aggregates
+
+@request_cached
+def get_aggregates():
+    """Running totals per user/type/category/month, rebuilt if missing or out of step."""
+    aggregates = load_json('aggregates.json')
+    if not agg.is_current(aggregates, load_json('transactions.json')):
+        aggregates = _refresh_aggregates()
+    return aggregates
+
+@write_transaction
+def _refresh_aggregates():
+    """Rebuild the totals only if they are still out of step once the write lock is held.
+
+    A read without the lock can catch a writer between adding a row and
+    folding it into the totals; that is not drift, and the writer is done
+    by the time the lock is ours.
+    """
+    aggregates = load_json('aggregates.json')
+    if agg.is_current(aggregates, load_json('transactions.json')):
+        return aggregates
+    return rebuild_aggregates()
+
+def _save_transactions(operation, transactions, records, aggregates, deltas):
+    """Persist a change to ``records`` (insert/update/delete) plus the matching totals.
+
+    Only the changed rows and the totals' ``deltas`` (from agg.apply_transaction)
+    are handed to the store, which journals them instead of rewriting
+    transactions.json and aggregates.json.
+    """
+    # ✅ Transactions first: a crash in between leaves a count mismatch that triggers a rebuild
+    getattr(get_store(), operation)('transactions.json', transactions, records)
+    if deltas:
+        get_store().append('aggregates.json', aggregates, deltas)
+    if operation != 'insert':
+        columnar.invalidate(transactions)  # appended rows are picked up by the table itself
+
+@request_cached
+def _categories():
+    """The cached category registry (id → category, type → categories)."""
+    return category_registry(_category_rows())
+
+_sql_categories = {}  # SQL store -> (shared data version, category rows)
+
+def _category_rows():
+    """categories.json's rows; on SQL stores the same list until shared data changes.
+
+    SQL loads return a new list every time, which would rebuild the registry
+    on every request; category writes bump the global data version instead.
+    """
+    sql = _sql_store()
+    if not sql:
+        return load_json('categories.json')
+    version = sql.data_version(GLOBAL_SCOPE)  # ✅ Read before the rows, so a racing write is never missed
+    cached = _sql_categories.get(sql)
+    if cached is None or cached[0] != version:
+        cached = _sql_categories[sql] = (version, sql.load('categories.json'))
+    return cached[1]
+
+# -------------------- QUERY HELPERS --------------------
+# Each helper answers from SQL when the configured store supports it, and from
+# the in-memory index / running totals otherwise.
+def _sql_store():
+    """The active store if it can answer queries in SQL, else None."""
+    if not has_app_context():  # no configured store to ask
+        return None
+    store = get_store()
+    return store if store.supports_sql else None
+
+@request_cached
+def _user_rows(user_id, t_type=None):
+    """The user's normalized transactions (optionally of one type), oldest first."""
+    sql = _sql_store()
+    if sql:
+        return sql.transactions_for(user_id, t_type)
+    return transaction_index(load_json('transactions.json')).rows(user_id, t_type)
+
+@request_cached
+def _recent_rows(user_id, limit, offset=0):
+    """The user's ``limit`` newest transactions after skipping ``offset``, oldest of them first."""
+    sql = _sql_store()
+    if sql:
+        return sql.recent_transactions_for(user_id, limit, offset)
+    return transaction_index(load_json('transactions.json')).recent(user_id, limit, offset)
+
+def _recent_limit():
+    return current_app.config.get('RECENT_TRANSACTIONS_LIMIT', 5)
+
+@request_cached
+def _type_totals(user_id):
+    """{'income': total, 'expense': total} for one user."""
+    sql = _sql_store()
+    if sql:
+        totals = sql.totals_for(user_id)
+        return {t_type: totals.get(t_type, 0.0) for t_type in ('income', 'expense')}
+    aggregates = get_aggregates()
+    return {t_type: agg.total(aggregates, user_id, t_type) for t_type in ('income', 'expense')}
+
+@request_cached
+def _totals_by_category(user_id, t_type):
+    """{category_id: total} for one user and transaction type."""
+    sql = _sql_store()
+    if sql:
+        return sql.category_totals_for(user_id, t_type)
+    return agg.category_totals(get_aggregates(), user_id, t_type)
+
+def _find_transactions(user_id, tx_id, t_type):
+    sql = _sql_store()
+    if sql:
+        return sql.find_transactions(user_id, tx_id, t_type)
+    return transaction_index(load_json('transactions.json')).find(user_id, tx_id, t_type)
+
+@request_cached
+def _user_budgets(user_id, month=None, year=None):
+    """The user's budget rows, optionally for a single month."""
+    sql = _sql_store()
+    if sql:
+        return sql.budgets_for(user_id, month, year)
+    return budget_index(load_json('budgets.json')).for_user(user_id, month, year)
+
 # -------------------- TRANSACTION FUNCTIONS --------------------
 def get_user_transactions(user_id):
-    transactions = load_json('transactions.json')
-    return [
-        {
-            **t,
-            "category_id": int(t["category_id"]),  # ✅ normalize
-            "user_id": int(t["user_id"]),
-            "amount": float(t["amount"])
-        }
-        for t in transactions if int(t["user_id"]) == int(user_id)
-    ]
+    # ✅ Rows come pre-normalized; copy so callers can annotate them
+    return [dict(t) for t in _user_rows(user_id)]
 
 
+@write_transaction
 def add_transaction(user_id, category_id, t_type, amount, description, date):
+    _touched(user_id)
+    sql = _sql_store()
+    if sql:
+        return _add_transaction_sql(sql, user_id, category_id, t_type, amount, description, date)
+
+    # ✅ Validate the input before anything is changed
+    amount = float(amount)
+    tx_date = parse_datetime(date)
+
     transactions = load_json('transactions.json')
+    index = transaction_index(transactions)
     budgets = load_json('budgets.json')
-    amount = float(amount)
 
     # ✅ Combine provided date with current time
     current_time = datetime.now().strftime("%H:%M:%S")
-    transaction_datetime = f"{date} {current_time}"
+    transaction_datetime = f"{tx_date:%Y-%m-%d} {current_time}"
 
     # ✅ Check if this is an expense and validate against budget
     if t_type == "expense":
-        month = int(datetime.strptime(date, "%Y-%m-%d").month)
-        year = int(datetime.strptime(date, "%Y-%m-%d").year)
-
-        # Find the budget entry for this category, month, and year
-        budget_entry = next(
-            (b for b in budgets if int(b["user_id"]) == int(user_id) 
-             and int(b["category_id"]) == int(category_id) 
-             and int(b["month"]) == month 
-             and int(b["year"]) == year), 
-            None
-        )
+        month, year = tx_date.month, tx_date.year
+
+        # ✅ Hash lookup of the budget entry for this category, month, and year
+        budget_entry = budget_index(budgets).find(user_id, category_id, month, year)
 
         if budget_entry:
             available_budget = float(budget_entry["budget_amount"]) - float(budget_entry["consumed"])
@@ -111,12 +347,12 @@ def add_transaction(user_id, category_id, t_type, amount, description, date):
         else:
             raise ValueError("No budget set for this category for the current month!")
 
-        # Save updated budget
-        save_json('budgets.json', budgets)
+        # ✅ Persist just this budget (journaled by the default store)
+        get_store().update('budgets.json', budgets, [budget_entry])
 
     # ✅ Add the transaction if budget is okay (or if it's income)
     new_tx = {
-        "id": len(transactions) + 1,
+        "id": get_store().next_id('transactions.json'),  # ✅ Never reused (the journal replays by id)
         "user_id": user_id,
         "category_id": category_id,
         "type": t_type,
@@ -125,241 +361,733 @@ def add_transaction(user_id, category_id, t_type, amount, description, date):
         "transaction_date": transaction_datetime
     }
 
+    aggregates = get_aggregates()
+    index.add(new_tx)
+    # ✅ Count and row land together, so unlocked readers rarely see them apart
+    delta = agg.apply_transaction(aggregates, new_tx)
     transactions.append(new_tx)
-    save_json('transactions.json', transactions)
+    _save_transactions('insert', transactions, [new_tx], aggregates, [delta])
+
+
+def _add_transaction_sql(sql, user_id, category_id, t_type, amount, description, date):
+    """add_transaction for SQL stores: indexed budget lookup, then the guarded
+    consumed update and the insert as one database transaction."""
+    amount = float(amount)
+    tx_date = parse_datetime(date)
+    transaction_datetime = f"{tx_date:%Y-%m-%d} {datetime.now().strftime('%H:%M:%S')}"
+
+    budget_entry = None
+    if t_type == "expense":
+        budget_entry = sql.find_budget(user_id, category_id, tx_date.month, tx_date.year)
+        if not budget_entry:
+            raise ValueError("No budget set for this category for the current month!")
+
+    row = {
+        "user_id": user_id,
+        "category_id": category_id,
+        "type": t_type,
+        "amount": amount,
+        "description": description,
+        "transaction_date": transaction_datetime
+    }
+    try:
+        # ✅ Both or neither: a failed insert must not leave the budget consumed
+        sql.insert_transactions([row], {budget_entry["id"]: amount} if budget_entry else None)
+    except ValueError:
+        available_budget = float(budget_entry["budget_amount"]) - float(budget_entry["consumed"])
+        raise ValueError(f"Insufficient budget! Available: ₱{available_budget:,.2f}, Tried: ₱{amount:,.2f}") from None
+
+
+# -------------------- BULK IMPORT --------------------
+class ImportValidationError(ValueError):
+    """Import rows that failed validation (``errors``); nothing was written."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)} problem(s) found, nothing imported. First: {errors[0]}")
+
+def _import_row(record, user_id, categories, names):
+    """A new transaction row from one import record; ValueError says what is wrong with it."""
+    t_type = str(record.get('type') or '').strip().lower()
+    if t_type not in ('income', 'expense'):
+        raise ValueError("type must be 'income' or 'expense'")
+    try:
+        amount = float(record.get('amount'))
+    except (TypeError, ValueError):
+        raise ValueError(f"amount {record.get('amount')!r} is not a number")
+    if not 0 < amount < float('inf'):
+        raise ValueError("amount must be positive")
+    date = str(record.get('transaction_date') or record.get('date') or '').strip()
+    try:
+        transaction_date = datetime.fromisoformat(date).strftime("%Y-%m-%d %H:%M:%S")  # ✅ Bare dates → midnight
+    except ValueError:
+        raise ValueError(f"date {date!r} is not YYYY-MM-DD[ HH:MM:SS]")
+
+    # The category is given by id or, as in most bank exports, by name
+    try:
+        if str(record.get('category_id') or '').strip():
+            category = categories.get(record['category_id'])
+        else:
+            category = names.get((t_type, str(record.get('category') or '').strip().casefold()))
+    except ValueError:
+        category = None
+    if category is None or category['type'] != t_type:
+        raise ValueError(f"unknown {t_type} category")
+
+    return {
+        "id": None,
+        "user_id": int(user_id),
+        "category_id": int(category['id']),
+        "type": t_type,
+        "amount": amount,
+        "description": str(record.get('description') or ''),
+        "transaction_date": transaction_date
+    }
+
+@write_transaction
+def import_transactions(user_id, records):
+    """Validate and add many transactions at once (e.g. a bank export); returns how many.
+
+    ``records`` is any iterable of dicts (see app.bulk for CSV / JSON Lines).
+    Every row is checked before anything is written: expenses need a budget
+    for their category and month, and each budget must cover the sum of its
+    imported expenses. If anything fails, ImportValidationError lists the
+    problems and nothing is saved; otherwise each budget gets one aggregated
+    consumed update and all rows are committed in a single write.
+    """
+    _touched(user_id)
+    sql = _sql_store()
+    categories = _categories()
+    names = {}
+    for t_type in ('income', 'expense'):
+        for c in categories.of_type(t_type):
+            names.setdefault((t_type, c['name'].strip().casefold()), c)
+
+    if sql:
+        user_budgets = {}
+        for b in sql.budgets_for(user_id):
+            user_budgets.setdefault((int(b['category_id']), int(b['month']), int(b['year'])), b)
+        find_budget = lambda category_id, month, year: user_budgets.get((category_id, month, year))
+    else:
+        budgets = load_json('budgets.json')
+        index = budget_index(budgets)
+        find_budget = lambda category_id, month, year: index.find(user_id, category_id, month, year)
+
+    rows, errors, deltas = [], [], {}  # deltas: id(budget) -> [budget, imported expense total]
+    for n, record in enumerate(records, 1):
+        try:
+            row = _import_row(record, user_id, categories, names)
+            if row['type'] == 'expense':
+                year, month = int(row['transaction_date'][:4]), int(row['transaction_date'][5:7])
+                budget = find_budget(row['category_id'], month, year)
+                if budget is None:
+                    raise ValueError(f"no budget set for this category for {month:02d}/{year}")
+                deltas.setdefault(id(budget), [budget, 0.0])[1] += row['amount']
+            rows.append(row)
+        except ValueError as e:
+            errors.append(f"Row {n}: {e}")
+
+    for budget, amount in deltas.values():
+        available_budget = float(budget["budget_amount"]) - float(budget["consumed"])
+        if amount > available_budget:
+            errors.append(
+                f"Insufficient budget for category {budget['category_id']} in {int(budget['month']):02d}/{budget['year']}! "
+                f"Available: ₱{available_budget:,.2f}, Importing: ₱{amount:,.2f}"
+            )
+    if errors:
+        raise ImportValidationError(errors)
+    if not rows:
+        return 0
+
+    if sql:
+        sql.insert_transactions(rows, {budget['id']: amount for budget, amount in deltas.values()})
+        return len(rows)
+
+    store = get_store()
+    transactions = load_json('transactions.json')
+    tx_index = transaction_index(transactions)
+    first_id = store.next_id('transactions.json', len(rows))  # ✅ One block of ids for the whole import
+    for offset, row in enumerate(rows):
+        row['id'] = first_id + offset
+
+    if deltas:
+        for budget, amount in deltas.values():
+            budget['consumed'] += amount
+        store.update('budgets.json', budgets, [budget for budget, _ in deltas.values()])
+
+    aggregates = get_aggregates()
+    deltas = [agg.apply_transaction(aggregates, row) for row in rows]
+    transactions.extend(rows)
+    tx_index.extend(rows)
+    _save_transactions('insert', transactions, rows, aggregates, deltas)
+    return len(rows)
 
 
 # -------------------- SUMMARY FUNCTIONS --------------------
 def get_total_expenses(user_id):
-    transactions = get_user_transactions(user_id)
-    return sum(t['amount'] for t in transactions if t['type'] == 'expense')
+    return _type_totals(user_id)['expense']
 
 def get_total_income(user_id):
-    transactions = get_user_transactions(user_id)
-    return sum(t['amount'] for t in transactions if t['type'] == 'income')
+    return _type_totals(user_id)['income']
 
 def get_remaining_balance(user_id):
     return get_total_income(user_id) - get_total_expenses(user_id)
 
-def get_all_transactions(user_id):
-    transactions = get_user_transactions(user_id)
-    categories = load_json('categories.json')
-
-    category_map = {int(c['id']): c['name'] for c in categories}
+def _latest(rows):
+    """Date-ordered rows newest first, with category names and parsed dates."""
+    categories = _categories()
+    return [
+        {
+            **t,
+            "category_name": (categories.get(t['category_id']) or {"name": "Unknown"})['name'],
+            "transaction_date": row_datetime(t)  # ✅ Parsed once, when the row was indexed
+        }
+        for t in reversed(rows)
+    ]
 
-    for t in transactions:
-        t['category_name'] = category_map.get(int(t['category_id']), "Unknown")
-        
-        # ✅ Handle both formats
-        if isinstance(t['transaction_date'], str):
-            t['transaction_date'] = parse_datetime(t['transaction_date'])
+def get_all_transactions(user_id):
+    return _latest(_recent_rows(user_id, _recent_limit()))
+
+def transaction_json(t):
+    """JSON-ready form of a listed transaction (its date back to 'YYYY-MM-DD HH:MM:SS')."""
+    item = {
+        "id": t["id"],
+        "type": t["type"],
+        "category_id": t["category_id"],
+        "category_name": t["category_name"],
+        "amount": t["amount"],
+        "description": t.get("description", ""),
+        "transaction_date": t["transaction_date"].strftime("%Y-%m-%d %H:%M:%S")
+    }
+    if "category_color" in t:
+        item["category_color"] = t["category_color"]
+    return item
+
+def get_recent_activity(user_id, limit=None, offset=0):
+    """One page of the user's transactions, newest first, for the recent activity API."""
+    limit = _recent_limit() if limit is None else limit
+    rows = _recent_rows(user_id, limit + 1, offset)  # ✅ One extra row tells whether more pages follow
+    has_more = len(rows) > limit
+    return {
+        "items": [transaction_json(t) for t in _latest(rows[1:] if has_more else rows)],
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if has_more else None
+    }
 
-    return sorted(transactions, key=lambda t: t['transaction_date'], reverse=True)[:5]
 
+def _with_categories(rows):
+    """Rows with category name/color and a datetime ``transaction_date``, in the given order."""
+    categories = _categories()
+    listed = []
+    for t in rows:
+        category_info = categories.get(t["category_id"]) or {"name": "Unknown", "color": "#CCCCCC"}
+        listed.append({
+            **t,
+            "category_name": category_info["name"],   # ✅ Include name
+            "category_color": category_info["color"], # ✅ Include color
+            "transaction_date": row_datetime(t),  # ✅ Pre-parsed datetime (no strptime per row)
+        })
+    return listed
 
 def get_all_expense_transactions(user_id):
-    transactions = load_json('transactions.json')
-    categories = load_json('categories.json')
+    # ✅ Only this user's expense rows, already normalized
+    return _with_categories(_user_rows(user_id, 'expense'))
 
-    # Map category IDs to names and colors
-    category_map = {int(c['id']): {"name": c["name"], "color": c["color"]} for c in categories}
 
-    expenses = []
-    for t in transactions:
-        if t["type"] == "expense" and int(t["user_id"]) == int(user_id):
-            # ✅ Convert transaction_date safely
-            tx_date = t["transaction_date"]
-            if isinstance(tx_date, str):
-                try:
-                    tx_date = datetime.strptime(tx_date, "%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    tx_date = datetime.strptime(tx_date, "%Y-%m-%d")  # fallback for old data
-
-            category_info = category_map.get(int(t["category_id"]), {"name": "Unknown", "color": "#CCCCCC"})
-
-            expenses.append({
-                **t,
-                "category_id": int(t["category_id"]),
-                "user_id": int(t["user_id"]),
-                "amount": float(t["amount"]),
-                "category_name": category_info["name"],   # ✅ Include name
-                "category_color": category_info["color"], # ✅ Include color
-                "transaction_date": tx_date,  # ✅ Now it's a datetime object
-            })
-
-    return expenses
+def get_all_income_transactions(user_id):
+    # ✅ Only this user's income rows, already normalized
+    return _with_categories(_user_rows(user_id, 'income'))
 
 
-def get_all_income_transactions(user_id):
-    transactions = load_json('transactions.json')
-    categories = load_json('categories.json')
+# -------------------- LISTING FUNCTIONS --------------------
+# Keyset pagination: a page ends with an opaque cursor holding the last row's
+# (sort value, id); the next page starts strictly after that position, so
+# pages stay stable while rows are added and never re-scan skipped rows.
+SORT_COLUMNS = {'date': 'transaction_date', 'amount': 'amount'}
 
-    # Map category IDs to names and colors
-    category_map = {int(c['id']): {"name": c["name"], "color": c["color"]} for c in categories}
+def _page_size():
+    return current_app.config.get('TRANSACTIONS_PAGE_SIZE', 50)
 
-    incomes = []
-    for t in transactions:
-        if t["type"] == "income" and int(t["user_id"]) == int(user_id):
-            # ✅ Convert transaction_date safely
-            tx_date = t["transaction_date"]
-            if isinstance(tx_date, str):
-                try:
-                    tx_date = datetime.strptime(tx_date, "%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    tx_date = datetime.strptime(tx_date, "%Y-%m-%d")
-
-            category_info = category_map.get(int(t["category_id"]), {"name": "Unknown", "color": "#CCCCCC"})
-
-            incomes.append({
-                **t,
-                "category_id": int(t["category_id"]),
-                "user_id": int(t["user_id"]),
-                "amount": float(t["amount"]),
-                "category_name": category_info["name"],   # ✅ Include name
-                "category_color": category_info["color"], # ✅ Include color
-                "transaction_date": tx_date,
-            })
+def encode_cursor(row, sort):
+    value = row[SORT_COLUMNS[sort]]
+    return base64.urlsafe_b64encode(json.dumps([value, int(row['id'])]).encode()).decode()
 
-    return incomes
+def decode_cursor(cursor, sort):
+    """(sort value, id) of a cursor from encode_cursor; ValueError if it is malformed."""
+    try:
+        value, tx_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (float(value) if sort == 'amount' else str(value)), int(tx_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
 
+def _date_bound(value, days=0):
+    """'YYYY-MM-DD 00:00:00' of a date (string or date) plus ``days``.
 
+    None (no bound) when that falls after the last representable date.
+    """
+    try:
+        return f"{(timeseries.as_date(value) + timedelta(days=days)).isoformat()} 00:00:00"
+    except OverflowError:
+        return None
+
+def _page_rows(user_id, t_type, limit, start, end, category_id, sort, descending, after):
+    """Up to ``limit`` normalized rows of one keyset page, from the date-ordered index."""
+    index = transaction_index(load_json('transactions.json'))
+    category_id = None if category_id is None else int(category_id)
+
+    def wanted(t):
+        return (t_type is None or t['type'] == t_type) and (category_id is None or t['category_id'] == category_id)
+
+    if sort == 'date':
+        rows = index.walk(user_id, start, end, after, descending)
+        return list(islice(filter(wanted, rows), limit))
+
+    # Amount order is not maintained, so sort the (date-filtered) matches
+    key = lambda t: (t['amount'], int(t['id']))
+    rows = sorted(filter(wanted, index.walk(user_id, start, end)), key=key, reverse=descending)
+    if after is not None:
+        rows = [t for t in rows if (key(t) < after if descending else key(t) > after)]
+    return rows[:limit]
+
+def _page(user_id, t_type, limit, start=None, end=None, category_id=None, sort='date', descending=False, after=None):
+    """One keyset page of normalized rows (``t_type`` None: both types); bounds are date keys."""
+    sql = _sql_store()
+    if sql:
+        return sql.transaction_page(user_id, t_type, limit, start, end, category_id,
+                                    SORT_COLUMNS[sort], descending, after)
+    return _page_rows(user_id, t_type, limit, start, end, category_id, sort, descending, after)
+
+def list_transactions(user_id, t_type, start=None, end=None, category_id=None,
+                      sort='date', descending=True, cursor=None, limit=None):
+    """One page of the user's ``t_type`` transactions for the listing pages.
+
+    ``start``/``end`` are inclusive dates, ``sort`` is 'date' or 'amount'
+    (ties broken by id). Returns ``(rows, next_cursor)``; rows are shaped
+    like get_all_expense_transactions, and passing ``next_cursor`` back as
+    ``cursor`` yields the following page (it is None on the last one).
+    Raises ValueError for an unknown sort, a bad date or a bad cursor.
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Unknown sort {sort!r}")
+    limit = _page_size() if limit is None else int(limit)
+    start = _date_bound(start) if start else None
+    end = _date_bound(end, days=1) if end else None  # ✅ Inclusive end day
+    after = decode_cursor(cursor, sort) if cursor else None
+
+    rows = _page(user_id, t_type, limit + 1, start, end, category_id, sort, descending, after)
+    has_more = len(rows) > limit  # ✅ One extra row tells whether more pages follow
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1], sort) if has_more else None
+    return _with_categories(rows), next_cursor
+
+
+# -------------------- EXPORT FUNCTIONS --------------------
+# Each export validates its arguments up front and returns a generator of
+# flat dicts, so a streamed response can start (and fail) before the first row.
+EXPORT_CHUNK = 1000
+TRANSACTION_FIELDS = ("id", "transaction_date", "type", "category_id", "category_name", "amount", "description")
+BUDGET_FIELDS = ("id", "year", "month", "category_id", "category_name", "budget_amount", "consumed")
+CATEGORY_TOTAL_FIELDS = ("type", "category_id", "category_name", "total_amount")
+
+def _export_bounds(start, end):
+    """(start date, end date) of an export range; either may be None."""
+    return (timeseries.as_date(start) if start else None,
+            timeseries.as_date(end) if end else None)
+
+def iter_transactions(user_id, t_type=None, start=None, end=None):
+    """The user's transactions within [start, end] (inclusive dates), oldest first.
+
+    Fetched in keyset chunks of EXPORT_CHUNK rows, so memory stays flat and
+    writes made while the caller iterates cannot skip or repeat rows.
+    """
+    start = _date_bound(start) if start else None
+    end = _date_bound(end, days=1) if end else None
+    after = None
+    while True:
+        rows = _page(user_id, t_type, EXPORT_CHUNK, start, end, after=after)
+        yield from rows
+        if len(rows) < EXPORT_CHUNK:
+            return
+        after = (rows[-1]['transaction_date'], rows[-1]['id'])
+
+def export_transactions(user_id, start=None, end=None, t_type=None):
+    if t_type not in (None, 'income', 'expense'):
+        raise ValueError(f"Unknown transaction type {t_type!r}")
+    start, end = _export_bounds(start, end)
+
+    def rows():
+        categories = _categories()
+        for t in iter_transactions(user_id, t_type, start, end):
+            category = categories.get(t['category_id'])
+            yield {**t, "category_name": category['name'] if category else "Unknown"}
+    return rows()
+
+def export_budgets(user_id, start=None, end=None):
+    """The user's budgets for the months overlapping [start, end], oldest month first."""
+    start, end = _export_bounds(start, end)
+    first = (start.year, start.month) if start else (0, 0)
+    last = (end.year, end.month) if end else (9999, 12)
+
+    def rows():
+        categories = _categories()
+        budgets = sorted(_user_budgets(user_id), key=lambda b: (int(b['year']), int(b['month'])))
+        for b in budgets:
+            if first <= (int(b['year']), int(b['month'])) <= last:
+                category = categories.get(b['category_id'])
+                yield {**b, "category_name": category['name'] if category else "Unknown"}
+    return rows()
+
+def export_category_totals(user_id, start=None, end=None):
+    """Per-category income and expense totals over [start, end] (all time by default)."""
+    start, end = _export_bounds(start, end)
+
+    def rows():
+        if start is None and end is None:
+            totals = {t_type: _totals_by_category(user_id, t_type) for t_type in ('income', 'expense')}
+        else:
+            # ✅ One streaming pass over the range; only the per-category sums are held
+            totals = {'income': {}, 'expense': {}}
+            for t in iter_transactions(user_id, None, start, end):
+                bucket = totals[t['type']]
+                bucket[t['category_id']] = bucket.get(t['category_id'], 0) + float(t['amount'])
+        categories = _categories()
+        for t_type, by_category in totals.items():
+            for category_id, total in sorted(by_category.items()):
+                category = categories.get(category_id)
+                yield {
+                    "type": t_type,
+                    "category_id": category_id,
+                    "category_name": category['name'] if category else "Unknown",
+                    "total_amount": round(total, 2)
+                }
+    return rows()
+
+# name -> (columns, export function)
+EXPORTS = {
+    "transactions": (TRANSACTION_FIELDS, export_transactions),
+    "budgets": (BUDGET_FIELDS, export_budgets),
+    "category-totals": (CATEGORY_TOTAL_FIELDS, export_category_totals),
+}
 
 
 # -------------------- CATEGORY FUNCTIONS --------------------
 def get_all_income_categories():
-    categories = load_json('categories.json')
-    return [c for c in categories if c['type'] == 'income']
+    return list(_categories().of_type('income'))
 
 def get_all_expense_categories():
-    categories = load_json('categories.json')
-    return [c for c in categories if c['type'] == 'expense']
+    return list(_categories().of_type('expense'))
 
 def add_income(user_id, amount, category_id, transaction_date, description):
     add_transaction(user_id, category_id, 'income', amount, description, transaction_date)
 
 # -------------------- REPORT FUNCTIONS --------------------
-def get_expense_totals_by_category(user_id):
-    transactions = get_all_expense_transactions(user_id)
-    categories = load_json('categories.json')
+def _category_totals(totals, t_type):
+    """Turn {category_id: total} into chart rows, in category order, skipping empty ones."""
     results = []
-
-    for cat in get_all_expense_categories():
-        total = sum(
-            t['amount']
-            for t in transactions
-            if int(t['category_id']) == int(cat['id'])  # ✅ Ensure both are int
-        )
+    for cat in _categories().of_type(t_type):
+        total = totals.get(int(cat['id']), 0)
         if total > 0:
             results.append({
                 "category_name": cat['name'],
                 "total_amount": total,
                 "color": cat.get('color', '#000000')  # ✅ Include category color (fallback to black if missing)
             })
-
     return results
 
 
+def get_expense_totals_by_category(user_id):
+    return _category_totals(_totals_by_category(user_id, 'expense'), 'expense')
 
-def get_income_totals_by_category(user_id):
-    transactions = get_user_transactions(user_id)
-    results = []
-    
-    for cat in get_all_income_categories():
-        total = sum(
-            t['amount']
-            for t in transactions
-            if int(t['category_id']) == int(cat['id'])  # ✅ normalize IDs
-            and t["type"] == "income"  # ✅ ensure only income transactions
-        )
-        if total > 0:
-            results.append({
-                "category_name": cat['name'],
-                "total_amount": total,
-                "color": cat.get('color', '#000000')  # ✅ include category color (default black)
-            })
-    
-    return results
 
+def get_income_totals_by_category(user_id):
+    return _category_totals(_totals_by_category(user_id, 'income'), 'income')
+
+
+
+
+def get_time_series(user_id, t_type, granularity='day', start=None, end=None):
+    """The user's ``t_type`` totals per day/week/month/year within [start, end] (inclusive dates).
+
+    JSON stores answer from the running totals: month and year buckets from
+    the per-month totals, day and week buckets from the per-day rollup when
+    the range lies within its window. Only what those cannot cover (partial
+    edge months, days before the window) is summed from the date-ordered
+    index. SQL stores run one GROUP BY; either way empty buckets come back
+    as 0.
+    Raises ValueError for an unknown granularity, a bad date, start after
+    end or a range of more than timeseries.MAX_BUCKETS buckets.
+    """
+    if granularity not in timeseries.GRANULARITIES:
+        raise ValueError(f"Unknown granularity {granularity!r}")
+    start = timeseries.as_date(start) if start else None
+    end = timeseries.as_date(end) if end else None
+    if start and end:
+        timeseries.bucket_count(start, end, granularity)  # ✅ Reject bad ranges before reading rows
+
+    sql = _sql_store()
+    if sql:
+        daily = dict(sql.daily_totals(t_type, user_id, _date_bound(start) if start else None,
+                                      _date_bound(end, days=1) if end else None))
+    elif granularity in ('month', 'year'):
+        daily = _monthly_rollup(user_id, t_type, start, end)
+    else:
+        daily = _daily_rollup(user_id, t_type, start, end)
+    return timeseries.series(daily, granularity, start, end)
+
+def _month_end(day):
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+def _monthly_rollup(user_id, t_type, start, end):
+    """Input for timeseries.series with month-or-coarser buckets.
+
+    Each whole month in range is one entry (its total on its first day);
+    partial months at either edge are summed per day from the rows.
+    """
+    daily = {}
+    for month, total in agg.monthly_totals(get_aggregates(), user_id, t_type).items():
+        try:
+            first = timeseries.as_date(month + '-01')
+        except ValueError:  # rows without a date
+            continue
+        if (start and first < start) or (end and _month_end(first) > end):
+            continue  # outside the range, or an edge month (below)
+        daily[first.isoformat()] = total
+    edges = set()
+    if start and start.day != 1:
+        edges.add((start, min(_month_end(start), end) if end else _month_end(start)))
+    if end and end != _month_end(end):
+        edges.add((max(end.replace(day=1), start) if start else end.replace(day=1), end))
+    for lo, hi in edges:
+        daily.update(_daily_totals(user_id, t_type, lo, hi))
+    return daily
+
+def _daily_rollup(user_id, t_type, start, end):
+    """Input for timeseries.series with day or week buckets: the per-day rollup
+    when the range starts inside its window, else the rows themselves."""
+    first = start.isoformat() if start else None
+    if first is None:
+        oldest = next(transaction_index(load_json('transactions.json')).walk(user_id), None)
+        first = (oldest['transaction_date'] or '')[:10] if oldest else agg.day_cutoff()
+    if first >= agg.day_cutoff():
+        return agg.daily_totals(get_aggregates(), user_id, t_type)
+    return _daily_totals(user_id, t_type, start, end)
+
+def _daily_totals(user_id, t_type, start=None, end=None):
+    """{"YYYY-MM-DD": total} of the user's ``t_type`` rows within [start, end] (inclusive dates)."""
+    lo = _date_bound(start) if start else None
+    hi = _date_bound(end, days=1) if end else None
+    daily = {}
+    for t in transaction_index(load_json('transactions.json')).walk(user_id, lo, hi):
+        if t['type'] == t_type:
+            day = (t['transaction_date'] or '')[:10]
+            if day:
+                daily[day] = daily.get(day, 0) + t['amount']
+    return {day: round(total, 2) for day, total in daily.items()}
+
+def get_daily_expenses(user_id, start=None, end=None):
+    """The user's expense totals per day, oldest day first."""
+    return [
+        {"transaction_date": b["period"], "total_amount": b["total"]}
+        for b in get_time_series(user_id, 'expense', 'day', start, end)
+    ]
 
+def get_monthly_expenses(user_id, start=None, end=None):
+    """The user's expense totals per month ('YYYY-MM'), oldest month first."""
+    return [
+        {"month": b["period"], "total_amount": b["total"]}
+        for b in get_time_series(user_id, 'expense', 'month', start, end)
+    ]
 
-def get_daily_expenses():
+def _all_daily_totals(t_type, start=None, end=None):
+    """{"YYYY-MM-DD": total} of every user's ``t_type`` rows within [start, end] (inclusive dates)."""
+    sql = _sql_store()
+    if sql:
+        return dict(sql.daily_totals(t_type, None, _date_bound(start) if start else None,
+                                     _date_bound(end, days=1) if end else None))
     transactions = load_json('transactions.json')
-    expenses = [t for t in transactions if t['type'] == 'expense']
-    daily_totals = {}
-    for t in expenses:
-        daily_totals[t['transaction_date']] = daily_totals.get(t['transaction_date'], 0) + t['amount']
-    return [{"transaction_date": d, "total_amount": amt} for d, amt in daily_totals.items()]
+    if columnar.available():
+        # ✅ Vectorized group-by over the columnar table
+        return dict(columnar.transaction_table(transactions).daily_totals(t_type, start=start, end=end))
+    totals = {}
+    for t in transactions:
+        if t['type'] == t_type:
+            day = timeseries.as_date(t['transaction_date'])
+            if (start is None or day >= start) and (end is None or day <= end):
+                totals[day.isoformat()] = totals.get(day.isoformat(), 0) + float(t['amount'])
+    return {day: round(total, 2) for day, total in totals.items()}
+
+def get_expense_report(granularity='day', start=None, end=None):
+    """Expense totals of all users per day/week/month/year within [start, end], for admins.
+
+    Raises ValueError like get_time_series.
+    """
+    if granularity not in timeseries.GRANULARITIES:
+        raise ValueError(f"Unknown granularity {granularity!r}")
+    start = timeseries.as_date(start) if start else None
+    end = timeseries.as_date(end) if end else None
+    if start and end:
+        timeseries.bucket_count(start, end, granularity)
+    return timeseries.series(_all_daily_totals('expense', start, end), granularity, start, end)
 
 # -------------------- UPDATE & DELETE --------------------
-def update_expense_transaction(expense_id, user_id, category_id, amount, description, date):
+def _update_transaction(t, changes):
+    """Apply ``changes`` to a stored transaction, keeping the index and running totals in sync."""
+    if "transaction_date" in changes:
+        # ✅ Stored canonically; a bare date keeps the row's time of day
+        changes["transaction_date"] = canonical_date(changes["transaction_date"], t.get("transaction_date"))
+        parse_datetime(changes["transaction_date"])  # ✅ Reject a bad date before anything is changed
+    sql = _sql_store()
+    if sql:
+        t.update(changes)
+        sql.update('transactions.json', None, [t])
+        return
+
     transactions = load_json('transactions.json')
-    expense_id = int(expense_id)
-    user_id = int(user_id)
+    index = transaction_index(transactions)
+    aggregates = get_aggregates()
+    deltas = [agg.apply_transaction(aggregates, t, -1)]
+    t.update(changes)
+    index.update(t)
+    deltas.append(agg.apply_transaction(aggregates, t))
+    _save_transactions('update', transactions, [t], aggregates, deltas)
+
+
+def _delete_transactions(doomed):
+    """Remove ``doomed`` rows, keeping the cached list, index and totals in sync."""
+    sql = _sql_store()
+    if sql:
+        sql.delete('transactions.json', None, doomed)
+        return
 
-    updated = False
-    for t in transactions:
-        if int(t['id']) == expense_id and int(t['user_id']) == user_id and t['type'] == 'expense':
-            t.update({
-                "category_id": int(category_id),
-                "amount": float(amount),
-                "description": description,
-                "transaction_date": date
-            })
-            updated = True
-            break  # ✅ Stop after updating
+    transactions = load_json('transactions.json')
+    index = transaction_index(transactions)
+    aggregates = get_aggregates()
+    for t in doomed:
+        index.remove(t)
+    doomed_ids = {id(t) for t in doomed}
+    remaining = [t for t in transactions if id(t) not in doomed_ids]
+    deltas = [agg.apply_transaction(aggregates, t, -1) for t in doomed]
+    transactions[:] = remaining
+    _save_transactions('delete', transactions, doomed, aggregates, deltas)
+
+
+@write_transaction
+def migrate_transaction_dates():
+    """Rewrite legacy 'YYYY-MM-DD' transaction dates in canonical form; returns how many changed."""
+    _touched()
+    transactions = load_json('transactions.json')
+    legacy = [t for t in transactions if len(str(t.get('transaction_date', ''))) == 10]
+    if not legacy:
+        return 0
+
+    sql = _sql_store()
+    if sql:
+        for t in legacy:
+            t['transaction_date'] = canonical_date(t['transaction_date'])
+        sql.update('transactions.json', None, legacy)
+        return len(legacy)
+
+    index = transaction_index(transactions)
+    for t in legacy:
+        t['transaction_date'] = canonical_date(t['transaction_date'])
+        index.update(t)
+    # Month buckets are unchanged, so the running totals stay as they are
+    _save_transactions('update', transactions, legacy, get_aggregates(), [])
+    return len(legacy)
+
+@write_transaction
+def renumber_duplicate_ids():
+    """Give rows that repeat an earlier row's id a fresh one; returns {filename: rows renumbered}.
+
+    Older versions numbered rows ``len(rows) + 1``, which hands out an id
+    again after a delete. Journaling stores address rows by id, so they
+    rewrite a collection whole until its ids are unique again.
+    """
+    _touched()
+    counts = {}
+    for filename in ('transactions.json', 'budgets.json'):
+        if _sql_store():  # primary keys are unique already
+            counts[filename] = 0
+            continue
+        rows = load_json(filename)
+        seen, repeated = set(), []
+        for i, row in enumerate(rows):
+            if int(row['id']) in seen:
+                repeated.append(i)
+            seen.add(int(row['id']))
+        if repeated:
+            first = get_store().next_id(filename, len(repeated))
+            rows = [dict(row) for row in rows]  # ✅ A new list: views built on the old one are dropped with it
+            for n, i in enumerate(repeated):
+                rows[i]['id'] = first + n
+            save_json(filename, rows)
+        counts[filename] = len(repeated)
+    return counts
+
+
+@write_transaction
+def update_expense_transaction(expense_id, user_id, category_id, amount, description, date):
+    _touched(user_id)
+    expense_id = int(expense_id)
 
-    if updated:
-        save_json('transactions.json', transactions)
+    # ✅ Look the row up by user instead of scanning every transaction
+    matches = _find_transactions(user_id, expense_id, 'expense')
+    if matches:
+        _update_transaction(matches[0], {
+            "category_id": int(category_id),
+            "amount": float(amount),
+            "description": description,
+            "transaction_date": date
+        })
     else:
         print(f"⚠️ Expense with ID {expense_id} not found or user mismatch.")
 
 
+@write_transaction
 def delete_expense_transaction(expense_id, user_id):
-    transactions = load_json('transactions.json')
-    transactions = [t for t in transactions if not (t['id'] == expense_id and t['user_id'] == user_id and t['type'] == 'expense')]
-    save_json('transactions.json', transactions)
+    _touched(user_id)
+    _delete_transactions(_find_transactions(user_id, expense_id, 'expense'))
 
 
+@write_transaction
 def update_income_transaction(income_id, user_id, category_id, amount, description, date):
-    transactions = load_json('transactions.json')
-    for t in transactions:
-        if t['id'] == int(income_id) and t['user_id'] == int(user_id) and t['type'] == 'income':
-            t.update({
-                "category_id": int(category_id),
-                "amount": float(amount),
-                "description": description,
-                "transaction_date": date
-            })
-            break
-    save_json('transactions.json', transactions)
+    _touched(user_id)
+    matches = _find_transactions(user_id, income_id, 'income')
+    if matches:
+        _update_transaction(matches[0], {
+            "category_id": int(category_id),
+            "amount": float(amount),
+            "description": description,
+            "transaction_date": date
+        })
 
 
 def get_current_monthly_budget_by_category(user_id):
-    budgets = load_json('budgets.json')
-    categories = load_json('categories.json')
     current_month = datetime.now().month
     current_year = datetime.now().year
+    budgets = _user_budgets(user_id, current_month, current_year)
+    categories = _categories()
 
     results = []
     total_budget = 0.0
     total_consumed = 0.0
 
     for b in budgets:
-        if b['user_id'] == user_id and b['month'] == current_month and b['year'] == current_year:
-            category = next((c for c in categories if c['id'] == b['category_id']), None)
-            if category:
-                budget_amount = b.get('budget_amount', 0.0)
-                consumed = b.get('consumed', 0.0)
-
-                results.append({
-                    "category_name": category['name'],
-                    "budget_amount": budget_amount,
-                    "consumed": consumed,
-                    "color": category.get('color', "#9CA3AF")  # Default gray if missing
-                })
-
-                total_budget += budget_amount
-                total_consumed += consumed
+        category = categories.get(b['category_id'])  # ✅ Hash lookup, no scan per budget
+        if category:
+            budget_amount = b.get('budget_amount', 0.0)
+            consumed = b.get('consumed', 0.0)
+
+            results.append({
+                "category_name": category['name'],
+                "budget_amount": budget_amount,
+                "consumed": consumed,
+                "color": category.get('color', "#9CA3AF")  # Default gray if missing
+            })
+
+            total_budget += budget_amount
+            total_consumed += consumed
 
     return {
         "month": current_month,
@@ -374,49 +1102,89 @@ def get_current_monthly_budget_by_category(user_id):
 
 
 def get_all_monthly_budgets_by_category(user_id):
-    budgets = load_json('budgets.json')
-    categories = load_json('categories.json')
+    budgets = _user_budgets(user_id)
+    categories = _categories()
 
     grouped_results = {}
 
     for b in budgets:
-        if b['user_id'] == user_id:
-            category = next((c for c in categories if c['id'] == b['category_id']), None)
-            if category:
-                key = (b['month'], b['year'])
-                if key not in grouped_results:
-                    grouped_results[key] = {
-                        "month": b['month'],
-                        "month_name": calendar.month_name[b['month']],
-                        "year": b['year'],
-                        "budgets": []
-                    }
-
-                grouped_results[key]["budgets"].append({
-                    "id": b["id"],
-                    "category_id": b["category_id"],
-                    "category_name": category['name'],
-                    "budget_amount": b['budget_amount'],
-                    "consumed": b.get('consumed', 0.00),
-                    "month": b["month"],           # ✅ Added
-                    "year": b["year"],             # ✅ Added
-                    "color": category.get('color', "#9CA3AF")
-                })
+        category = categories.get(b['category_id'])  # ✅ Hash lookup, no scan per budget
+        if category:
+            key = (b['month'], b['year'])
+            if key not in grouped_results:
+                grouped_results[key] = {
+                    "month": b['month'],
+                    "month_name": calendar.month_name[b['month']],
+                    "year": b['year'],
+                    "budgets": []
+                }
+
+            grouped_results[key]["budgets"].append({
+                "id": b["id"],
+                "category_id": b["category_id"],
+                "category_name": category['name'],
+                "budget_amount": b['budget_amount'],
+                "consumed": b.get('consumed', 0.00),
+                "month": b["month"],           # ✅ Added
+                "year": b["year"],             # ✅ Added
+                "color": category.get('color', "#9CA3AF")
+            })
 
     results = sorted(grouped_results.values(), key=lambda x: (x["year"], x["month"]), reverse=True)
     return results
 
 
 
-def add_budget_entry(user_id, category_id, budget_amount, month, year):
-    budgets = load_json('budgets.json')
+# -------------------- DASHBOARD DATA --------------------
+# Every dataset the dashboard draws, batched into one response. Within a
+# request the loads behind them are memoized (@request_cached), so the
+# sections share one read of each data file / one run of each query.
+DASHBOARD_DAYS = 30  # days in the daily expenses chart
+
+def _dashboard_summary(user_id):
+    totals = _type_totals(user_id)
+    return {
+        "total_income": totals['income'],
+        "total_expenses": totals['expense'],
+        "remaining_balance": totals['income'] - totals['expense']
+    }
+
+def _dashboard_daily_expenses(user_id):
+    today = datetime.now().date()
+    return get_time_series(user_id, 'expense', 'day', today - timedelta(days=DASHBOARD_DAYS - 1), today)
 
-    # Generate a new ID (incremental based on max ID)
-    new_id = max([b['id'] for b in budgets], default=0) + 1
+def _dashboard_recent_activity(user_id):
+    return [transaction_json(t) for t in _latest(_recent_rows(user_id, _recent_limit()))]
+
+DASHBOARD_SECTIONS = {
+    "summary": _dashboard_summary,
+    "income_totals": lambda user_id: get_income_totals_by_category(user_id),
+    "expense_totals": lambda user_id: get_expense_totals_by_category(user_id),
+    "current_budgets": lambda user_id: get_current_monthly_budget_by_category(user_id),
+    "daily_expenses": _dashboard_daily_expenses,
+    "recent_activity": _dashboard_recent_activity,
+}
+
+def get_dashboard_data(user_id, fields=None):
+    """{section: data} for the requested DASHBOARD_SECTIONS (all of them by default).
+
+    Raises ValueError for an unknown section name.
+    """
+    fields = list(DASHBOARD_SECTIONS) if not fields else list(dict.fromkeys(fields))
+    unknown = [f for f in fields if f not in DASHBOARD_SECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown dashboard field(s): {', '.join(unknown)}")
+    return {f: DASHBOARD_SECTIONS[f](user_id) for f in fields}
+
+
+@write_transaction
+def add_budget_entry(user_id, category_id, budget_amount, month, year):
+    _touched(user_id)
+    sql = _sql_store()
 
     # Create new budget record
     new_budget = {
-        "id": new_id,
+        "id": None,
         "user_id": int(user_id),
         "category_id": int(category_id),
         "budget_amount": float(budget_amount),
@@ -425,16 +1193,28 @@ def add_budget_entry(user_id, category_id, budget_amount, month, year):
         "year": year,
         "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     }
+    if sql:
+        sql.insert('budgets.json', None, [new_budget])  # ✅ Id assigned by the database
+        return
 
+    # Generate a new ID (from the store's persistent sequence)
+    new_budget["id"] = get_store().next_id('budgets.json')
+    budgets = load_json('budgets.json')
+    index = budget_index(budgets)
     budgets.append(new_budget)
-    save_json('budgets.json', budgets)
+    index.add(new_budget)
+    get_store().insert('budgets.json', budgets, [new_budget])
 
 
+@write_transaction
 def update_budget_entry(budget_id, category_id, budget_amount, consumed, month, year):
-    budgets = load_json('budgets.json')
-    budget = next((b for b in budgets if b['id'] == budget_id), None)
+    sql = _sql_store()
+    budgets = None if sql else load_json('budgets.json')
+    index = None if sql else budget_index(budgets)
+    budget = sql.get_budget(budget_id) if sql else index.get(budget_id)
     if not budget:
         raise ValueError(f"Budget with ID {budget_id} not found.")
+    _touched(budget['user_id'])
 
     # ✅ Validation: Budget amount cannot be less than consumed
     if float(budget_amount) < float(budget['consumed']):
@@ -446,30 +1226,47 @@ def update_budget_entry(budget_id, category_id, budget_amount, consumed, month,
     budget['consumed'] = float(consumed)  # Read-only but persisted
     budget['month'] = int(month)
     budget['year'] = int(year)
+    if index is not None:
+        index.update(budget)
 
-    save_json('budgets.json', budgets)
+    get_store().update('budgets.json', budgets, [budget])
 
 
 
+@write_transaction
 def delete_budget_entry(budget_id):
+    sql = _sql_store()
+    if sql:
+        budget = sql.get_budget(budget_id)
+        if not budget:
+            raise ValueError(f"Budget with ID {budget_id} not found.")
+        _touched(budget['user_id'])
+        sql.delete('budgets.json', None, [budget])
+        return
+
     budgets = load_json('budgets.json')
 
     # Check if budget exists
-    budget = next((b for b in budgets if b['id'] == budget_id), None)
+    index = budget_index(budgets)
+    budget = index.get(budget_id)
     if not budget:
         raise ValueError(f"Budget with ID {budget_id} not found.")
+    _touched(budget['user_id'])
 
-    # Remove the budget
-    budgets = [b for b in budgets if b['id'] != budget_id]
+    # Remove the budget (in place, so the cached list and its index stay in step)
+    index.remove(budget)
+    budgets[:] = [b for b in budgets if b is not budget]
 
-    save_json('budgets.json', budgets)
+    get_store().delete('budgets.json', budgets, [budget])
 
 
+@write_transaction
 def add_expense_category(user_id, name, color, category_type):
+    _touched()  # categories are shared
     categories = load_json('categories.json')
 
-    # Generate new incremental ID
-    new_id = max([c['id'] for c in categories], default=0) + 1
+    # Generate new incremental ID (from the store's persistent sequence)
+    new_id = get_store().next_id('categories.json')
 
     new_category = {
         "id": new_id,
@@ -481,27 +1278,21 @@ def add_expense_category(user_id, name, color, category_type):
     }
 
     categories.append(new_category)
-    save_json('categories.json', categories)
+    get_store().insert('categories.json', categories, [new_category])
+    drop_view("categories")
 
 
+@write_transaction
 def delete_category(category_id, user_id):
+    _touched()  # categories are shared
     categories = load_json('categories.json')
-    categories = [c for c in categories if not (c['id'] == category_id and c['user_id'] == user_id)]
-    save_json('categories.json', categories)
+    doomed = [c for c in categories if c['id'] == category_id and c['user_id'] == user_id]
+    categories[:] = [c for c in categories if not (c['id'] == category_id and c['user_id'] == user_id)]
+    get_store().delete('categories.json', categories, doomed)
+    drop_view("categories")
 
 
+@write_transaction
 def delete_income_transaction(income_id, user_id):
-    transactions = load_json('transactions.json')
-    transactions = [
-        t for t in transactions 
-        if not (t['id'] == income_id and t['user_id'] == user_id and t['type'] == 'income')
-    ]
-    save_json('transactions.json', transactions)
-
-
-
-
-
-
-
-
+    _touched(user_id)
+    _delete_transactions(_find_transactions(user_id, income_id, 'income'))
@@ -0,0 +1,92 @@
+import sys
+import threading
+from collections import OrderedDict
+from flask import current_app, has_app_context
+
+
+# -------------------- PAGE CACHE --------------------
+# Rendered pages per process, keyed by (page, user, data version, ...). A
+# write bumps the user's data version, so their old pages are never served
+# again; models also drops them here right away to free the memory.
+class PageCache:
+    """LRU cache of rendered HTML holding at most ``max_bytes``.
+
+    Entries belong to a scope (a user id) so that all of a user's pages can
+    be dropped at once.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (scope, html, size)
+        self._by_scope = {}            # scope -> {key}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, scope, html):
+        size = sys.getsizeof(html)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (scope, html, size)
+            self._by_scope.setdefault(scope, set()).add(key)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._discard(next(iter(self._entries)))  # least recently used
+
+    def invalidate(self, scopes):
+        """Drop the pages of ``scopes``; the global scope '*' drops everything."""
+        with self._lock:
+            if '*' in scopes:
+                self._entries.clear()
+                self._by_scope.clear()
+                self.size = 0
+                return
+            for scope in scopes:
+                for key in list(self._by_scope.get(scope, ())):
+                    self._discard(key)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        scope, _, size = entry
+        self.size -= size
+        keys = self._by_scope[scope]
+        keys.discard(key)
+        if not keys:
+            del self._by_scope[scope]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def get_cache():
+    """The app's page cache, or None when PAGE_CACHE_MAX_BYTES is 0 (or unset)."""
+    max_bytes = current_app.config.get('PAGE_CACHE_MAX_BYTES', 0)
+    if not max_bytes:
+        return None
+    cache = current_app.extensions.get('page_cache')
+    if cache is None or cache.max_bytes != max_bytes:
+        cache = current_app.extensions['page_cache'] = PageCache(max_bytes)
+    return cache
+
+
+def invalidate(scopes):
+    """Drop the cached pages of ``scopes`` (user ids as strings, or '*')."""
+    if has_app_context():
+        cache = get_cache()
+        if cache is not None:
+            cache.invalidate(scopes)
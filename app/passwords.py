@@ -0,0 +1,146 @@
+import os
+import time
+import threading
+import multiprocessing
+import bcrypt
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app, has_app_context
+
+
+# -------------------- PASSWORD HASHING --------------------
+# bcrypt is slow on purpose, and it holds the calling thread for the whole
+# hash. With PASSWORD_HASH_WORKERS > 0 hashing and verification run in a
+# bounded pool of worker processes instead, so a burst of logins queues
+# there (visible in stats()) rather than pinning every request thread.
+DEFAULT_ROUNDS = 12  # bcrypt.gensalt()'s default cost
+OPERATIONS = ('hash', 'verify')
+
+
+def _setting(name, default):
+    return current_app.config.get(name, default) if has_app_context() else default
+
+
+def rounds():
+    """The configured bcrypt work factor (BCRYPT_ROUNDS)."""
+    return int(_setting('BCRYPT_ROUNDS', DEFAULT_ROUNDS))
+
+
+def rounds_of(hashed):
+    """The work factor a '$2b$12$...' hash was made with (None if unreadable)."""
+    try:
+        return int(hashed.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed):
+    """Whether a stored hash was made with a cost other than the configured one."""
+    return rounds_of(hashed) != rounds()
+
+
+# -------------------- WORKER FUNCTIONS --------------------
+# Run in the pool's processes: plain bytes in, (result, seconds spent) out.
+def _hash(password, cost):
+    started = time.perf_counter()
+    hashed = bcrypt.hashpw(password, bcrypt.gensalt(cost))
+    return hashed, time.perf_counter() - started
+
+
+def _verify(password, hashed):
+    started = time.perf_counter()
+    matches = bcrypt.checkpw(password, hashed)
+    return matches, time.perf_counter() - started
+
+
+# -------------------- POOL & METRICS --------------------
+class HashPool:
+    """Runs bcrypt jobs on ``workers`` processes (inline when 0) and times them.
+
+    Per operation it keeps the call count, the total wall time callers waited
+    and the part of it spent hashing; the difference is time queued behind
+    other logins. ``pending`` is the number of jobs submitted but not done.
+    """
+
+    def __init__(self, workers=0):
+        self.workers = workers
+        self._executor = None
+        if workers:
+            # ✅ spawn, not fork: forking a threaded server process can copy held locks
+            self._executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.max_pending = 0
+        self._metrics = {op: {"count": 0, "seconds": 0.0, "work_seconds": 0.0, "max_seconds": 0.0}
+                         for op in OPERATIONS}
+
+    def run(self, op, func, *args):
+        started = time.perf_counter()
+        with self._lock:
+            self.pending += 1
+            self.max_pending = max(self.max_pending, self.pending)
+        try:
+            if self._executor is None:
+                result, work = func(*args)
+            else:
+                result, work = self._executor.submit(func, *args).result()
+        finally:
+            with self._lock:
+                self.pending -= 1
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            m = self._metrics[op]
+            m["count"] += 1
+            m["seconds"] += elapsed
+            m["work_seconds"] += work
+            m["max_seconds"] = max(m["max_seconds"], elapsed)
+        return result
+
+    def stats(self):
+        """Queue depth plus per-operation latency (milliseconds), for monitoring."""
+        with self._lock:
+            operations = {}
+            for op, m in self._metrics.items():
+                count = m["count"] or 1
+                operations[op] = {
+                    "count": m["count"],
+                    "avg_ms": round(m["seconds"] / count * 1000, 2),
+                    "avg_queue_ms": round((m["seconds"] - m["work_seconds"]) / count * 1000, 2),
+                    "max_ms": round(m["max_seconds"] * 1000, 2),
+                }
+            return {
+                "workers": self.workers,
+                "pending": self.pending,
+                "max_pending": self.max_pending,
+                "rounds": rounds(),
+                "operations": operations,
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool():
+    """This process's pool for the configured PASSWORD_HASH_WORKERS."""
+    key = (os.getpid(), int(_setting('PASSWORD_HASH_WORKERS', 0)))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = HashPool(key[1])
+        return _pools[key]
+
+
+def stats():
+    return get_pool().stats()
+
+
+# -------------------- PUBLIC API --------------------
+def hash_password(password):
+    return get_pool().run('hash', _hash, password.encode('utf-8'), rounds()).decode('utf-8')
+
+
+def verify_password(stored_password, provided_password):
+    return get_pool().run('verify', _verify, provided_password.encode('utf-8'), stored_password.encode('utf-8'))
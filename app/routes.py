@@ -1,9 +1,9 @@
-from flask import Blueprint, render_template, request, redirect, session, url_for, flash
-from app import models
+from flask import Blueprint, render_template, request, redirect, session, url_for, flash, get_flashed_messages, current_app, Response, stream_with_context
+from app import bulk, models, pagecache, passwords, sessions
+from functools import wraps
 from datetime import date
 from datetime import datetime
 from flask import jsonify
-import json
 
 main = Blueprint('main', __name__, template_folder='../templates')
 
@@ -12,16 +12,54 @@ def index():
     return redirect(url_for('main.login'))
 
 
+@main.app_context_processor
+def inject_current_user():
+    """The logged-in user's profile, from the session (loaded once if it is not there yet)."""
+    user_id = session.get('user_id')
+    profile = session.get('user')
+    if user_id is not None and (profile is None or profile.get('id') != user_id):
+        profile = session['user'] = models.user_profile(user_id)
+    return {'current_user': profile if user_id is not None else None}
+
+
+def cached_page(view):
+    """Serve a logged-in page from the page cache while the user's data is unchanged.
+
+    The key holds the user's data version, today's date (pages show the
+    current day and month) and the full URL (filters). Pages that show a
+    flash message are never cached or served from the cache.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = pagecache.get_cache()
+        if cache is None or 'user_id' not in session or '_flashes' in session:
+            return view(*args, **kwargs)
+
+        user_id = session['user_id']
+        key = (request.endpoint, user_id, models.data_version(user_id), date.today().isoformat(), request.full_path)
+        html = cache.get(key)
+        if html is not None:
+            return html
+
+        html = view(*args, **kwargs)
+        if isinstance(html, str) and not get_flashed_messages():
+            cache.put(key, str(user_id), html)
+        return html
+    return wrapper
+
+
 @main.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
 
-        user = models.get_user_by_username(username)
+        user = models.authenticate(username, password)
 
-        if user and models.verify_password(user['password'], password):
+        if user:
+            sessions.regenerate(session)
             session['user_id'] = user['id']
+            session['user'] = models.user_profile(user['id'])  # ✅ Cached for every later page
             flash("Login successful!", "success")  # ✅ Success flash message
             return redirect(url_for('main.dashboard'))
         else:
@@ -31,39 +69,38 @@ def login():
 
 
 
+DASHBOARD_CHARTS = ['income_totals', 'expense_totals', 'daily_expenses']  # sections drawn on the page
+
+
 @main.route('/dashboard')
+@cached_page
 def dashboard():
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
 
     user_id = session['user_id']
-    total_income = models.get_total_income(user_id)
-    total_expenses = models.get_total_expenses(user_id)
-    remaining_balance = models.get_remaining_balance(user_id)
+    # ✅ Totals and chart data in one batch; the charts ship inside the (page-cached) HTML
+    data = models.get_dashboard_data(user_id, ['summary'] + DASHBOARD_CHARTS)
+    summary = data['summary']
     transactions = models.get_all_transactions(user_id)
 
-    # Convert string dates to datetime objects
+    # transaction_date arrives as a datetime already; only created_at is still a string
     for tx in transactions:
-        if isinstance(tx.get('transaction_date'), str):
-            tx['transaction_date'] = datetime.strptime(tx['transaction_date'], "%Y-%m-%d")
         if tx.get('created_at') and isinstance(tx['created_at'], str):
             # Assuming created_at is ISO format like '2025-07-24 02:07:17'
-            tx['created_at'] = datetime.strptime(tx['created_at'], "%Y-%m-%d %H:%M:%S")
-
-    expense_totals_by_category = models.get_expense_totals_by_category(user_id)
-    expense_totals_json = json.dumps(expense_totals_by_category, default=float)
+            tx['created_at'] = models.parse_datetime(tx['created_at'])
 
     current_date = date.today().isoformat()
 
     return render_template(
         'dashboard.html',
-        total_income=total_income,
-        total_expenses=total_expenses,
-        remaining_balance=remaining_balance,
+        total_income=summary['total_income'],
+        total_expenses=summary['total_expenses'],
+        remaining_balance=summary['remaining_balance'],
         transactions=transactions,
+        charts={field: data[field] for field in DASHBOARD_CHARTS},
         income_categories=models.get_all_income_categories(),
         expense_categories=models.get_all_expense_categories(),
-        expense_totals_json=expense_totals_json,
         current_date=current_date
     )
 
@@ -108,14 +145,30 @@ def add_expense():
 
 
 
+def _conditional_json(compute, *variant):
+    """JSON of ``compute()`` for the logged-in user, validated by their data version.
+
+    The strong ETag is the user's data version (plus ``variant``, for anything
+    else the result depends on). A request whose If-None-Match still matches
+    gets a 304 without ``compute`` running or anything being serialized.
+    """
+    etag = '-'.join([models.data_version(session['user_id']), *map(str, variant)])
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(compute())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = current_app.config.get('API_CACHE_CONTROL', 'private, no-cache')
+    return response
+
+
 @main.route('/api/expense-totals', methods=['GET'])
 def expense_totals():
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
     try:
         user_id = session['user_id']
-        data = models.get_expense_totals_by_category(user_id)
-        return jsonify(data), 200
+        return _conditional_json(lambda: models.get_expense_totals_by_category(user_id))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -126,8 +179,7 @@ def income_totals():
         return jsonify({'error': 'Unauthorized'}), 401
     try:
         user_id = session['user_id']
-        data = models.get_income_totals_by_category(user_id)
-        return jsonify(data), 200
+        return _conditional_json(lambda: models.get_income_totals_by_category(user_id))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -138,41 +190,230 @@ def monthly_expenses():
         return jsonify({'error': 'Unauthorized'}), 401
     try:
         user_id = session['user_id']
-        data = models.get_monthly_expenses(user_id)  # <-- Correct function
+        data = models.get_monthly_expenses(user_id, request.args.get('start'), request.args.get('end'))
         return jsonify(data), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@main.route('/api/dashboard', methods=['GET'])
+def dashboard_data():
+    """All dashboard datasets in one response; ``fields=a,b`` picks sections (see models.DASHBOARD_SECTIONS)."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+    try:
+        user_id = session['user_id']
+        # ✅ Sections depend on today's date (daily chart, current month's budgets) and on the selection
+        return _conditional_json(lambda: models.get_dashboard_data(user_id, fields),
+                                 date.today().strftime('%Y%m%d'), '+'.join(fields) or 'all')
+    except ValueError as e:  # unknown section names
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@main.route('/api/time-series', methods=['GET'])
+def time_series():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    t_type = request.args.get('type', 'expense')
+    if t_type not in ('expense', 'income'):
+        return jsonify({'error': 'Invalid type'}), 400
+    try:
+        data = models.get_time_series(session['user_id'], t_type,
+                                      request.args.get('granularity', 'day'),
+                                      request.args.get('start'), request.args.get('end'))
+        return jsonify(data), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
 
+@main.route('/api/recent-activity', methods=['GET'])
+def recent_activity():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    limit = request.args.get('limit', current_app.config['RECENT_TRANSACTIONS_LIMIT'], type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if not 0 < limit <= current_app.config['RECENT_ACTIVITY_MAX_LIMIT'] or offset < 0:
+        return jsonify({'error': 'Invalid limit or offset'}), 400
+    try:
+        data = models.get_recent_activity(session['user_id'], limit, offset)
+        return jsonify(data), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@main.route('/api/transactions/import', methods=['POST'])
+def import_transactions():
+    """Bulk-import an uploaded CSV or JSON Lines file (form field ``file``, optional ``format``)."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'error': 'No file uploaded'}), 400
+    try:
+        fmt = bulk.detect_format(upload.filename, request.form.get('format'))
+        records = bulk.read_records(bulk.text_stream(upload.stream), fmt)
+        count = models.import_transactions(session['user_id'], records)
+        return jsonify({'imported': count}), 200
+    except models.ImportValidationError as e:
+        limit = current_app.config['IMPORT_ERRORS_SHOWN']
+        return jsonify({'error': str(e), 'errors': e.errors[:limit], 'error_count': len(e.errors)}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@main.route('/api/export/<dataset>', methods=['GET'])
+def export(dataset):
+    """Stream one of models.EXPORTS as CSV or JSON Lines (``format``), optionally within ``start``/``end``."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    if dataset not in models.EXPORTS:
+        return jsonify({'error': f'Unknown export {dataset!r}'}), 404
+    fmt = request.args.get('format', 'csv')
+    if fmt not in bulk.FORMATS:
+        return jsonify({'error': f'Unknown format {fmt!r}'}), 400
+
+    fields, export_rows = models.EXPORTS[dataset]
+    options = {'t_type': request.args.get('type') or None} if dataset == 'transactions' else {}
+    try:
+        records = export_rows(session['user_id'], request.args.get('start'), request.args.get('end'), **options)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # ✅ Rows are produced while the response is sent; nothing is built up front
+    return Response(
+        stream_with_context(bulk.write_records(records, fmt, fields)),
+        mimetype=bulk.MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{dataset}.{fmt}"'}
+    )
+
+
+@main.route('/api/metrics/passwords', methods=['GET'])
+def password_metrics():
+    """Queue depth and latency of this process's bcrypt pool (login and registration cost); admins only."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    if not _is_admin(session['user_id']):
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify(passwords.stats()), 200
+
+
+def _is_admin(user_id):
+    profile = models.user_profile(user_id)  # ✅ Fresh, not the session's cached copy
+    return bool(profile) and profile['type'] == 'admin'
+
+
+@main.route('/api/admin/expenses', methods=['GET'])
+def expense_report():
+    """Every user's expense totals per day/week/month/year (``granularity``, ``start``, ``end``); admins only."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    if not _is_admin(session['user_id']):
+        return jsonify({'error': 'Forbidden'}), 403
+    try:
+        data = models.get_expense_report(request.args.get('granularity', 'day'),
+                                         request.args.get('start'), request.args.get('end'))
+        return jsonify(data), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @main.route('/api/current-monthly-budgets', methods=['GET'])
 def monthly_budgets():
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
     try:
         user_id = session['user_id']
-        data = models.get_current_monthly_budget_by_category(user_id)
-        return jsonify(data), 200
+        # ✅ The current month is part of the answer, so it is part of the ETag
+        return _conditional_json(lambda: models.get_current_monthly_budget_by_category(user_id),
+                                 datetime.now().strftime('%Y%m'))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+
+def _listing_filters():
+    """Filter, sort and cursor arguments of a listing request, for models.list_transactions."""
+    args = request.args
+    return {
+        "start": args.get('start') or None,
+        "end": args.get('end') or None,
+        "category_id": args.get('category_id', type=int),
+        "sort": args.get('sort', 'date'),
+        "descending": args.get('order', 'desc') != 'asc',
+        "cursor": args.get('cursor') or None,
+    }
+
+
+def _listing_page(t_type):
+    """First page of a listing plus what its template needs to fetch the rest."""
+    # Filters for the form and the API: the request's, minus any cursor (the page sets it)
+    query = {k: v for k, v in request.args.items() if k != 'cursor'}
+    try:
+        rows, next_cursor = models.list_transactions(session['user_id'], t_type, **_listing_filters())
+    except ValueError as e:
+        flash(f"Invalid filter: {e}", "danger")
+        rows, next_cursor = models.list_transactions(session['user_id'], t_type)
+        query = {}
+    return rows, next_cursor, query
+
+
+def _listing_api(t_type):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    limit = request.args.get('limit', current_app.config['TRANSACTIONS_PAGE_SIZE'], type=int)
+    if not 0 < limit <= current_app.config['TRANSACTIONS_PAGE_MAX']:
+        return jsonify({'error': 'Invalid limit'}), 400
+    try:
+        rows, next_cursor = models.list_transactions(session['user_id'], t_type, limit=limit, **_listing_filters())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        return jsonify({
+            'items': [models.transaction_json(t) for t in rows],
+            'next_cursor': next_cursor
+        }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@main.route('/api/expenses', methods=['GET'])
+def api_expenses():
+    return _listing_api('expense')
+
+
+@main.route('/api/income', methods=['GET'])
+def api_income():
+    return _listing_api('income')
+
 
 @main.route('/dashboard/expenses')
+@cached_page
 def expenses():
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
 
-    user_id = session['user_id']
-
-    # Fetch all expense transactions for this user
-    expenses_transactions = models.get_all_expense_transactions(user_id)
+    # ✅ Only the first page; expenses.js fetches the rest from /api/expenses
+    expenses_transactions, next_cursor, query = _listing_page('expense')
 
     # Fetch all expense categories for this user
     expense_categories = models.get_all_expense_categories()
 
     return render_template('expenses.html', 
                            expenses=expenses_transactions, 
-                           categories=expense_categories)
+                           categories=expense_categories,
+                           next_cursor=next_cursor,
+                           filters=query)
 
 @main.route('/categories/add', methods=['POST'])
 def add_expense_category():
@@ -212,23 +453,25 @@ def add_income_category():
 
 
 @main.route('/dashboard/income')
+@cached_page
 def income():
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
 
-    user_id = session['user_id']
-
-    # Fetch all income transactions for this user
-    income_transactions = models.get_all_income_transactions(user_id)
+    # ✅ Only the first page; income.js fetches the rest from /api/income
+    income_transactions, next_cursor, query = _listing_page('income')
 
     # Fetch all income categories for this user
     income_categories = models.get_all_income_categories()
 
     return render_template('income.html', 
                            incomes=income_transactions, 
-                           categories=income_categories)
+                           categories=income_categories,
+                           next_cursor=next_cursor,
+                           filters=query)
 
 @main.route('/dashboard/budgets')
+@cached_page
 def budgets():
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
@@ -0,0 +1,204 @@
+import os
+import re
+import json
+import time
+import secrets
+import tempfile
+import threading
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+
+# -------------------- SESSION BACKENDS --------------------
+# With SESSION_BACKEND 'memory' or 'files' the session lives on the server and
+# the cookie only carries a random id; 'cookie' keeps Flask's signed-cookie
+# sessions. A backend is any object with get/set/delete (see MemorySessions);
+# pass an instance as SESSION_BACKEND to plug in another one.
+class MemorySessions:
+    """Sessions in this process's memory (one worker process, or tests)."""
+
+    def __init__(self):
+        self._sessions = {}  # sid -> (expires_at, data)
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        with self._lock:
+            entry = self._sessions.get(sid)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._sessions[sid]
+                return None
+            return dict(entry[1])
+
+    def set(self, sid, data, lifetime):
+        with self._lock:
+            self._sessions[sid] = (time.time() + lifetime, dict(data))
+
+    def delete(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+
+class FileSessions:
+    """One JSON file per session under ``path`` (shared by every worker process).
+
+    Sessions that expire without being read again are removed by a sweep of
+    the directory, run from ``set`` at most every ``sweep_interval`` seconds.
+    """
+
+    def __init__(self, path, sweep_interval=3600):
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.time() + sweep_interval
+        self._lock = threading.Lock()
+
+    def _file(self, sid):
+        return os.path.join(self.path, f"{sid}.json")
+
+    def get(self, sid):
+        try:
+            with open(self._file(sid), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry['expires_at'] < time.time():
+            self.delete(sid)
+            return None
+        return entry['data']
+
+    def set(self, sid, data, lifetime):
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix=f".{sid}.json.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'expires_at': time.time() + lifetime, 'data': data}, f)
+            os.replace(tmp, self._file(sid))
+        except BaseException:
+            os.remove(tmp)
+            raise
+        self._maybe_sweep()
+
+    def delete(self, sid):
+        try:
+            os.remove(self._file(sid))
+        except FileNotFoundError:
+            pass
+
+    def _maybe_sweep(self):
+        now = time.time()
+        with self._lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + self.sweep_interval
+        self.sweep(now)
+
+    def sweep(self, now=None):
+        """Remove expired sessions (and temp files left by a crash); returns how many."""
+        now = time.time() if now is None else now
+        removed = 0
+        for entry in os.scandir(self.path):
+            try:
+                if entry.name.endswith('.tmp'):
+                    expired = entry.stat().st_mtime < now - self.sweep_interval
+                elif entry.name.endswith('.json'):
+                    with open(entry.path, 'r', encoding='utf-8') as f:
+                        expired = json.load(f)['expires_at'] < now
+                else:
+                    continue
+                if expired:
+                    os.remove(entry.path)
+                    removed += 1
+            except (OSError, ValueError, KeyError):
+                continue  # removed meanwhile, or being replaced: the next sweep sees it
+        return removed
+
+
+# -------------------- SESSION INTERFACE --------------------
+_SID = re.compile(r'[A-Za-z0-9_-]{43}')  # secrets.token_urlsafe(32); anything else is ignored
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, data=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(data, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.replaced_sid = None
+
+
+def regenerate(session):
+    """Give a server-side session a fresh id (call on login, against session
+    fixation); the old id stops working. Cookie sessions are left alone."""
+    if isinstance(session, ServerSession):
+        session.replaced_sid = session.replaced_sid or session.sid
+        session.sid = secrets.token_urlsafe(32)
+        session.modified = True
+
+
+class ServerSessionInterface(SessionInterface):
+    """Keeps session data in ``backend``; the cookie holds only the session id.
+
+    A backend may be a callable taking the app (resolved on first use), so
+    backends that depend on app.config (e.g. DATA_PATH) see its final values.
+    """
+
+    def __init__(self, backend):
+        self._backend = backend
+        self._lock = threading.Lock()
+
+    def backend(self, app):
+        if not callable(getattr(self._backend, 'get', None)):
+            with self._lock:
+                if not callable(getattr(self._backend, 'get', None)):
+                    self._backend = self._backend(app)
+        return self._backend
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        data = self.backend(app).get(sid) if sid and _SID.fullmatch(sid) else None
+        if data is None:
+            return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+        return ServerSession(data, sid=sid)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.replaced_sid:
+            self.backend(app).delete(session.replaced_sid)
+        if not session:
+            if session.modified:
+                self.backend(app).delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if not session.modified and not self.should_set_cookie(app, session):
+            return
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        if session.modified:
+            self.backend(app).set(session.sid, dict(session), lifetime)
+        response.vary.add('Cookie')
+        response.set_cookie(
+            name, session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain, path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def session_interface(backend):
+    """The session interface for a SESSION_BACKEND setting (None: Flask's signed cookies)."""
+    if backend == 'cookie':
+        return None
+    if backend == 'memory':
+        return ServerSessionInterface(MemorySessions())
+    if backend == 'files':
+        return ServerSessionInterface(lambda app: FileSessions(os.path.join(app.config['DATA_PATH'], 'sessions'),
+                                                               app.config.get('SESSION_SWEEP_INTERVAL', 3600)))
+    if isinstance(backend, str):
+        raise ValueError(f"Unknown SESSION_BACKEND {backend!r}")
+    return ServerSessionInterface(backend)
@@ -0,0 +1,576 @@
+import os
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager, nullcontext
+from app.storage import JsonStore
+from app.indexes import canonical_date, username_key
+
+try:
+    from mysql.connector import pooling as mysql_pooling
+except ImportError:  # only needed for STORAGE_BACKEND = 'mysql'
+    mysql_pooling = None
+
+
+# -------------------- SCHEMA --------------------
+# Data file name -> (table, columns). Files that are not listed here (e.g.
+# aggregates.json) still live as JSON files in DATA_PATH.
+TABLES = {
+    'users.json': ('users', ['id', 'username', 'password', 'type', 'created_at']),
+    'categories.json': ('categories', ['id', 'user_id', 'name', 'type', 'color', 'created_at']),
+    'transactions.json': ('transactions', [
+        'id', 'user_id', 'category_id', 'type', 'amount', 'description', 'transaction_date', 'created_at'
+    ]),
+    'budgets.json': ('budgets', [
+        'id', 'user_id', 'category_id', 'budget_amount', 'consumed', 'month', 'year', 'created_at'
+    ]),
+}
+
+SQLITE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        username TEXT NOT NULL,
+        password TEXT NOT NULL,
+        type TEXT,
+        created_at TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS categories (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        name TEXT NOT NULL,
+        type TEXT NOT NULL,
+        color TEXT,
+        created_at TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        type TEXT NOT NULL,
+        amount REAL NOT NULL,
+        description TEXT,
+        transaction_date TEXT NOT NULL,
+        created_at TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS budgets (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        budget_amount REAL NOT NULL,
+        consumed REAL NOT NULL DEFAULT 0,
+        month INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        created_at TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_user_type_date ON transactions (user_id, type, transaction_date)",
+    "CREATE INDEX IF NOT EXISTS idx_budgets_user_category_period ON budgets (user_id, category_id, month, year)",
+    "CREATE INDEX IF NOT EXISTS idx_users_username ON users (username COLLATE NOCASE)",
+]
+
+
+# Same tables for MySQL. Dates stay strings (as in the JSON files) so rows
+# round-trip unchanged; VARCHAR keeps transaction_date indexable.
+MYSQL_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTO_INCREMENT,
+        username VARCHAR(255) NOT NULL,
+        password VARCHAR(255) NOT NULL,
+        type VARCHAR(32),
+        created_at VARCHAR(32),
+        INDEX idx_users_username (username)
+    ) ENGINE=InnoDB""",
+    """CREATE TABLE IF NOT EXISTS categories (
+        id INTEGER PRIMARY KEY AUTO_INCREMENT,
+        user_id INTEGER,
+        name VARCHAR(255) NOT NULL,
+        type VARCHAR(32) NOT NULL,
+        color VARCHAR(32),
+        created_at VARCHAR(32)
+    ) ENGINE=InnoDB""",
+    """CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY AUTO_INCREMENT,
+        user_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        type VARCHAR(32) NOT NULL,
+        amount DOUBLE NOT NULL,
+        description TEXT,
+        transaction_date VARCHAR(32) NOT NULL,
+        created_at VARCHAR(32),
+        INDEX idx_transactions_user_type_date (user_id, type, transaction_date)
+    ) ENGINE=InnoDB""",
+    """CREATE TABLE IF NOT EXISTS budgets (
+        id INTEGER PRIMARY KEY AUTO_INCREMENT,
+        user_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        budget_amount DOUBLE NOT NULL,
+        consumed DOUBLE NOT NULL DEFAULT 0,
+        month INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        created_at VARCHAR(32),
+        INDEX idx_budgets_user_category_period (user_id, category_id, month, year)
+    ) ENGINE=InnoDB""",
+]
+
+
+def _row_values(columns, row):
+    return tuple(row.get(c) for c in columns)
+
+
+# -------------------- SQL STORE --------------------
+class SqlStore(JsonStore):
+    """Keeps users, categories, transactions and budgets in an SQL database.
+
+    ``load``/``save`` and the record operations keep the JsonStore contract
+    for the four data files, so every model function keeps working; the
+    ``*_for``/``find_*`` query methods let the hot summary and report paths
+    push filtering and SUM/GROUP BY into indexed SQL instead. Any other file
+    is still stored as JSON in DATA_PATH.
+
+    Statements are written with ``?`` placeholders and translated to the
+    driver's ``placeholder``; subclasses provide ``cursor()``.
+    """
+
+    supports_sql = True
+    schema = ()
+    placeholder = '?'
+    batch_size = None  # rows per bulk INSERT (None: all at once)
+    username_match = "username = ?"  # case-insensitive under MySQL's default collation
+
+    def cursor(self, transaction=False):
+        """Context manager yielding a cursor; with ``transaction=True`` the
+        block's statements commit together (or roll back if it raises)."""
+        raise NotImplementedError
+
+    def transaction(self):
+        """No file lock for model writes: the database serializes them, and
+        check-and-update steps are single guarded statements."""
+        return nullcontext()
+
+    def next_id(self, filename, count=1):
+        """Table rows get their id from the database on insert (written back to the row)."""
+        if filename in TABLES:
+            return None
+        return super().next_id(filename, count)
+
+    def _sql(self, sql):
+        return sql if self.placeholder == '?' else sql.replace('?', self.placeholder)
+
+    @staticmethod
+    def _fetch(cursor):
+        columns = [d[0] for d in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def create_schema(self):
+        with self.cursor() as cur:
+            for statement in self.schema:
+                cur.execute(statement)
+
+    def query(self, sql, params=(), prepared=False):
+        """Rows of a SELECT as dicts. ``prepared`` marks hot statements worth
+        keeping prepared on the server (drivers without that ignore it)."""
+        with self.cursor() as cur:
+            cur.execute(self._sql(sql), params)
+            return self._fetch(cur)
+
+    def execute(self, sql, params=()):
+        """Run one write statement; returns the number of affected rows."""
+        with self.cursor() as cur:
+            cur.execute(self._sql(sql), params)
+            return cur.rowcount
+
+    # ---------- JsonStore contract ----------
+    def load(self, filename, create=False):
+        if filename not in TABLES:
+            return super().load(filename, create)
+        table, columns = TABLES[filename]
+        return self.query(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id")
+
+    def save(self, filename, data):
+        """Replace the table's rows; rows without an id get one from the database."""
+        if filename not in TABLES:
+            return super().save(filename, data)
+        table, columns = TABLES[filename]
+        with self.cursor(transaction=True) as cur:
+            cur.execute(f"DELETE FROM {table}")
+            self._insert_many(cur, table, columns, [r for r in data if r.get('id') is not None])
+            self._insert_rows(cur, table, columns, [r for r in data if r.get('id') is None])
+
+    def _insert_many(self, cur, table, columns, rows):
+        sql = self._sql(
+            f"REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+        )
+        values = [_row_values(columns, r) for r in rows]
+        step = self.batch_size or len(values) or 1
+        for start in range(0, len(values), step):
+            cur.executemany(sql, values[start:start + step])
+
+    def insert(self, filename, data, records):
+        """Insert ``records``; rows without an id get one from the database (written back to the row)."""
+        if filename not in TABLES:
+            return super().insert(filename, data, records)
+        table, columns = TABLES[filename]
+        with self.cursor(transaction=True) as cur:
+            self._insert_rows(cur, table, columns, records)
+
+    def _insert_rows(self, cur, table, columns, records):
+        for r in records:
+            cols = [c for c in columns if c != 'id' or r.get('id') is not None]
+            cur.execute(
+                self._sql(f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})"),
+                _row_values(cols, r)
+            )
+            r['id'] = cur.lastrowid if r.get('id') is None else r['id']
+
+    def update(self, filename, data, records):
+        if filename not in TABLES:
+            return super().update(filename, data, records)
+        table, columns = TABLES[filename]
+        assignments = ', '.join(f"{c} = ?" for c in columns if c != 'id')
+        with self.cursor(transaction=True) as cur:
+            cur.executemany(
+                self._sql(f"UPDATE {table} SET {assignments} WHERE id = ?"),
+                [_row_values([c for c in columns if c != 'id'], r) + (r['id'],) for r in records]
+            )
+
+    def delete(self, filename, data, records):
+        if filename not in TABLES:
+            return super().delete(filename, data, records)
+        table, _ = TABLES[filename]
+        with self.cursor(transaction=True) as cur:
+            cur.executemany(self._sql(f"DELETE FROM {table} WHERE id = ?"), [(r['id'],) for r in records])
+
+    def import_rows(self, filename, rows):
+        """Bulk-load rows (e.g. from the JSON files), replacing rows with the same id."""
+        table, columns = TABLES[filename]
+        with self.cursor(transaction=True) as cur:
+            self._insert_many(cur, table, columns, rows)
+        return len(rows)
+
+    def import_from(self, source):
+        """Copy every table's rows from another store (e.g. the JSON files); returns counts.
+
+        Legacy 'YYYY-MM-DD' transaction dates are stored in canonical form, as
+        the SQL date range and keyset queries compare them as strings.
+        """
+        counts = {}
+        for filename in TABLES:
+            rows = source.load(filename)
+            if filename == 'transactions.json':
+                rows = [{**t, 'transaction_date': canonical_date(t['transaction_date'])}
+                        if t.get('transaction_date') else t for t in rows]
+            counts[filename] = self.import_rows(filename, rows)
+        return counts
+
+    # ---------- transaction queries ----------
+    def transactions_for(self, user_id, t_type=None):
+        """The user's transactions (optionally of one type), oldest first."""
+        if t_type is None:
+            return self.query(
+                "SELECT * FROM transactions WHERE user_id = ? ORDER BY transaction_date, id",
+                (int(user_id),), prepared=True
+            )
+        return self.query(
+            "SELECT * FROM transactions WHERE user_id = ? AND type = ? ORDER BY transaction_date, id",
+            (int(user_id), t_type), prepared=True
+        )
+
+    def recent_transactions_for(self, user_id, limit, offset=0):
+        """The user's ``limit`` newest transactions after skipping ``offset``, oldest of them first."""
+        rows = self.query(
+            "SELECT * FROM transactions WHERE user_id = ? ORDER BY transaction_date DESC, id DESC LIMIT ? OFFSET ?",
+            (int(user_id), int(limit), int(offset)), prepared=True
+        )
+        return rows[::-1]
+
+    def transaction_page(self, user_id, t_type, limit, start=None, end=None, category_id=None,
+                         sort='transaction_date', descending=False, after=None):
+        """One keyset page of the user's ``t_type`` transactions, ordered by ``sort`` then id.
+
+        ``t_type`` None pages through both types. ``start <= transaction_date
+        < end`` bounds the dates; ``after`` is the (sort value, id) of the
+        previous page's last row.
+        """
+        if sort not in ('transaction_date', 'amount'):
+            raise ValueError(f"Cannot sort transactions by {sort!r}")
+        clauses, params = ["user_id = ?"], [int(user_id)]
+        if t_type is not None:
+            clauses.append("type = ?")
+            params.append(t_type)
+        if category_id is not None:
+            clauses.append("category_id = ?")
+            params.append(int(category_id))
+        if start:
+            clauses.append("transaction_date >= ?")
+            params.append(start)
+        if end:
+            clauses.append("transaction_date < ?")
+            params.append(end)
+        op, direction = ('<', 'DESC') if descending else ('>', 'ASC')
+        if after is not None:
+            clauses.append(f"({sort} {op} ? OR ({sort} = ? AND id {op} ?))")
+            params += [after[0], after[0], int(after[1])]
+        return self.query(
+            f"SELECT * FROM transactions WHERE {' AND '.join(clauses)} "
+            f"ORDER BY {sort} {direction}, id {direction} LIMIT ?",
+            params + [int(limit)]
+        )
+
+    def totals_for(self, user_id):
+        """{type: total amount} for one user."""
+        rows = self.query(
+            "SELECT type, ROUND(SUM(amount), 2) AS total FROM transactions WHERE user_id = ? GROUP BY type",
+            (int(user_id),)
+        )
+        return {r['type']: r['total'] for r in rows}
+
+    def category_totals_for(self, user_id, t_type):
+        """{category_id: total amount} for one user and transaction type."""
+        rows = self.query(
+            "SELECT category_id, ROUND(SUM(amount), 2) AS total FROM transactions "
+            "WHERE user_id = ? AND type = ? GROUP BY category_id",
+            (int(user_id), t_type)
+        )
+        return {r['category_id']: r['total'] for r in rows}
+
+    def daily_totals(self, t_type, user_id=None, start=None, end=None):
+        """[("YYYY-MM-DD", total)] oldest day first, for one user or everyone.
+
+        ``start <= transaction_date < end`` bounds the rows when given.
+        """
+        clauses, params = ["type = ?"], [t_type]
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(int(user_id))
+        if start:
+            clauses.append("transaction_date >= ?")
+            params.append(start)
+        if end:
+            clauses.append("transaction_date < ?")
+            params.append(end)
+        rows = self.query(
+            "SELECT SUBSTR(transaction_date, 1, 10) AS day, ROUND(SUM(amount), 2) AS total FROM transactions "
+            f"WHERE {' AND '.join(clauses)} GROUP BY SUBSTR(transaction_date, 1, 10) ORDER BY day",
+            params
+        )
+        return [(r['day'], r['total']) for r in rows]
+
+    def find_transactions(self, user_id, tx_id, t_type):
+        return self.query(
+            "SELECT * FROM transactions WHERE id = ? AND user_id = ? AND type = ?",
+            (int(tx_id), int(user_id), t_type)
+        )
+
+    def insert_transactions(self, rows, budget_deltas=None):
+        """Insert new (id-less) transactions and add ``budget_deltas`` ({budget id:
+        amount}) to those budgets' consumed totals, as one database transaction.
+
+        Each budget update is guarded like consume_budget; if one no longer
+        fits, nothing is written and ValueError is raised.
+        """
+        table, columns = TABLES['transactions.json']
+        columns = [c for c in columns if c != 'id']
+        with self.cursor(transaction=True) as cur:
+            for budget_id, amount in (budget_deltas or {}).items():
+                cur.execute(
+                    self._sql("UPDATE budgets SET consumed = consumed + ? WHERE id = ? AND budget_amount - consumed >= ?"),
+                    (float(amount), int(budget_id), float(amount))
+                )
+                if cur.rowcount != 1:
+                    raise ValueError(f"Insufficient budget (budget {budget_id})")
+            sql = self._sql(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})")
+            values = [_row_values(columns, r) for r in rows]
+            step = self.batch_size or len(values) or 1
+            for start in range(0, len(values), step):
+                cur.executemany(sql, values[start:start + step])
+        return len(rows)
+
+    # ---------- budget queries ----------
+    def users_named(self, username):
+        """Users whose name equals ``username`` ignoring case (an index lookup)."""
+        rows = self.query(f"SELECT * FROM users WHERE {self.username_match}", (username,), prepared=True)
+        key = username_key(username)
+        return [u for u in rows if username_key(u['username']) == key]
+
+    def find_user(self, username):
+        return next((u for u in self.users_named(username) if u['username'] == username), None)
+
+    def get_user(self, user_id):
+        rows = self.query("SELECT * FROM users WHERE id = ?", (int(user_id),), prepared=True)
+        return rows[0] if rows else None
+
+    def budgets_for(self, user_id, month=None, year=None):
+        if month is None:
+            return self.query("SELECT * FROM budgets WHERE user_id = ? ORDER BY id", (int(user_id),))
+        return self.query(
+            "SELECT * FROM budgets WHERE user_id = ? AND month = ? AND year = ? ORDER BY id",
+            (int(user_id), int(month), int(year))
+        )
+
+    def get_budget(self, budget_id):
+        rows = self.query("SELECT * FROM budgets WHERE id = ?", (int(budget_id),), prepared=True)
+        return rows[0] if rows else None
+
+    def find_budget(self, user_id, category_id, month, year):
+        rows = self.query(
+            "SELECT * FROM budgets WHERE user_id = ? AND category_id = ? AND month = ? AND year = ? "
+            "ORDER BY id LIMIT 1",
+            (int(user_id), int(category_id), int(month), int(year)), prepared=True
+        )
+        return rows[0] if rows else None
+
+    def consume_budget(self, budget_id, amount):
+        """Add ``amount`` to a budget's consumed total if it still fits; returns False if not.
+
+        The check and the update are a single statement, so concurrent
+        expenses cannot overdraw the budget.
+        """
+        return self.execute(
+            "UPDATE budgets SET consumed = consumed + ? WHERE id = ? AND budget_amount - consumed >= ?",
+            (float(amount), int(budget_id), float(amount))
+        ) == 1
+
+
+# -------------------- SQLITE STORE --------------------
+class SqliteStore(SqlStore):
+    """SQL store in a local SQLite file (WAL mode, one connection per thread).
+
+    sqlite3 keeps a per-connection cache of compiled statements, so the hot
+    queries are effectively prepared already.
+    """
+
+    schema = SQLITE_SCHEMA
+    username_match = "username = ? COLLATE NOCASE"  # served by idx_users_username
+
+    def __init__(self, data_path, database=None):
+        super().__init__(data_path)
+        self.database = database or os.path.join(data_path, 'budget.db')
+        self._local = threading.local()
+        self.create_schema()
+
+    def connection(self):
+        """One connection per thread (sqlite3 connections are not shareable)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.database, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def cursor(self, transaction=False):
+        conn = self.connection()
+        with conn:
+            yield conn.cursor()
+
+
+# -------------------- MYSQL STORE --------------------
+class _Lease:
+    """Kept in a thread's local storage, which is dropped when the thread ends;
+    its finalizer then hands the thread's connection back to the pool."""
+
+
+class MySqlStore(SqlStore):
+    """SQL store on a MySQL server, through mysql-connector's connection pool.
+
+    Every worker process opens its own pool of ``pool_size`` connections (set
+    MYSQL_POOL_SIZE to the worker's thread count). A thread checks a
+    connection out on first use and keeps it, with its server-side prepared
+    statements for the hot reads, until the thread ends. Connections run in
+    autocommit mode; multi-statement writes use explicit transactions and
+    bulk inserts go out as batched multi-row INSERTs.
+    """
+
+    schema = MYSQL_SCHEMA
+    placeholder = '%s'
+    batch_size = 1000
+
+    def __init__(self, data_path, pool_size=5, **connect_args):
+        if mysql_pooling is None:
+            raise RuntimeError("STORAGE_BACKEND 'mysql' needs the mysql-connector-python package.")
+        super().__init__(data_path)
+        self.pool_size = pool_size
+        self.connect_args = connect_args
+        self._pool = None
+        self._pid = None
+        self._local = threading.local()
+        self.create_schema()
+
+    def pool(self):
+        """This process's pool (a forked worker must not share its parent's sockets)."""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pool = mysql_pooling.MySQLConnectionPool(
+                        pool_name=f"budget_{os.getpid()}_{id(self)}",
+                        pool_size=self.pool_size,
+                        pool_reset_session=False,  # keep prepared statements across checkouts
+                        autocommit=True,
+                        **self.connect_args
+                    )
+                    self._local = threading.local()
+                    self._pid = os.getpid()
+        return self._pool
+
+    def connection(self):
+        """This thread's pooled connection, checked out on first use."""
+        pool = self.pool()
+        state = getattr(self._local, 'state', None)
+        if state is None or 'conn' not in state:
+            state = self._local.state = {'conn': pool.get_connection(), 'prepared': {}}
+            self._local.lease = lease = _Lease()
+            weakref.finalize(lease, self._release, state)
+        return state['conn']
+
+    @staticmethod
+    def _release(state):
+        """Close a thread's prepared statements and hand its connection back to the pool."""
+        conn = state.pop('conn', None)
+        if conn is None:
+            return
+        for cur in state['prepared'].values():
+            cur.close()
+        state['prepared'].clear()
+        conn.close()
+
+    def _check_connection(self, conn):
+        """After an error, drop a dead connection so the next call checks out a fresh one."""
+        if not conn.is_connected():
+            try:
+                self._release(self._local.state)
+            except Exception:
+                pass
+
+    @contextmanager
+    def cursor(self, transaction=False):
+        conn = self.connection()
+        cur = conn.cursor()
+        try:
+            if transaction:
+                conn.start_transaction()
+            yield cur
+            if transaction:
+                conn.commit()
+        except Exception:
+            if transaction:
+                conn.rollback()
+            self._check_connection(conn)
+            raise
+        finally:
+            cur.close()
+
+    def query(self, sql, params=(), prepared=False):
+        if not prepared:
+            return super().query(sql, params)
+        sql = self._sql(sql)
+        conn = self.connection()
+        statements = self._local.state['prepared']
+        cur = statements.get(sql)
+        if cur is None:
+            # Prepared on the first execute; later executes only send the parameters.
+            cur = statements[sql] = conn.cursor(prepared=True)
+        try:
+            cur.execute(sql, params)
+            return self._fetch(cur)
+        except Exception:
+            self._check_connection(conn)
+            raise
@@ -1,5 +1,6 @@
 $(document).ready(function () {
-    $('#incomeTable').DataTable({
+    const table = $('#incomeTable').DataTable({
+        order: [], // ✅ Keep the server's sort order
         dom: 'Bfrtip',
         buttons: [
             {
@@ -43,4 +44,67 @@ $(document).ready(function () {
             }
         ]
     });
+
+    // ✅ Shared edit modal, filled from the clicked row's Edit button
+    $('#editIncomeModal').on('show.bs.modal', function (event) {
+        const button = $(event.relatedTarget);
+        const form = $(this).find('form');
+        form.find('[name="id"]').val(button.data('id'));
+        form.find('[name="transaction_date"]').val(button.data('date'));
+        form.find('[name="category_id"]').val(String(button.data('category-id')));
+        form.find('[name="amount"]').val(button.data('amount'));
+        form.find('[name="description"]').val(button.attr('data-description'));
+    });
+
+    // ✅ Further pages come from the JSON API, one keyset cursor at a time
+    $('#loadMore').on('click', function () {
+        const button = $(this);
+        const url = new URL(button.data('api'), window.location.origin);
+        url.searchParams.set('cursor', button.data('cursor'));
+        button.prop('disabled', true);
+
+        fetch(url)
+            .then(response => response.json().then(data => {
+                if (!response.ok) throw new Error(data.error || response.statusText);
+                return data;
+            }))
+            .then(data => {
+                data.items.forEach(item => table.row.add(buildRow(item, button.data('delete-path'))));
+                table.draw(false);
+                button.data('cursor', data.next_cursor || '');
+                button.toggleClass('d-none', !data.next_cursor);
+            })
+            .catch(error => alert('Could not load more transactions: ' + error.message))
+            .finally(() => button.prop('disabled', false));
+    });
 });
+
+// Same markup as the server-rendered rows (text goes through .text(), never as HTML)
+function buildRow(item, deletePath) {
+    const date = new Date(item.transaction_date.replace(' ', 'T'));
+    const amount = Number(item.amount).toLocaleString('en-US', { minimumFractionDigits: 2, maximumFractionDigits: 2 });
+
+    const editButton = $('<button type="button" class="btn btn-sm btn-primary" data-bs-toggle="modal" data-bs-target="#editIncomeModal">')
+        .attr({
+            'data-id': item.id,
+            'data-date': item.transaction_date.slice(0, 10),
+            'data-category-id': item.category_id,
+            'data-amount': item.amount,
+            'data-description': item.description || ''
+        })
+        .html('<i class="bx bx-edit"></i> Edit');
+    const deleteForm = $('<form method="POST" class="d-inline">')
+        .attr('action', deletePath + '/' + item.id)
+        .on('submit', () => confirm('Are you sure you want to delete this income?'))
+        .append('<button type="submit" class="btn btn-sm btn-danger"><i class="bx bx-trash"></i> Delete</button>');
+
+    return $('<tr>').css('background-color', item.category_color + '20').append(
+        $('<td>').text(date.toLocaleDateString('en-GB', { day: '2-digit', month: 'short', year: 'numeric' })),
+        $('<td>').append($('<span class="badge rounded-pill px-2 py-1">')
+            .css({ 'background-color': item.category_color, color: '#fff' })
+            .text(item.category_name)),
+        $('<td>').text(item.description || '—'),
+        $('<td class="text-end text-primary fw-semibold">').text('₱' + amount),
+        $('<td class="text-center">').append(editButton, ' ', deleteForm)
+    )[0];
+}
@@ -0,0 +1,543 @@
+import os
+import json
+import tempfile
+import threading
+from contextlib import contextmanager
+from flask import current_app, has_app_context
+from app import aggregates
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+try:
+    import orjson
+except ImportError:  # optional, for DATA_FORMAT = 'orjson'
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional, for DATA_FORMAT = 'msgpack'
+    msgpack = None
+
+
+# -------------------- FILE FORMATS --------------------
+# Data files keep their names whatever the format; readers tell the formats
+# apart by the first byte (JSON starts with '[', '{' or whitespace, a
+# MessagePack array or map with one of these markers).
+DATA_FORMATS = ('json', 'orjson', 'msgpack')
+MSGPACK_MARKERS = set(range(0x80, 0xa0)) | {0xdc, 0xdd, 0xde, 0xdf}
+
+
+def resolve_format(data_format):
+    """The usable format for a DATA_FORMAT setting (compact JSON if its library is missing)."""
+    if data_format not in DATA_FORMATS:
+        raise ValueError(f"Unknown data format: {data_format}")
+    if (data_format == 'orjson' and orjson is None) or (data_format == 'msgpack' and msgpack is None):
+        return 'json'
+    return data_format
+
+
+def _unpack(raw):
+    if msgpack is None:
+        raise RuntimeError("This data file is in MessagePack format; install the msgpack package to read it.")
+    return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+
+
+# -------------------- FILE LOCK --------------------
+LOCK_FILE = '.write.lock'
+SEQUENCE_FILE = 'sequences.json'  # {collection filename: last allocated id}
+VERSION_FILE = 'versions.json'  # {scope: data version}, see JsonStore.bump_versions
+
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # retries for ~10s, then raises
+            return
+        except OSError:
+            continue
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# -------------------- JSON STORE --------------------
+class JsonStore:
+    """Keeps every JSON file of a data directory parsed in memory.
+
+    Each cached entry remembers the file's (mtime, size, inode) signature and
+    is revalidated with a single ``os.stat`` on read, so edits made by another
+    process are picked up while steady-state reads never touch the parser.
+    Writes go through the cache, so the data just saved is served as-is.
+
+    Loaded data is shared between callers: anything that mutates a loaded
+    list or record must hand it back to ``save`` (or to one of the record
+    operations ``insert``/``update``/``delete``).
+
+    Files are written in ``data_format`` ('json' and 'orjson' write compact
+    JSON, 'msgpack' MessagePack) and read back in whichever of them is on
+    disk; ``export`` writes the indented JSON form.
+
+    Writes replace files atomically (temp file + ``os.replace``, fsynced with
+    ``fsync=True``) under an advisory lock on DATA_PATH/.write.lock, which
+    ``transaction()`` holds across a whole load→modify→save. Reads never take
+    the lock: they see either the old or the new file.
+    """
+
+    supports_sql = False
+
+    def __init__(self, data_path, fsync=False, data_format='json'):
+        self.data_path = data_path
+        self.fsync = fsync
+        self.data_format = resolve_format(data_format)
+        self._cache = {}
+        self._lock = threading.RLock()
+        self._write_lock = threading.RLock()  # threads of this process
+        self._lock_depth = 0
+        self._lock_handle = None  # open LOCK_FILE while the file lock is held
+
+    def path(self, filename):
+        return os.path.join(self.data_path, filename)
+
+    @staticmethod
+    def _signature(file_path):
+        st = os.stat(file_path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _read(self, file_path):
+        with open(file_path, 'rb') as f:
+            head = f.read(1)
+            f.seek(0)
+            if head and head[0] in MSGPACK_MARKERS:
+                return _unpack(f.read())
+            if self.data_format == 'orjson':
+                return orjson.loads(f.read())
+            return json.load(f)
+
+    def _dump(self, data, f):
+        if self.data_format == 'json':
+            # ✅ dumps + one write: json.dump to a file object falls back to the pure-Python encoder
+            f.write(json.dumps(data, separators=(',', ':')))
+        elif self.data_format == 'orjson':
+            f.write(orjson.dumps(data))
+        else:
+            f.write(msgpack.packb(data, use_bin_type=True))
+
+    def _write(self, file_path, data, dump=None):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path),
+                                        prefix='.' + os.path.basename(file_path) + '.', suffix='.tmp')
+        try:
+            text = dump is not None or self.data_format == 'json'
+            with os.fdopen(fd, 'w' if text else 'wb') as f:
+                (dump or self._dump)(data, f)
+                self._sync(f)
+            try:
+                os.chmod(tmp_path, os.stat(file_path).st_mode & 0o777)  # mkstemp creates it 0600
+            except FileNotFoundError:
+                os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _sync(self, f):
+        if self.fsync:
+            f.flush()
+            os.fsync(f.fileno())
+
+    # ---------- write lock ----------
+    @contextmanager
+    def lock(self):
+        """Exclusive, re-entrant write lock shared by threads and processes."""
+        with self._write_lock:
+            if self._lock_depth == 0:
+                handle = open(self.path(LOCK_FILE), 'a+')
+                try:
+                    _lock_file(handle)
+                except BaseException:
+                    handle.close()
+                    raise
+                self._lock_handle = handle
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    handle, self._lock_handle = self._lock_handle, None
+                    try:
+                        _unlock_file(handle)
+                    finally:
+                        handle.close()
+
+    def transaction(self):
+        """Hold the write lock across a load→modify→save sequence.
+
+        Loads inside the block revalidate against the files on disk, so they
+        see every write that finished before the lock was taken.
+        """
+        return self.lock()
+
+    def load(self, filename, create=False):
+        """Return the parsed contents of ``filename`` ([] if it is missing).
+
+        With ``create=True`` a missing file is initialised with an empty list.
+        """
+        file_path = self.path(filename)
+        try:
+            signature = self._signature(file_path)
+        except FileNotFoundError:
+            if not create:
+                return []
+            self.save(filename, [])
+            return self.load(filename)
+
+        cached = self._cache.get(filename)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        data = self._read(file_path)
+        with self._lock:
+            self._cache[filename] = (signature, data)
+        return data
+
+    def save(self, filename, data):
+        file_path = self.path(filename)
+        with self.lock(), self._lock:
+            try:
+                self._write(file_path, data)
+                self._cache[filename] = (self._signature(file_path), data)
+            except Exception:
+                # Never serve data that did not make it to disk.
+                self._cache.pop(filename, None)
+                raise
+
+    # ---------- id sequences ----------
+    def next_id(self, filename, count=1):
+        """Allocate the next id for a collection from its persistent counter.
+
+        Constant time and, under the write lock, unique across threads and
+        processes; ids of deleted rows are never handed out again. A
+        collection without a counter yet is seeded from its highest id.
+        With ``count`` it reserves that many consecutive ids and returns the
+        first (bulk inserts).
+        """
+        with self.lock():
+            sequences = self.load(SEQUENCE_FILE) or {}
+            last = sequences.get(filename)
+            if last is None:
+                last = max((int(r['id']) for r in self.load(filename)), default=0)
+            sequences[filename] = last + count
+            self.save(SEQUENCE_FILE, sequences)
+            return last + 1
+
+    # ---------- data versions ----------
+    def data_version(self, *scopes):
+        """A counter that grows whenever data in ``scope`` (e.g. one user's) changes; 0 if never.
+
+        With several scopes, a tuple of their counters (read together).
+        """
+        versions = self.load(VERSION_FILE) or {}
+        if len(scopes) == 1:
+            return versions.get(scopes[0], 0)
+        return tuple(versions.get(scope, 0) for scope in scopes)
+
+    def bump_versions(self, scopes):
+        """Advance the data version of each scope, after its change was saved."""
+        with self.lock():
+            versions = self.load(VERSION_FILE) or {}
+            for scope in scopes:
+                versions[scope] = versions.get(scope, 0) + 1
+            self.save(VERSION_FILE, versions)
+
+    # ---------- record operations ----------
+    # ``data`` is the loaded list, already changed by the caller; ``records``
+    # are the rows that were added, changed or removed. This store simply
+    # rewrites the file; journaling stores only persist the records.
+    def insert(self, filename, data, records):
+        self.save(filename, data)
+
+    def update(self, filename, data, records):
+        self.save(filename, data)
+
+    def delete(self, filename, data, records):
+        self.save(filename, data)
+
+    def append(self, filename, data, entries):
+        """Persist document ``data`` after ``entries`` (deltas) were applied to it in place."""
+        self.save(filename, data)
+
+    def export(self, filename, file_path):
+        """Write ``filename``'s data as indented JSON to ``file_path`` (for people and other tools)."""
+        self._write(file_path, self.load(filename), dump=lambda data, f: f.write(json.dumps(data, indent=4)))
+
+    def compact(self, filename=None):
+        """Nothing to fold in: every write already rewrites the whole file."""
+
+    def invalidate(self, filename=None):
+        with self._lock:
+            if filename is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(filename, None)
+
+
+# -------------------- LOG STORE --------------------
+class LogStore(JsonStore):
+    """Default store: journals record changes instead of rewriting whole files.
+
+    For the collections in ``LOG_COLLECTIONS`` the JSON file is a snapshot and
+    changes are appended to a JSON Lines journal next to it
+    (``transactions.json`` → ``transactions.log.jsonl``, likewise for budgets,
+    whose consumed amount changes with every expense): ``put`` lines carry a
+    full row (a later put for the same id replaces it) and ``del`` lines are
+    tombstones. Once the journal holds ``compact_after`` entries it is folded
+    into a fresh snapshot. Replaying is idempotent, so a crash between writing
+    the snapshot and dropping the journal loses nothing.
+
+    Journal lines address rows by ``id``. Older versions numbered rows
+    ``len(rows) + 1``, which repeats ids after a delete; a collection whose
+    rows share an id is therefore saved whole on every change, until
+    ``flask renumber-ids`` gives the duplicates fresh ids.
+
+    Documents in ``DELTA_DOCUMENTS`` (the running totals) are journaled the
+    same way, except that their entries are deltas replayed through the
+    document's reducer, so a write appends a line instead of rewriting a
+    table that covers every user.
+    """
+
+    LOG_COLLECTIONS = ('transactions.json', 'budgets.json')
+    DELTA_DOCUMENTS = {'aggregates.json': aggregates.apply_entry}
+
+    def __init__(self, data_path, compact_after=1000, fsync=False, data_format='json'):
+        super().__init__(data_path, fsync=fsync, data_format=data_format)
+        self.compact_after = compact_after
+        self._log_sizes = {}
+        self._torn = set()
+        self._shared_ids = set()  # collections with rows that share an id
+
+    def log_path(self, filename):
+        return self.path(os.path.splitext(filename)[0] + '.log.jsonl')
+
+    def _signature_pair(self, filename):
+        try:
+            log_signature = self._signature(self.log_path(filename))
+        except FileNotFoundError:
+            log_signature = None
+        return (self._signature(self.path(filename)), log_signature)
+
+    def _journaled(self, filename):
+        return filename in self.LOG_COLLECTIONS or filename in self.DELTA_DOCUMENTS
+
+    def load(self, filename, create=False):
+        if not self._journaled(filename):
+            return super().load(filename, create)
+
+        try:
+            signature = self._signature_pair(filename)
+        except FileNotFoundError:
+            if filename in self.DELTA_DOCUMENTS:
+                # Deltas mean nothing without their snapshot; the owner rebuilds it
+                return super().load(filename, create)
+            if not create and not os.path.exists(self.log_path(filename)):
+                return []
+            self.save(filename, self._replay(filename, []))
+            return self.load(filename)
+
+        cached = self._cache.get(filename)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        data = self._read(self.path(filename))
+        if filename in self.DELTA_DOCUMENTS:
+            data = self._replay_deltas(filename, data)
+        else:
+            data = self._replay(filename, data)
+            self._check_ids(filename, data)
+        with self._lock:
+            self._cache[filename] = (signature, data)
+        return data
+
+    def _check_ids(self, filename, rows):
+        ids = [row['id'] for row in rows]
+        if len(set(ids)) == len(ids):
+            self._shared_ids.discard(filename)
+        else:
+            self._shared_ids.add(filename)
+
+    def _journal(self, filename):
+        """The parsed journal entries of ``filename`` (dropping a torn final line)."""
+        self._torn.discard(filename)
+        try:
+            with open(self.log_path(filename), 'r') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            lines = []
+
+        entries = []
+        for n, line in enumerate(lines):
+            try:
+                entries.append(orjson.loads(line) if self.data_format == 'orjson' else json.loads(line))
+            except ValueError:
+                if n == len(lines) - 1:
+                    # Torn final append from a crash: the write never completed.
+                    # The next write rewrites the snapshot instead of appending to it.
+                    self._torn.add(filename)
+                    break
+                raise
+        self._log_sizes[filename] = len(lines)
+        return entries
+
+    def _replay_deltas(self, filename, document):
+        """Apply the journal's deltas to ``document`` with its reducer."""
+        entries = self._journal(filename)
+        if isinstance(document, dict):  # an empty (just created) file has nothing to apply them to
+            apply = self.DELTA_DOCUMENTS[filename]
+            for entry in entries:
+                apply(document, entry)
+        return document
+
+    def _replay(self, filename, rows):
+        """Apply the journal on top of snapshot ``rows``."""
+        positions = {row['id']: i for i, row in enumerate(rows)}
+        for entry in self._journal(filename):
+            if entry['op'] == 'put':
+                row = entry['row']
+                i = positions.get(row['id'])
+                if i is None:
+                    positions[row['id']] = len(rows)
+                    rows.append(row)
+                else:
+                    rows[i] = row
+            elif entry['op'] == 'del':
+                i = positions.pop(entry['id'], None)
+                if i is not None:
+                    rows[i] = None
+
+        return [row for row in rows if row is not None]
+
+    def _append(self, filename, data, entries):
+        with self.lock(), self._lock:
+            if filename in self._torn or filename in self._shared_ids or len(entries) >= self.compact_after:
+                # A batch that would trigger compaction anyway goes straight to the snapshot,
+                # as do changes to rows the journal could not tell apart by id
+                return self.save(filename, data)
+            try:
+                with open(self.log_path(filename), 'a') as f:
+                    f.write(''.join(self._dumps_entry(entry) + '\n' for entry in entries))
+                    self._sync(f)
+                self._cache[filename] = (self._signature_pair(filename), data)
+            except Exception:
+                self._cache.pop(filename, None)
+                raise
+            self._log_sizes[filename] = self._log_sizes.get(filename, 0) + len(entries)
+            if self._log_sizes[filename] >= self.compact_after:
+                self.save(filename, data)
+
+    def _dumps_entry(self, entry):
+        # The journal is always JSON Lines, whatever the snapshot format.
+        return orjson.dumps(entry).decode() if self.data_format == 'orjson' else json.dumps(entry)
+
+    def save(self, filename, data):
+        """Write a full snapshot; for journaled collections this also empties the journal."""
+        with self.lock(), self._lock:
+            super().save(filename, data)
+            if self._journaled(filename):
+                try:
+                    os.remove(self.log_path(filename))
+                except FileNotFoundError:
+                    pass
+                self._log_sizes[filename] = 0
+                self._torn.discard(filename)
+                if filename in self.LOG_COLLECTIONS:
+                    self._check_ids(filename, data)
+                self._cache[filename] = (self._signature_pair(filename), data)
+
+    def insert(self, filename, data, records):
+        if filename not in self.LOG_COLLECTIONS:
+            return super().insert(filename, data, records)
+        self._append(filename, data, [{"op": "put", "row": r} for r in records])
+
+    def update(self, filename, data, records):
+        if filename not in self.LOG_COLLECTIONS:
+            return super().update(filename, data, records)
+        self._append(filename, data, [{"op": "put", "row": r} for r in records])
+
+    def delete(self, filename, data, records):
+        if filename not in self.LOG_COLLECTIONS:
+            return super().delete(filename, data, records)
+        self._append(filename, data, [{"op": "del", "id": r['id']} for r in records])
+
+    def append(self, filename, data, entries):
+        if filename not in self.DELTA_DOCUMENTS:
+            return super().append(filename, data, entries)
+        self._append(filename, data, entries)
+
+    def compact(self, filename=None):
+        """Fold journals into their snapshots (all journaled files by default)."""
+        with self.transaction():
+            for name in ([filename] if filename else self.LOG_COLLECTIONS + tuple(self.DELTA_DOCUMENTS)):
+                if name in self.DELTA_DOCUMENTS and not os.path.exists(self.path(name)):
+                    continue
+                self.save(name, self.load(name))
+
+
+# -------------------- STORE REGISTRY --------------------
+BACKENDS = {
+    'json': JsonStore,
+    'log': LogStore,
+    'sqlite': None,  # app.sql_store.SqliteStore, imported on first use
+    'mysql': None,  # app.sql_store.MySqlStore, imported on first use
+}
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _make_store(backend, data_path, config):
+    if backend == 'log':
+        return LogStore(data_path, compact_after=config.get('LOG_COMPACT_THRESHOLD', 1000),
+                        fsync=config.get('FSYNC_WRITES', False), data_format=config.get('DATA_FORMAT', 'json'))
+    if backend == 'sqlite':
+        from app.sql_store import SqliteStore
+        return SqliteStore(data_path, database=config.get('SQLITE_DATABASE'))
+    if backend == 'mysql':
+        from app.sql_store import MySqlStore
+        return MySqlStore(data_path, pool_size=config.get('MYSQL_POOL_SIZE', 5), **config.get('MYSQL_CONNECTION', {}))
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {backend}")
+    return BACKENDS[backend](data_path, fsync=config.get('FSYNC_WRITES', False),
+                             data_format=config.get('DATA_FORMAT', 'json'))
+
+
+def get_store(data_path=None, config=None):
+    """Return the shared store for ``data_path`` (default: the app's DATA_PATH).
+
+    The backend comes from ``STORAGE_BACKEND`` in the app config ('log' by
+    default, or 'json' / 'sqlite' / 'mysql').
+    """
+    if config is None:
+        config = current_app.config if data_path is None or has_app_context() else {}
+    if data_path is None:
+        data_path = config['DATA_PATH']
+    backend = config.get('STORAGE_BACKEND', 'log')
+    key = (backend, os.path.abspath(os.fspath(data_path)))
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                store = _stores[key] = _make_store(backend, key[1], config)
+    return store
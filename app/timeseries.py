@@ -0,0 +1,96 @@
+from datetime import date, timedelta
+
+
+# -------------------- TIME SERIES --------------------
+# Per-user totals bucketed by day, ISO week, month or year. Buckets are summed
+# from a {"YYYY-MM-DD": total} map (models builds it from the running totals'
+# per-day and per-month rollups, or one SQL GROUP BY), so a series costs
+# O(buckets) however many transactions the history holds.
+GRANULARITIES = ("day", "week", "month", "year")
+MAX_BUCKETS = 3660  # ten years of days; longer ranges need a coarser granularity
+
+
+def as_date(value):
+    """A date from a date/datetime or a "YYYY-MM-DD[ HH:MM:SS]" string."""
+    if isinstance(value, date):
+        return value if type(value) is date else value.date()
+    return date.fromisoformat(str(value)[:10])
+
+
+def period(day, granularity):
+    """Bucket label of a date: 'YYYY-MM-DD', 'YYYY-Www' (ISO week), 'YYYY-MM' or 'YYYY'."""
+    if granularity == "day":
+        return day.isoformat()
+    if granularity == "week":
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    if granularity == "month":
+        return f"{day.year:04d}-{day.month:02d}"
+    if granularity == "year":
+        return f"{day.year:04d}"
+    raise ValueError(f"Unknown granularity {granularity!r}")
+
+
+def _month_index(day):
+    return day.year * 12 + day.month - 1
+
+
+def bucket_count(start, end, granularity):
+    """How many buckets [start, end] spans; ValueError if it is reversed or over MAX_BUCKETS."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity {granularity!r}")
+    if start > end:
+        raise ValueError("start must not be after end")
+    if granularity == "day":
+        count = (end - start).days + 1
+    elif granularity == "week":
+        count = ((end - timedelta(days=end.weekday())) - (start - timedelta(days=start.weekday()))).days // 7 + 1
+    elif granularity == "month":
+        count = _month_index(end) - _month_index(start) + 1
+    else:
+        count = end.year - start.year + 1
+    if count > MAX_BUCKETS:
+        raise ValueError(f"Range too long: {count} {granularity} buckets (at most {MAX_BUCKETS})")
+    return count
+
+
+def periods(start, end, granularity):
+    """Bucket labels from ``start`` to ``end``, one step per period (not per day)."""
+    count = bucket_count(start, end, granularity)
+    day = start
+    for n in range(count):
+        yield period(day, granularity)
+        if n == count - 1:
+            break  # ✅ Never step past the end (date.max + 1 day overflows)
+        if granularity == "day":
+            day += timedelta(days=1)
+        elif granularity == "week":
+            day += timedelta(days=7 - day.weekday())
+        elif granularity == "month":
+            month = _month_index(day) + 1
+            day = date(month // 12, month % 12 + 1, 1)
+        else:
+            day = date(day.year + 1, 1, 1)
+
+
+def series(daily, granularity="day", start=None, end=None):
+    """[{"period", "total"}] for every bucket from ``start`` to ``end`` (inclusive).
+
+    Buckets without transactions are included with a 0 total, so charts get
+    an unbroken axis. Without bounds the range spans the first to last day
+    of ``daily``. Raises ValueError for a reversed range or one of more than
+    MAX_BUCKETS buckets.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity {granularity!r}")
+    if not daily and (start is None or end is None):
+        return []
+    start = as_date(start) if start is not None else date.fromisoformat(min(daily))
+    end = as_date(end) if end is not None else date.fromisoformat(max(daily))
+
+    buckets = dict.fromkeys(periods(start, end, granularity), 0)
+    for day, total in daily.items():
+        day = date.fromisoformat(day)
+        if start <= day <= end:
+            buckets[period(day, granularity)] += total
+    return [{"period": label, "total": round(total, 2)} for label, total in buckets.items()]
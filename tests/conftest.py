@@ -0,0 +1,38 @@
+import pytest
+from datetime import datetime
+from flask import Flask
+from app import models, sql_store
+from tests import mysql_shim
+
+
+# ---------- SQL BACKENDS ----------
+# Shared by test_sql_store and test_mysql_store; each module picks its backend with
+#   pytestmark = pytest.mark.parametrize("app_context", ["sqlite"], indirect=True)
+@pytest.fixture
+def app_context(request, tmp_path, monkeypatch):
+    """Flask app context on a SQL backend ('sqlite', or 'mysql' against the SQLite stand-in pool)."""
+    backend = getattr(request, "param", "sqlite")
+    app = Flask(__name__)
+    app.config['DATA_PATH'] = str(tmp_path)
+    app.config['STORAGE_BACKEND'] = backend
+    if backend == 'mysql':
+        monkeypatch.setattr(sql_store, "mysql_pooling", mysql_shim)
+        app.config['MYSQL_CONNECTION'] = {'database': str(tmp_path / 'mysql.db')}
+        app.config['MYSQL_POOL_SIZE'] = 2
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def food_budget(app_context):
+    """Id of user 1's "Food" expense category with a 500 budget this month (plus a "Salary" income category)."""
+    models.add_expense_category(1, "Salary", "#00FF00", "income")
+    models.add_expense_category(1, "Food", "#FF0000", "expense")
+    expense_cat = models.get_all_expense_categories()[0]["id"]
+    models.add_budget_entry(1, expense_cat, 500, datetime.now().month, datetime.now().year)
+    return expense_cat
+
+
+@pytest.fixture
+def today():
+    return datetime.now().strftime("%Y-%m-%d")
@@ -0,0 +1,115 @@
+"""Local stand-in for ``mysql.connector.pooling`` backed by SQLite.
+
+Implements the slice of the connector API that MySqlStore uses and rewrites
+the MySQL dialect it sends (``%s`` placeholders, AUTO_INCREMENT, inline
+INDEX clauses, ENGINE options) into SQLite, so the store's pooling,
+transactions, prepared statements and bulk inserts can be exercised
+without a MySQL server. ``database`` is the SQLite file to use.
+"""
+import re
+import sqlite3
+import threading
+
+INLINE_INDEX = re.compile(r",\s*INDEX (\w+) \(([^)]*)\)")
+
+
+class PoolError(Exception):
+    pass
+
+
+def translate(sql):
+    """Return the SQLite statements equivalent to one MySQL statement."""
+    sql = sql.replace('%s', '?').replace('AUTO_INCREMENT', 'AUTOINCREMENT').replace(' ENGINE=InnoDB', '')
+    indexes = INLINE_INDEX.findall(sql)
+    if not indexes:
+        return [sql]
+    table = re.search(r"CREATE TABLE IF NOT EXISTS (\w+)", sql).group(1)
+    return [INLINE_INDEX.sub('', sql)] + [
+        f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})" for name, columns in indexes
+    ]
+
+
+class MySQLConnectionPool:
+    def __init__(self, pool_name=None, pool_size=5, pool_reset_session=True, **kwargs):
+        self.pool_name = pool_name
+        self.pool_size = pool_size
+        self.kwargs = kwargs
+        self.checked_out = 0
+        self.prepares = 0  # server-side PREPAREs, summed over all connections
+        self._lock = threading.Lock()
+
+    def get_connection(self):
+        with self._lock:
+            if self.checked_out >= self.pool_size:
+                raise PoolError("Failed getting connection; pool exhausted")
+            self.checked_out += 1
+        return PooledConnection(self)
+
+
+class PooledConnection:
+    def __init__(self, pool):
+        self.pool = pool
+        # autocommit like the store's pool; start_transaction() opens one explicitly
+        self._db = sqlite3.connect(pool.kwargs['database'], timeout=30,
+                                   isolation_level=None, check_same_thread=False)
+
+    def cursor(self, prepared=False):
+        return Cursor(self, prepared)
+
+    def start_transaction(self):
+        self._db.execute("BEGIN")
+
+    def commit(self):
+        if self._db.in_transaction:
+            self._db.execute("COMMIT")
+
+    def rollback(self):
+        if self._db.in_transaction:
+            self._db.execute("ROLLBACK")
+
+    def is_connected(self):
+        return self._db is not None
+
+    def close(self):
+        """Return the connection to the pool."""
+        self._db.close()
+        self._db = None
+        with self.pool._lock:
+            self.pool.checked_out -= 1
+
+
+class Cursor:
+    def __init__(self, conn, prepared):
+        self.conn = conn
+        self.prepared = prepared
+        self._executed = None
+        self._cursor = None
+
+    def execute(self, operation, params=()):
+        if self.prepared and operation != self._executed:
+            self.conn.pool.prepares += 1
+        self._executed = operation
+        for statement in translate(operation):
+            self._cursor = self.conn._db.execute(statement, params)
+
+    def executemany(self, operation, seq_params):
+        self._executed = operation
+        self._cursor = self.conn._db.executemany(translate(operation)[0], seq_params)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor = None
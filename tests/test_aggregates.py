@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+from app import aggregates as agg
+
+
+def make_tx(user_id, category_id, t_type, amount, date):
+    return {
+        "user_id": user_id,
+        "category_id": category_id,
+        "type": t_type,
+        "amount": amount,
+        "transaction_date": date
+    }
+
+
+TRANSACTIONS = [
+    make_tx(1, 1, "income", 1000, "2025-07-01"),
+    make_tx(1, 6, "expense", "0.1", "2025-07-02 10:00:00"),
+    make_tx(1, 6, "expense", 0.2, "2025-08-02 10:00:00"),
+    make_tx(1, "7", "expense", 50, "2025-08-03 10:00:00"),
+    make_tx(2, 6, "expense", 20, "2025-07-03 09:00:00"),
+]
+
+
+def test_build_and_lookup():
+    aggregates = agg.build_aggregates(TRANSACTIONS)
+    assert aggregates["count"] == 5
+    assert agg.total(aggregates, 1, "income") == 1000
+    assert agg.total(aggregates, 1, "expense") == 50.3  # rounded to cents, no float drift
+    assert agg.total(aggregates, 3, "expense") == 0
+    assert agg.category_totals(aggregates, 1, "expense") == {6: 0.3, 7: 50}
+    assert agg.category_totals(aggregates, 1, "expense", month="2025-08") == {6: 0.2, 7: 50}
+    assert agg.category_totals(aggregates, 2, "income") == {}
+    assert agg.monthly_totals(aggregates, 1, "expense") == {"2025-07": 0.1, "2025-08": 50.2}
+
+def test_day_rollup_keeps_only_its_window():
+    today = date.today()
+    recent = [make_tx(1, 6, "expense", 5, (today - timedelta(days=n)).isoformat()) for n in (0, 0, 3)]
+    aggregates = agg.build_aggregates(TRANSACTIONS + recent)
+    assert agg.daily_totals(aggregates, 1, "expense") == {today.isoformat(): 10, (today - timedelta(days=3)).isoformat(): 5}
+
+    # A day that has aged out is dropped when a new day is added
+    aggregates["users"]["1"]["expense"]["days"]["2000-01-01"] = 1.0
+    assert "2000-01-01" not in agg.daily_totals(aggregates, 1, "expense")
+    agg.apply_transaction(aggregates, make_tx(1, 6, "expense", 1, (today - timedelta(days=1)).isoformat()))
+    assert "2000-01-01" not in aggregates["users"]["1"]["expense"]["days"]
+
+def test_apply_and_revert_is_a_no_op():
+    aggregates = agg.build_aggregates(TRANSACTIONS)
+    extra = make_tx(1, 9, "expense", 12.34, "2025-09-01")
+    agg.apply_transaction(aggregates, extra)
+    assert agg.category_totals(aggregates, 1, "expense", month="2025-09") == {9: 12.34}
+
+    agg.apply_transaction(aggregates, extra, -1)
+    assert aggregates == agg.build_aggregates(TRANSACTIONS)
+
+def test_is_current():
+    aggregates = agg.build_aggregates(TRANSACTIONS)
+    assert agg.is_current(aggregates, TRANSACTIONS)
+    assert not agg.is_current(aggregates, TRANSACTIONS[:-1])
+    assert not agg.is_current([], [])  # missing file
+
+def test_older_layouts_are_not_current():
+    aggregates = agg.build_aggregates(TRANSACTIONS)
+    assert agg.is_current(aggregates, TRANSACTIONS)
+    del aggregates["version"]  # an older layout
+    assert not agg.is_current(aggregates, TRANSACTIONS)
@@ -63,3 +63,208 @@ def test_login_page_renders(client):
     response = client.get('/login')
     assert response.status_code == 200
     assert b'<form' in response.data  # Check that it renders a login form
+
+
+def test_recent_activity_endpoint(client):
+    """The recent activity API pages through the user's transactions."""
+    assert client.get('/api/recent-activity').status_code == 401
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    response = client.get('/api/recent-activity?limit=10')
+    assert response.status_code == 200
+    assert response.get_json() == {"items": [], "limit": 10, "offset": 0, "next_offset": None}
+
+    assert client.get('/api/recent-activity?limit=0').status_code == 400
+    assert client.get('/api/recent-activity?limit=1000').status_code == 400
+
+
+def test_listing_endpoints(client):
+    """The expenses/income APIs serve keyset pages and reject bad arguments."""
+    assert client.get('/api/expenses').status_code == 401
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    response = client.get('/api/income?start=2025-01-01&sort=amount&order=asc')
+    assert response.status_code == 200
+    assert response.get_json() == {"items": [], "next_cursor": None}
+
+    assert client.get('/api/expenses?limit=0').status_code == 400
+    assert client.get('/api/expenses?cursor=bogus').status_code == 400
+    assert client.get('/api/expenses?start=yesterday').status_code == 400
+    assert client.get('/dashboard/expenses?sort=amount').status_code == 200
+
+
+def test_time_series_endpoints(client):
+    """/api/monthly-expenses and /api/time-series bucket the user's totals."""
+    assert client.get('/api/monthly-expenses').status_code == 401
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    response = client.get('/api/monthly-expenses?start=2025-01-01&end=2025-02-10')
+    assert response.status_code == 200
+    assert response.get_json() == [{"month": "2025-01", "total_amount": 0}, {"month": "2025-02", "total_amount": 0}]
+
+    assert client.get('/api/time-series?granularity=week').get_json() == []
+    assert client.get('/api/time-series?granularity=hour').status_code == 400
+    assert client.get('/api/time-series?type=transfer').status_code == 400
+    assert client.get('/api/time-series?start=2025-02-01&end=2025-01-01').status_code == 400
+    assert client.get('/api/monthly-expenses?start=2025-01-01&end=9999-12-31').status_code == 400
+    response = client.get('/api/time-series?granularity=year&start=9990-01-01&end=9999-12-31')
+    assert response.status_code == 200 and len(response.get_json()) == 10
+
+
+def test_import_endpoint(client):
+    """Uploads are validated as a whole and rejected with the failing rows listed."""
+    import io
+    assert client.post('/api/transactions/import').status_code == 401
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    assert client.post('/api/transactions/import').status_code == 400
+
+    upload = {'file': (io.BytesIO(b'{"date": "2025-07-01", "type": "expense", "category": "Food", "amount": 5}\n'), 'bank.jsonl')}
+    response = client.post('/api/transactions/import', data=upload, content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == ["Row 1: unknown expense category"]
+
+    upload = {'file': (io.BytesIO(b'date,type,category,amount\n'), 'bank.csv')}
+    response = client.post('/api/transactions/import', data=upload, content_type='multipart/form-data')
+    assert response.get_json() == {'imported': 0}
+
+def test_export_endpoint(client):
+    """Exports stream as attachments; bad arguments fail before the first byte."""
+    assert client.get('/api/export/transactions').status_code == 401
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    assert client.get('/api/export/nope').status_code == 404
+    assert client.get('/api/export/transactions?format=xml').status_code == 400
+    assert client.get('/api/export/budgets?start=July').status_code == 400
+
+    response = client.get('/api/export/transactions?type=expense&start=2025-07-01')
+    assert response.status_code == 200 and response.mimetype == 'text/csv'
+    assert 'transactions.csv' in response.headers['Content-Disposition']
+    assert response.get_data(as_text=True).startswith('id,transaction_date,type,')
+
+    response = client.get('/api/export/category-totals?format=jsonl')
+    assert response.mimetype == 'application/x-ndjson'
+
+def test_login_and_password_metrics(client):
+    """Logins go through the hashing pool, whose queue and latency are reported per operation."""
+    from app import models
+    client.application.config['BCRYPT_ROUNDS'] = 4
+    client.application.config['PASSWORD_HASH_WORKERS'] = 0
+    assert client.get('/api/metrics/passwords').status_code == 401
+
+    with client.application.app_context():
+        models.register_user_model('alice', 'pass123')
+    response = client.post('/login', data={'username': 'alice', 'password': 'pass123'})
+    assert response.status_code == 302 and '/dashboard' in response.headers['Location']
+
+    assert client.get('/api/metrics/passwords').status_code == 403  # admins only
+    assert client.get('/api/admin/expenses').status_code == 403
+
+    with client.application.app_context():
+        users = models.load_json('users.json')
+        users[0]['type'] = 'admin'
+        models.save_json('users.json', users)
+    stats = client.get('/api/metrics/passwords').get_json()
+    assert stats['rounds'] == 4 and stats['operations']['verify']['count'] >= 1
+    assert client.get('/api/admin/expenses?granularity=month').get_json() == []
+    assert client.get('/api/admin/expenses?granularity=hour').status_code == 400
+
+def test_login_caches_the_profile_in_the_server_session(client):
+    """The session lives in DATA_PATH/sessions; pages read the user's profile from it."""
+    from app import models
+    client.application.config['BCRYPT_ROUNDS'] = 4
+    client.application.config['PASSWORD_HASH_WORKERS'] = 0
+    with client.application.app_context():
+        models.register_user_model('alice', 'pass123')
+    client.post('/login', data={'username': 'alice', 'password': 'pass123'})
+
+    with client.session_transaction() as sess:
+        assert sess['user'] == {'id': 1, 'username': 'alice', 'type': 'user'}
+    assert os.listdir(os.path.join(client.application.config['DATA_PATH'], 'sessions'))
+    assert b'alice' in client.get('/dashboard').data
+
+    client.get('/logout')
+    assert os.listdir(os.path.join(client.application.config['DATA_PATH'], 'sessions')) == []
+
+def test_totals_endpoints_answer_conditional_gets(client, monkeypatch):
+    """Polls with a current ETag get a 304 without the totals being recomputed."""
+    from app import models
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+
+    for url in ('/api/expense-totals', '/api/income-totals', '/api/current-monthly-budgets'):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.headers['Cache-Control'] == 'private, no-cache'
+        etag = response.headers['ETag']
+        assert etag.startswith('"') and not etag.startswith('W/')
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    etag = client.get('/api/expense-totals').headers['ETag']
+    calls = []
+    monkeypatch.setattr(models, 'get_expense_totals_by_category', lambda user_id: calls.append(user_id) or [])
+    assert client.get('/api/expense-totals', headers={'If-None-Match': etag}).status_code == 304
+    assert calls == []
+
+    with client.application.app_context():
+        models.add_expense_category(1, 'Food', '#FF0000', 'expense')
+    response = client.get('/api/expense-totals', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag and calls == [1]
+
+def test_pages_are_served_from_the_page_cache_until_a_write(client, monkeypatch):
+    """A repeat view skips the render; writes and flash messages bypass the cached copy."""
+    from app import models, pagecache
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    renders = []
+    dashboard_data = models.get_dashboard_data
+    monkeypatch.setattr(models, 'get_dashboard_data', lambda user_id, fields: renders.append(user_id) or dashboard_data(user_id, fields))
+
+    first = client.get('/dashboard').data
+    assert client.get('/dashboard').data == first and len(renders) == 1
+    assert b'"daily_expenses":' in first and b'/api/dashboard' not in first  # charts ship with the page
+
+    with client.application.app_context():
+        models.add_expense_category(1, 'Food', '#FF0000', 'expense')
+        assert len(pagecache.get_cache()) == 0  # dropped by the write
+    assert b'Food' in client.get('/dashboard').data and len(renders) == 2
+
+    with client.session_transaction() as sess:
+        sess['_flashes'] = [('success', 'Saved!')]
+    assert b'Saved!' in client.get('/dashboard').data and len(renders) == 3
+    assert b'Saved!' not in client.get('/dashboard').data and len(renders) == 3
+
+    # Filters are part of the key; an invalid one flashes, so that page is not kept
+    client.get('/dashboard/expenses?start=nope')
+    assert b'Invalid filter' in client.get('/dashboard/expenses?start=nope').data
+
+def test_dashboard_endpoint_batches_sections(client, monkeypatch):
+    """One response carries the selected dashboard datasets, reading each data file once."""
+    from app import models
+    from app.storage import JsonStore
+    assert client.get('/api/dashboard').status_code == 401
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    data = client.get('/api/dashboard').get_json()
+    assert set(data) == set(models.DASHBOARD_SECTIONS)
+    assert data['summary'] == {'total_income': 0, 'total_expenses': 0, 'remaining_balance': 0}
+    assert len(data['daily_expenses']) == models.DASHBOARD_DAYS
+
+    loads = []
+    load = JsonStore.load
+    monkeypatch.setattr(JsonStore, 'load', lambda self, filename, create=False: loads.append(filename) or load(self, filename, create))
+    response = client.get('/api/dashboard?fields=expense_totals, income_totals,current_budgets')
+    assert set(response.get_json()) == {'expense_totals', 'income_totals', 'current_budgets'}
+    assert len(loads) == len(set(loads))  # no file is loaded twice for one request
+
+    etag = response.headers['ETag']
+    assert client.get('/api/dashboard?fields=expense_totals, income_totals,current_budgets',
+                      headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/dashboard?fields=summary', headers={'If-None-Match': etag}).status_code == 200
+    assert client.get('/api/dashboard?fields=nope').status_code == 400
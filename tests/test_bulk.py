@@ -0,0 +1,39 @@
+import io
+import pytest
+from app import bulk
+
+
+def test_detect_format():
+    assert bulk.detect_format("export.CSV") == "csv"
+    assert bulk.detect_format("export.ndjson") == "jsonl"
+    assert bulk.detect_format("export.txt", "jsonl") == "jsonl"
+    with pytest.raises(ValueError):
+        bulk.detect_format("export.txt")
+
+def test_read_csv_and_json_lines():
+    csv_text = "date,type,category,amount\n2025-07-01,expense,Food,12.5\n"
+    assert list(bulk.read_records(io.StringIO(csv_text), "csv")) == [
+        {"date": "2025-07-01", "type": "expense", "category": "Food", "amount": "12.5"}
+    ]
+    jsonl_text = '{"type": "income", "amount": 5}\n\n{"type": "expense", "amount": 1}\n'
+    assert [r["amount"] for r in bulk.read_records(io.StringIO(jsonl_text), "jsonl")] == [5, 1]
+
+def test_malformed_json_line_is_named():
+    with pytest.raises(ValueError, match="Line 2"):
+        list(bulk.read_records(io.StringIO('{"a": 1}\n{oops\n'), "jsonl"))
+
+def test_uploads_decode_with_byte_order_mark():
+    stream = bulk.text_stream(io.BytesIO("\ufeffamount\n1\n".encode("utf-8")))
+    assert list(bulk.read_records(stream, "csv")) == [{"amount": "1"}]
+
+def test_write_records_csv_and_json_lines():
+    records = [{"id": 1, "amount": 2.5, "extra": "dropped"}, {"id": 2, "amount": None}]
+    assert "".join(bulk.write_records(records, "csv", ("id", "amount"))) == "id,amount\r\n1,2.5\r\n2,\r\n"
+    assert "".join(bulk.write_records(iter(records), "jsonl", ("id",))) == '{"id": 1}\n{"id": 2}\n'
+    assert list(bulk.write_records([], "jsonl", ("id",))) == []
+
+def test_write_records_yields_bounded_chunks(monkeypatch):
+    monkeypatch.setattr(bulk, "CHUNK_SIZE", 100)
+    chunks = list(bulk.write_records(({"n": n} for n in range(1000)), "csv", ("n",)))
+    assert len(chunks) > 10 and max(map(len, chunks)) < 110
+    assert "".join(chunks).split() == ["n"] + [str(n) for n in range(1000)]
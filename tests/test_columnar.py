@@ -0,0 +1,53 @@
+import pytest
+from datetime import date
+from app import columnar
+
+np = pytest.importorskip("numpy")
+
+
+def make_tx(user_id, category_id, t_type, amount, date):
+    return {
+        "user_id": user_id,
+        "category_id": category_id,
+        "type": t_type,
+        "amount": amount,
+        "transaction_date": date
+    }
+
+
+def transactions():
+    return [
+        make_tx(1, 1, "income", 1000, "2025-07-01"),
+        make_tx(1, 6, "expense", "0.1", "2025-07-02 10:00:00"),
+        make_tx(1, 6, "expense", 0.2, "2025-07-02 18:00:00"),
+        make_tx(1, "7", "expense", 50, "2025-08-03 10:00:00"),
+        make_tx(2, 6, "expense", 20, "2025-07-03 09:00:00"),
+    ]
+
+
+def test_category_totals():
+    table = columnar.TransactionTable(transactions())
+    assert table.category_totals("expense", user_id=1) == {6: 0.3, 7: 50}
+    assert table.category_totals("expense") == {6: 20.3, 7: 50}  # all users
+    assert table.category_totals("income", user_id=2) == {}
+
+def test_daily_and_monthly_totals():
+    table = columnar.TransactionTable(transactions())
+    assert table.daily_totals("expense") == [("2025-07-02", 0.3), ("2025-07-03", 20), ("2025-08-03", 50)]
+    assert table.daily_totals("expense", user_id=1, start=date(2025, 7, 3)) == [("2025-08-03", 50)]
+    assert table.monthly_totals("expense") == [("2025-07", 20.3), ("2025-08", 50)]
+    assert table.monthly_totals("expense", end=date(2025, 7, 31)) == [("2025-07", 20.3)]
+
+def test_table_follows_appends_and_invalidation():
+    rows = transactions()
+    table = columnar.transaction_table(rows)
+    assert table.category_totals("income") == {1: 1000}
+
+    for i in range(20):  # grows past the initial capacity
+        rows.append(make_tx(1, 1, "income", 1, "2025-09-01"))
+    assert table.category_totals("income") == {1: 1020}
+
+    rows[0]["amount"] = 500
+    columnar.invalidate(rows)
+    assert table.category_totals("income") == {1: 520}
+    assert columnar.transaction_table(rows) is table
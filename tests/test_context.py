@@ -0,0 +1,43 @@
+from flask import Flask
+from app import context
+
+
+def make_counter():
+    calls = []
+
+    @context.request_cached
+    def load(key, scale=1):
+        calls.append(key)
+        return [key * scale]
+    return load, calls
+
+
+def test_reads_run_once_per_request():
+    load, calls = make_counter()
+    app = Flask(__name__)
+    with app.test_request_context():
+        assert load(2) is load(2)
+        assert load(2, scale=3) == [6]
+        assert calls == [2, 2]
+        assert context.current().hits == 1
+    with app.test_request_context():
+        load(2)
+        assert calls == [2, 2, 2]
+
+def test_writes_drop_and_bypass_memoized_reads():
+    load, calls = make_counter()
+    with Flask(__name__).test_request_context():
+        load(1)
+        with context.writing():
+            load(1)
+            load(1)
+        load(1)
+        load(1)
+        assert calls == [1, 1, 1, 1]
+
+def test_no_memo_outside_a_request():
+    load, calls = make_counter()
+    with Flask(__name__).app_context():
+        load(1)
+        load(1)
+    assert calls == [1, 1] and context.current() is None
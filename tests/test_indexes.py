@@ -0,0 +1,170 @@
+import pytest
+from datetime import datetime
+from app.indexes import BudgetIndex, CategoryRegistry, TransactionIndex, UserIndex, cached_view, canonical_date, drop_view
+
+
+def make_tx(tx_id, user_id, category_id, t_type, amount, date):
+    return {
+        "id": tx_id,
+        "user_id": user_id,
+        "category_id": category_id,
+        "type": t_type,
+        "amount": amount,
+        "description": "",
+        "transaction_date": date
+    }
+
+
+@pytest.fixture
+def transactions():
+    return [
+        make_tx(1, 1, 1, "income", 1000, "2025-07-01"),
+        make_tx(2, 2, 6, "expense", "50", "2025-07-02 10:00:00"),
+        make_tx(3, 1, "6", "expense", 20, "2025-07-03 09:00:00"),
+        make_tx(4, 1, 7, "expense", 30.5, "2025-07-02 12:00:00"),
+    ]
+
+
+def snapshot(index, user_id):
+    return [(t["id"], t["amount"]) for t in index.rows(user_id)]
+
+
+# ---------- QUERIES ----------
+def test_rows_are_normalized_and_date_ordered(transactions):
+    index = TransactionIndex(transactions)
+    rows = index.rows(1)
+    assert [t["id"] for t in rows] == [1, 4, 3]
+    assert all(isinstance(t["category_id"], int) for t in rows)
+    assert index.rows("2")[0]["amount"] == 50.0
+    assert index.rows(99) == []
+
+def test_rows_carry_canonical_parsed_dates(transactions):
+    index = TransactionIndex(transactions)
+    legacy = index.rows(1)[0]
+    assert legacy["transaction_date"] == "2025-07-01 00:00:00"
+    assert legacy["transaction_datetime"] == datetime(2025, 7, 1)
+    assert index.rows(1)[1]["transaction_datetime"] == datetime(2025, 7, 2, 12)
+    assert transactions[0]["transaction_date"] == "2025-07-01"  # the raw row is untouched
+
+def test_canonical_date_keeps_time_of_day():
+    assert canonical_date("2025-07-05", "2025-07-01 09:30:00") == "2025-07-05 09:30:00"
+    assert canonical_date("2025-07-05", "2025-07-01") == "2025-07-05 00:00:00"
+    assert canonical_date("2025-07-05 10:00:00") == "2025-07-05 10:00:00"
+
+def test_rows_by_type_and_category(transactions):
+    index = TransactionIndex(transactions)
+    assert [t["id"] for t in index.rows(1, "expense")] == [4, 3]
+    assert [t["id"] for t in index.rows(1, "expense", 6)] == [3]
+    assert set(index.categories(1, "expense")) == {6, 7}
+
+def test_recent_pages_newest_rows(transactions):
+    index = TransactionIndex(transactions)
+    assert [t["id"] for t in index.recent(1, 2)] == [4, 3]
+    assert [t["id"] for t in index.recent(1, 2, offset=2)] == [1]
+    assert index.recent(1, 2, offset=5) == []
+    assert index.recent(99, 2) == []
+
+def test_walk_resumes_after_keyset_position(transactions):
+    transactions.append(make_tx(5, 1, 7, "expense", 5, "2025-07-02 12:00:00"))
+    index = TransactionIndex(transactions)
+    ids = lambda rows: [t["id"] for t in rows]
+
+    assert ids(index.walk(1)) == [1, 4, 5, 3]
+    assert ids(index.walk(1, descending=True)) == [3, 5, 4, 1]
+    # Same date: the id breaks the tie, so the cursor lands between 4 and 5
+    assert ids(index.walk(1, after=("2025-07-02 12:00:00", 4))) == [5, 3]
+    assert ids(index.walk(1, after=("2025-07-02 12:00:00", 5), descending=True)) == [4, 1]
+    assert ids(index.walk(1, "2025-07-02 00:00:00", "2025-07-03 00:00:00")) == [4, 5]
+    assert ids(index.walk(99)) == []
+
+def test_find_returns_raw_rows(transactions):
+    index = TransactionIndex(transactions)
+    assert index.find(1, "3", "expense") == [transactions[2]]
+    assert index.find(1, 3, "income") == []
+    assert index.find(2, 3) == []
+
+
+# ---------- INCREMENTAL MAINTENANCE ----------
+def test_incremental_updates_match_rebuild(transactions):
+    index = TransactionIndex(transactions)
+
+    new_tx = make_tx(5, 1, 6, "expense", 5, "2025-07-01 08:00:00")
+    transactions.append(new_tx)
+    index.add(new_tx)
+
+    transactions[0].update({"amount": 1200.0, "transaction_date": "2025-07-04"})
+    index.update(transactions[0])
+
+    index.remove(transactions[2])
+    del transactions[2]
+
+    rebuilt = TransactionIndex(transactions)
+    assert snapshot(index, 1) == snapshot(rebuilt, 1) == [(5, 5.0), (4, 30.5), (1, 1200.0)]
+    assert index.categories(1, "expense").keys() == rebuilt.categories(1, "expense").keys()
+
+
+# ---------- CATEGORY REGISTRY ----------
+def test_category_registry_maps_ids_and_types():
+    categories = [
+        {"id": 1, "name": "Salary", "type": "income"},
+        {"id": 2, "name": "Food", "type": "expense"},
+        {"id": 3, "name": "Rent", "type": "expense"},
+    ]
+    registry = CategoryRegistry(categories)
+    assert registry.get("2")["name"] == "Food"
+    assert registry.get(9) is None
+    assert [c["name"] for c in registry.of_type("expense")] == ["Food", "Rent"]
+    assert registry.of_type("transfer") == []
+
+
+# ---------- BUDGET INDEX ----------
+def test_budget_index_lookups_follow_changes():
+    budgets = [
+        {"id": 1, "user_id": 1, "category_id": "6", "month": 7, "year": 2025, "consumed": 0},
+        {"id": 2, "user_id": 2, "category_id": 6, "month": 7, "year": 2025, "consumed": 0},
+        {"id": 3, "user_id": 1, "category_id": 6, "month": 8, "year": 2025, "consumed": 0},
+    ]
+    index = BudgetIndex(budgets)
+    assert index.find("1", 6, "7", 2025) is budgets[0]
+    assert index.find(1, 6, 9, 2025) is None
+    assert index.get("3") is budgets[2]
+    assert [b["id"] for b in index.for_user(1, 8, 2025)] == [3]
+
+    budgets[2]["month"] = 9
+    index.update(budgets[2])
+    assert index.find(1, 6, 8, 2025) is None and index.find(1, 6, 9, 2025) is budgets[2]
+
+    index.remove(budgets[0])
+    assert index.find(1, 6, 7, 2025) is None and index.get(1) is None
+    assert [b["id"] for b in index.for_user(1)] == [3]
+
+
+# ---------- VIEW CACHE ----------
+def test_cached_view_follows_data_identity():
+    data = [make_tx(1, 1, 1, "income", 10, "2025-07-01")]
+    first = cached_view("test", data, TransactionIndex)
+    assert cached_view("test", data, TransactionIndex) is first
+
+    # A different list (e.g. after the file changed on disk) gets a fresh view
+    assert cached_view("test", list(data), TransactionIndex) is not first
+
+def test_dropped_view_is_rebuilt():
+    data = []
+    first = cached_view("test", data, CategoryRegistry)
+    data.append({"id": 1, "name": "Food", "type": "expense"})
+    drop_view("test")
+    rebuilt = cached_view("test", data, CategoryRegistry)
+    assert rebuilt is not first and rebuilt.get(1)["name"] == "Food"
+
+
+# ---------- USER INDEX ----------
+def test_user_index_folds_case_for_taken_names_only():
+    users = [{"id": 1, "username": "Alice"}, {"id": 2, "username": "STRASSE"}]
+    index = UserIndex(users)
+    assert index.get("Alice") is users[0]
+    assert index.get("alice") is None
+    assert index.taken("ALICE") and index.taken("straße")
+    assert not index.taken("bob")
+
+    index.add({"id": 3, "username": "bob"})
+    assert index.get("bob")["id"] == 3 and index.taken("Bob")
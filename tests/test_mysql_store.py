@@ -0,0 +1,77 @@
+import os
+import shutil
+import threading
+import pytest
+from app import models, sql_store
+from app.commands import register_commands
+from app.storage import get_store
+from tests import mysql_shim
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'app', 'data')
+
+
+pytestmark = pytest.mark.parametrize("app_context", ["mysql"], indirect=True)
+
+
+# ---------- POOL ----------
+def test_threads_share_a_bounded_pool(app_context):
+    store = get_store()
+    assert isinstance(store, sql_store.MySqlStore)
+    assert store.connection() is store.connection()
+
+    def worker():
+        store.transactions_for(1)
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for t in threads:
+        t.start()
+        t.join()
+
+    # Finished threads hand their connection back, so 3 threads fit a pool of 2
+    assert store.pool().checked_out == 1
+
+def test_hot_reads_are_prepared_once(food_budget, today):
+    store = get_store()
+    for amount in (10, 20, 30):
+        models.add_transaction(1, food_budget, "expense", amount, "Lunch", today)
+        models.get_user_transactions(1)
+
+    # One PREPARE each for the budget lookup and the user's transactions
+    assert store.pool().prepares == 2
+    assert [t["amount"] for t in models.get_user_transactions(1)] == [10, 20, 30]
+
+
+# ---------- MODEL FUNCTIONS ----------
+def test_budget_guard_and_totals(food_budget, today):
+    models.add_transaction(1, food_budget, "expense", 450, "Rent", today)
+    with pytest.raises(ValueError, match="Insufficient budget"):
+        models.add_transaction(1, food_budget, "expense", 100, "Too much", today)
+
+    assert models.get_total_expenses(1) == 450
+    assert models.get_current_monthly_budget_by_category(1)["total_consumed"] == 450
+
+def test_failed_transaction_rolls_back(app_context):
+    store = get_store()
+    rows = [{"id": 1, "user_id": 1, "name": "Food", "type": "expense"},
+            {"id": 2, "user_id": 1, "name": None, "type": "expense"}]  # violates NOT NULL
+    with pytest.raises(Exception):
+        store.save("categories.json", rows)
+    assert store.load("categories.json") == []
+
+
+# ---------- MIGRATION ----------
+def test_migrate_data_uses_batched_inserts(app_context, tmp_path, monkeypatch):
+    for filename in ('users.json', 'categories.json', 'transactions.json', 'budgets.json'):
+        shutil.copy(os.path.join(DATA_DIR, filename), tmp_path / filename)
+    register_commands(app_context)
+    monkeypatch.setattr(sql_store.MySqlStore, "batch_size", 5)
+
+    batches = []
+    executemany = mysql_shim.Cursor.executemany
+    monkeypatch.setattr(mysql_shim.Cursor, "executemany",
+                        lambda self, op, rows: batches.append(len(rows)) or executemany(self, op, rows))
+
+    result = app_context.test_cli_runner().invoke(args=["migrate-data"])
+    assert "transactions.json: 13 rows imported." in result.output
+    assert max(batches) == 5
+    assert len(get_store().load("transactions.json")) == 13
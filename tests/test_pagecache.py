@@ -0,0 +1,32 @@
+import sys
+from app.pagecache import PageCache
+
+
+def page(n):
+    return "x" * n
+
+
+def test_lru_eviction_keeps_under_the_memory_cap():
+    size = sys.getsizeof(page(100))
+    cache = PageCache(max_bytes=size * 2)
+    cache.put("a", "1", page(100))
+    cache.put("b", "1", page(100))
+    assert cache.get("a") is not None  # "b" is now the least recently used
+    cache.put("c", "2", page(100))
+    assert cache.get("b") is None and cache.get("a") and cache.get("c")
+    assert cache.size <= cache.max_bytes and len(cache) == 2
+
+    cache.put("huge", "2", page(size * 3))  # larger than the whole cache: not kept
+    assert cache.get("huge") is None and len(cache) == 2
+    assert (cache.hits, cache.misses) == (3, 2)
+
+def test_invalidate_drops_a_scope_or_everything():
+    cache = PageCache(max_bytes=10_000)
+    cache.put("a", "1", "one")
+    cache.put("b", "2", "two")
+    cache.put("a", "1", "one again")  # replacing keeps the accounting right
+    cache.invalidate({"1"})
+    assert cache.get("a") is None and cache.get("b") == "two"
+    assert cache.size == sys.getsizeof("two")
+    cache.invalidate({"*"})
+    assert len(cache) == 0 and cache.size == 0
@@ -0,0 +1,43 @@
+import pytest
+from flask import Flask
+from app import passwords
+
+
+@pytest.fixture
+def app_context():
+    app = Flask(__name__)
+    app.config['BCRYPT_ROUNDS'] = 4
+    with app.app_context():
+        yield app
+
+
+def test_hashes_use_configured_rounds(app_context):
+    hashed = passwords.hash_password("secret")
+    assert passwords.rounds_of(hashed) == 4 and not passwords.needs_rehash(hashed)
+    assert passwords.verify_password(hashed, "secret")
+    assert not passwords.verify_password(hashed, "wrong")
+
+    app_context.config['BCRYPT_ROUNDS'] = 5
+    assert passwords.needs_rehash(hashed)
+    assert passwords.rounds_of("not a hash") is None
+
+def test_pool_records_latency_per_operation():
+    pool = passwords.HashPool()
+    hashed = pool.run('hash', passwords._hash, b"secret", 4)
+    assert pool.run('verify', passwords._verify, b"secret", hashed) is True
+
+    stats = pool.stats()
+    assert stats["pending"] == 0 and stats["max_pending"] == 1
+    assert stats["operations"]["hash"]["count"] == 1
+    assert stats["operations"]["verify"]["count"] == 1
+    assert stats["operations"]["verify"]["avg_ms"] >= stats["operations"]["verify"]["avg_queue_ms"] >= 0
+
+def test_worker_processes_hash_off_thread(app_context):
+    app_context.config['PASSWORD_HASH_WORKERS'] = 1
+    pool = passwords.get_pool()
+    try:
+        assert pool.workers == 1
+        assert passwords.verify_password(passwords.hash_password("secret"), "secret")
+        assert passwords.stats()["operations"]["hash"]["count"] == 1
+    finally:
+        pool.shutdown()
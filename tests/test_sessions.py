@@ -0,0 +1,72 @@
+import pytest
+from flask import Flask, session
+from app import sessions
+
+
+def make_app(backend):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.session_interface = sessions.session_interface(backend)
+
+    @app.route('/set/<value>')
+    def set_value(value):
+        sessions.regenerate(session)
+        session['value'] = value
+        return 'ok'
+
+    @app.route('/get')
+    def get_value():
+        return session.get('value', '-')
+
+    @app.route('/clear')
+    def clear():
+        session.clear()
+        return 'ok'
+    return app
+
+
+@pytest.mark.parametrize("backend", ["memory", "files"])
+def test_server_side_session_round_trip(backend, tmp_path):
+    app = make_app(backend)
+    app.config['DATA_PATH'] = str(tmp_path)
+    client = app.test_client()
+
+    client.get('/set/a')
+    first_sid = client.get_cookie('session').value
+    assert client.get('/get').text == 'a'
+    assert len(first_sid) == 43  # only the id travels in the cookie
+
+    client.get('/set/b')  # a new id replaces the old one
+    assert client.get_cookie('session').value != first_sid
+    assert app.session_interface.backend(app).get(first_sid) is None
+    assert client.get('/get').text == 'b'
+
+    client.get('/clear')
+    assert client.get('/get').text == '-'
+
+def test_unknown_or_malformed_ids_start_fresh(tmp_path):
+    app = make_app('files')
+    app.config['DATA_PATH'] = str(tmp_path)
+    client = app.test_client()
+    client.set_cookie('session', '../../etc/passwd')
+    assert client.get('/get').text == '-'
+
+def test_expired_sessions_are_dropped():
+    backend = sessions.MemorySessions()
+    backend.set('sid', {'value': 1}, lifetime=-1)
+    assert backend.get('sid') is None
+    backend.set('sid', {'value': 1}, lifetime=60)
+    assert backend.get('sid') == {'value': 1}
+
+def test_cookie_backend_and_unknown_names():
+    assert sessions.session_interface('cookie') is None
+    with pytest.raises(ValueError):
+        sessions.session_interface('redis')
+
+def test_file_sessions_sweep_expired_files(tmp_path):
+    backend = sessions.FileSessions(str(tmp_path), sweep_interval=0)
+    backend.set('old', {'value': 1}, lifetime=-1)
+    backend.set('new', {'value': 2}, lifetime=60)  # sweeps on set
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['new.json']
+    assert backend.get('new') == {'value': 2}
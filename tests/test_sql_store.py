@@ -0,0 +1,162 @@
+import os
+import json
+import shutil
+import pytest
+from app import models
+from app.commands import register_commands
+from app.storage import get_store
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'app', 'data')
+
+
+pytestmark = pytest.mark.parametrize("app_context", ["sqlite"], indirect=True)
+
+
+# ---------- SCHEMA ----------
+def test_schema_has_lookup_indexes(app_context):
+    store = get_store()
+    assert store.supports_sql
+    names = {r["name"] for r in store.query("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_transactions_user_type_date", "idx_budgets_user_category_period"} <= names
+
+
+# ---------- MODEL FUNCTIONS ----------
+def test_totals_and_reports(food_budget, today):
+    income_cat = models.get_all_income_categories()[0]["id"]
+    models.add_transaction(1, income_cat, "income", 2000, "Job", today)
+    models.add_transaction(1, food_budget, "expense", 100, "Groceries", today)
+    models.add_transaction(1, food_budget, "expense", 50.5, "Lunch", today)
+    models.add_transaction(2, income_cat, "income", 999, "Other user", today)
+
+    assert models.get_total_income(1) == 2000
+    assert models.get_total_expenses(1) == 150.5
+    assert models.get_remaining_balance(1) == 1849.5
+    assert models.get_expense_totals_by_category(1)[0]["total_amount"] == 150.5
+    assert models.get_income_totals_by_category(2)[0]["total_amount"] == 999
+    assert [t["description"] for t in models.get_all_transactions(1)] == ["Lunch", "Groceries", "Job"]
+    assert len(models.get_all_expense_transactions(1)) == 2
+
+    data = models.get_dashboard_data(1, ["summary", "expense_totals"])
+    assert data["summary"]["remaining_balance"] == 1849.5
+    assert data["expense_totals"] == models.get_expense_totals_by_category(1)
+
+    budget = models.get_current_monthly_budget_by_category(1)
+    assert budget["total_consumed"] == 150.5
+    assert models.get_daily_expenses(1) == [{"transaction_date": today, "total_amount": 150.5}]
+    assert models.get_time_series(2, "income", "year", end=today[:4] + "-12-31")[-1]["total"] == 999
+
+def test_list_transactions_keyset_pages(food_budget, today):
+    for amount in (30, 10, 30):
+        models.add_transaction(1, food_budget, "expense", amount, f"Paid {amount}", today)
+
+    rows, cursor = models.list_transactions(1, "expense", sort="amount", limit=2)
+    assert [t["amount"] for t in rows] == [30, 30]
+    rows, cursor = models.list_transactions(1, "expense", sort="amount", cursor=cursor, limit=2)
+    assert [t["amount"] for t in rows] == [10] and cursor is None
+    assert models.list_transactions(1, "expense", end="2000-01-01")[0] == []
+
+def test_import_transactions_in_one_database_transaction(food_budget, today):
+    records = [{"date": today, "type": "expense", "category": "Food", "amount": 200} for _ in range(2)]
+    assert models.import_transactions(1, records) == 2
+    assert models.get_current_monthly_budget_by_category(1)["total_consumed"] == 400
+    assert [t["id"] for t in models.get_user_transactions(1)] == [1, 2]
+
+    with pytest.raises(models.ImportValidationError, match="Insufficient budget"):
+        models.import_transactions(1, records)
+    assert models.get_total_expenses(1) == 400
+
+    # A budget that stops fitting between validation and commit rolls the whole import back
+    with pytest.raises(ValueError, match="Insufficient budget"):
+        get_store().insert_transactions(records[:1], {1: 1000})
+    assert models.get_total_expenses(1) == 400
+
+def test_export_transactions_pages_through_the_table(food_budget, monkeypatch, today):
+    monkeypatch.setattr(models, "EXPORT_CHUNK", 2)
+    for amount in (10, 20, 30):
+        models.add_transaction(1, food_budget, "expense", amount, f"Paid {amount}", today)
+    assert [t["amount"] for t in models.export_transactions(1)] == [10, 20, 30]
+    assert [t["total_amount"] for t in models.export_category_totals(1, start=today)] == [60]
+
+def test_registered_users_get_database_ids(app_context):
+    first = models.register_user_model("alice", "secret")
+    second = models.register_user_model("bob", "secret")
+    assert (first["id"], second["id"]) == (1, 2)
+    assert models.get_user_by_username("bob")["id"] == 2
+    assert models.get_user_by_username("Bob") is None
+    with pytest.raises(ValueError, match="Username already exists"):
+        models.register_user_model("BOB", "secret")
+
+def test_username_lookups_use_an_index(app_context):
+    plan = get_store().query("EXPLAIN QUERY PLAN SELECT * FROM users WHERE username = ? COLLATE NOCASE", ("bob",))
+    assert "idx_users_username" in " ".join(r["detail"] for r in plan)
+
+def test_budget_guard(food_budget, today):
+    models.add_transaction(1, food_budget, "expense", 450, "Rent", today)
+    with pytest.raises(ValueError, match="Insufficient budget"):
+        models.add_transaction(1, food_budget, "expense", 100, "Too much", today)
+    with pytest.raises(ValueError, match="No budget set"):
+        models.add_transaction(1, 999, "expense", 1, "Unbudgeted", today)
+    assert models.get_total_expenses(1) == 450
+
+def test_failed_insert_does_not_consume_the_budget(food_budget, today):
+    with pytest.raises(Exception):
+        models.add_transaction(1, food_budget, "expense", 100, object(), today)  # not storable
+    assert models.get_current_monthly_budget_by_category(1)["total_consumed"] == 0
+    assert models.get_user_transactions(1) == []
+
+def test_update_and_delete(food_budget, today):
+    models.add_transaction(1, food_budget, "expense", 100, "Lunch", today)
+    tx_id = models.get_user_transactions(1)[0]["id"]
+
+    models.update_expense_transaction(tx_id, 1, food_budget, 150, "Updated Lunch", today)
+    assert models.get_user_transactions(1)[0]["amount"] == 150
+
+    models.delete_expense_transaction(tx_id, 1)
+    assert models.get_user_transactions(1) == []
+
+def test_budget_and_category_crud(food_budget):
+    budget = models.get_all_monthly_budgets_by_category(1)[0]["budgets"][0]
+    models.update_budget_entry(budget["id"], food_budget, 1200, 0, budget["month"], budget["year"])
+    assert models.get_all_monthly_budgets_by_category(1)[0]["budgets"][0]["budget_amount"] == 1200
+
+    models.delete_budget_entry(budget["id"])
+    assert models.get_all_monthly_budgets_by_category(1) == []
+
+    models.delete_category(food_budget, 1)
+    assert models.get_all_expense_categories() == []
+
+def test_budget_writes_and_category_reads_skip_full_loads(food_budget, monkeypatch):
+    store = get_store()
+    loaded = []
+    load = store.load
+    monkeypatch.setattr(store, "load", lambda filename, create=False: loaded.append(filename) or load(filename, create))
+
+    assert models.get_all_expense_categories()  # registry built before the patch is reused
+    models.add_budget_entry(1, food_budget, 100, 1, 2030)
+    budget = models.get_all_monthly_budgets_by_category(1)[0]["budgets"][-1]
+    models.update_budget_entry(budget["id"], food_budget, 200, 0, 1, 2030)
+    models.delete_budget_entry(budget["id"])
+    with pytest.raises(ValueError, match="not found"):
+        models.delete_budget_entry(budget["id"])
+
+    assert "budgets.json" not in loaded and "categories.json" not in loaded
+
+
+# ---------- MIGRATION ----------
+def test_migrate_data_command(app_context, tmp_path):
+    for filename in ('users.json', 'categories.json', 'transactions.json', 'budgets.json'):
+        shutil.copy(os.path.join(DATA_DIR, filename), tmp_path / filename)
+    register_commands(app_context)
+
+    result = app_context.test_cli_runner().invoke(args=["migrate-data"])
+    assert "transactions.json: 13 rows imported." in result.output
+
+    with open(tmp_path / 'transactions.json') as f:
+        transactions = json.load(f)
+    user_id = transactions[0]["user_id"]
+    expected = sum(float(t["amount"]) for t in transactions if t["user_id"] == user_id and t["type"] == "income")
+    assert models.get_total_income(user_id) == expected
+    assert models.get_user_by_username("alice")["id"] == 1
+    # Legacy bare dates arrive in canonical form
+    dates = [r["transaction_date"] for r in get_store().query("SELECT transaction_date FROM transactions")]
+    assert dates and all(len(d) == 19 for d in dates)
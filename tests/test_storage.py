@@ -0,0 +1,297 @@
+import os
+import json
+import threading
+import multiprocessing
+import pytest
+from unittest.mock import patch
+from app import storage
+from app.storage import JsonStore, LogStore, get_store
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JsonStore(str(tmp_path))
+
+
+def write_raw(store, filename, data):
+    with open(store.path(filename), 'w') as f:
+        json.dump(data, f)
+
+
+# ---------- CACHING ----------
+def test_repeated_loads_parse_once(store):
+    write_raw(store, "items.json", [{"id": 1}])
+
+    with patch("app.storage.json.load", wraps=json.load) as mock_load:
+        first = store.load("items.json")
+        second = store.load("items.json")
+
+    assert first == [{"id": 1}]
+    assert second is first
+    assert mock_load.call_count == 1
+
+def test_save_updates_cache_without_reparse(store):
+    data = [{"id": 1}]
+    store.save("items.json", data)
+
+    with patch("app.storage.json.load") as mock_load:
+        assert store.load("items.json") is data
+    mock_load.assert_not_called()
+
+def test_external_change_invalidates_cache(store):
+    store.save("items.json", [{"id": 1}])
+    store.load("items.json")
+
+    # Another process rewrites the file with a different size
+    write_raw(store, "items.json", [{"id": 1}, {"id": 2}])
+    assert len(store.load("items.json")) == 2
+
+def test_missing_file(store):
+    assert store.load("missing.json") == []
+    assert not os.path.exists(store.path("missing.json"))
+
+    assert store.load("missing.json", create=True) == []
+    assert os.path.exists(store.path("missing.json"))
+
+def test_failed_save_drops_cache(store):
+    store.save("items.json", [{"id": 1}])
+    with pytest.raises(TypeError):
+        store.save("items.json", [{"id": object()}])
+
+    # The half-written file is re-read instead of serving unsaved data
+    with patch("app.storage.json.load", return_value=[]) as mock_load:
+        store.load("items.json")
+    mock_load.assert_called_once()
+
+def test_failed_save_keeps_previous_file(store):
+    store.save("items.json", [{"id": 1}])
+
+    with patch("app.storage.json.dumps", side_effect=OSError("disk full")), pytest.raises(OSError):
+        store.save("items.json", [{"id": 1}, {"id": 2}])
+
+    with open(store.path("items.json")) as f:
+        assert json.load(f) == [{"id": 1}]
+    assert [name for name in os.listdir(store.data_path) if name.endswith(".tmp")] == []
+
+def test_get_store_is_shared_per_path(tmp_path):
+    assert get_store(tmp_path) is get_store(str(tmp_path))
+    assert get_store(tmp_path) is not get_store(tmp_path / "other")
+
+
+# ---------- FILE FORMATS ----------
+AVAILABLE_FORMATS = [f for f in storage.DATA_FORMATS if storage.resolve_format(f) == f]
+
+
+def test_default_format_is_compact_json(store):
+    store.save("items.json", [{"id": 1, "name": "a"}])
+    with open(store.path("items.json")) as f:
+        assert f.read() == '[{"id":1,"name":"a"}]'
+
+@pytest.mark.parametrize("data_format", AVAILABLE_FORMATS)
+def test_any_format_reads_back_everywhere(tmp_path, data_format):
+    data = [{"id": 1, "amount": 10.5, "description": "Café"}]
+    JsonStore(str(tmp_path), data_format=data_format).save("items.json", data)
+
+    for reader_format in AVAILABLE_FORMATS:
+        assert JsonStore(str(tmp_path), data_format=reader_format).load("items.json") == data
+
+def test_missing_format_library_falls_back_to_json(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "msgpack", None)
+    assert JsonStore(str(tmp_path), data_format="msgpack").data_format == "json"
+    with pytest.raises(ValueError):
+        JsonStore(str(tmp_path), data_format="yaml")
+
+def test_export_writes_indented_json(store, tmp_path):
+    store.save("items.json", [{"id": 1}])
+    store.export("items.json", str(tmp_path / "export.json"))
+    with open(tmp_path / "export.json") as f:
+        assert f.read() == json.dumps([{"id": 1}], indent=4)
+
+
+# ---------- WRITE LOCK ----------
+def _increment(data_path, times):
+    store = LogStore(data_path)
+    for _ in range(times):
+        with store.transaction():
+            counter = store.load("counter.json") or [{"id": 1, "value": 0}]
+            counter[0]["value"] += 1
+            store.save("counter.json", counter)
+
+
+def test_transaction_serializes_processes(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_increment, args=(str(tmp_path), 25)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    assert LogStore(str(tmp_path)).load("counter.json") == [{"id": 1, "value": 100}]
+
+def _allocate(data_path, times, queue):
+    store = JsonStore(data_path)
+    queue.put([store.next_id("items.json") for _ in range(times)])
+
+
+def test_next_id_is_seeded_once_and_never_reused(store):
+    store.save("items.json", [{"id": 3}, {"id": 7}])
+    assert store.next_id("items.json") == 8
+
+    store.save("items.json", [{"id": 3}])  # the newest row is deleted
+    assert JsonStore(store.data_path).next_id("items.json") == 9
+
+def test_next_id_is_unique_across_processes(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    workers = [ctx.Process(target=_allocate, args=(str(tmp_path), 25, queue)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    ids = sorted(i for _ in workers for i in queue.get(timeout=30))
+    for w in workers:
+        w.join()
+
+    assert ids == list(range(1, 101))
+
+def test_data_versions_count_bumps_per_scope(store):
+    assert store.data_version("1") == 0
+    store.bump_versions(["1", "*"])
+    store.bump_versions(["1"])
+    assert (store.data_version("1"), store.data_version("*"), store.data_version("2")) == (2, 1, 0)
+    assert JsonStore(store.data_path).data_version("1") == 2
+    assert store.data_version("*", "1") == (1, 2)
+
+def test_reads_do_not_wait_for_the_write_lock(store):
+    store.save("items.json", [{"id": 1}])
+    locked, release = threading.Event(), threading.Event()
+
+    def writer():
+        with store.transaction():
+            locked.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    locked.wait(5)
+    try:
+        assert JsonStore(store.data_path).load("items.json") == [{"id": 1}]
+    finally:
+        release.set()
+        thread.join()
+
+
+# ---------- LOG STORE ----------
+@pytest.fixture
+def log_store(tmp_path):
+    return LogStore(str(tmp_path), compact_after=5)
+
+
+def add_rows(store, *rows):
+    data = store.load("transactions.json", create=True)
+    data.extend(rows)
+    store.insert("transactions.json", data, list(rows))
+    return data
+
+def fresh_load(store):
+    """Load through a new store, as another process would."""
+    return LogStore(store.data_path).load("transactions.json")
+
+
+def test_log_store_appends_instead_of_rewriting(log_store):
+    add_rows(log_store, {"id": 1, "amount": 10})
+    snapshot_mtime = os.stat(log_store.path("transactions.json")).st_mtime_ns
+
+    data = add_rows(log_store, {"id": 2, "amount": 20})
+    assert os.stat(log_store.path("transactions.json")).st_mtime_ns == snapshot_mtime
+    assert os.path.exists(log_store.log_path("transactions.json"))
+    assert fresh_load(log_store) == data
+
+def test_log_store_replays_updates_and_tombstones(log_store):
+    data = add_rows(log_store, {"id": 1, "amount": 10}, {"id": 2, "amount": 20}, {"id": 3, "amount": 30})
+
+    data[0]["amount"] = 15
+    log_store.update("transactions.json", data, [data[0]])
+    removed = data.pop(1)
+    log_store.delete("transactions.json", data, [removed])
+
+    assert fresh_load(log_store) == [{"id": 1, "amount": 15}, {"id": 3, "amount": 30}]
+
+def test_log_store_compacts_after_threshold(log_store):
+    data = add_rows(log_store, *({"id": i} for i in range(1, 6)))
+
+    assert not os.path.exists(log_store.log_path("transactions.json"))
+    with open(log_store.path("transactions.json")) as f:
+        assert json.load(f) == data
+
+def test_log_store_replay_is_idempotent(log_store):
+    data = add_rows(log_store, {"id": 1, "amount": 10}, {"id": 2, "amount": 20})
+    log_path = log_store.log_path("transactions.json")
+    with open(log_path) as f:
+        journal = f.read()
+
+    # Crash after writing the snapshot but before the journal was dropped
+    log_store.compact()
+    with open(log_path, "w") as f:
+        f.write(journal)
+
+    assert fresh_load(log_store) == data
+
+def test_log_store_ignores_torn_final_line(log_store):
+    data = add_rows(log_store, {"id": 1, "amount": 10})
+    with open(log_store.log_path("transactions.json"), "a") as f:
+        f.write('{"op": "put", "row": {"id": 2')
+
+    reader = LogStore(log_store.data_path)
+    assert reader.load("transactions.json") == data
+
+    # The next write replaces the damaged journal with a clean snapshot
+    data = reader.load("transactions.json")
+    data.append({"id": 3})
+    reader.insert("transactions.json", data, [data[-1]])
+    assert not os.path.exists(reader.log_path("transactions.json"))
+    assert fresh_load(reader) == [{"id": 1, "amount": 10}, {"id": 3}]
+
+def test_log_store_snapshots_collections_with_shared_ids(log_store):
+    # Written by an older version that reused ids after deletes
+    log_store.save("transactions.json", [{"id": 1, "user_id": 1}, {"id": 1, "user_id": 2}])
+    store = LogStore(log_store.data_path, compact_after=5)
+    data = store.load("transactions.json")
+    data[0]["amount"] = 5
+    store.update("transactions.json", data, [data[0]])
+    assert not os.path.exists(store.log_path("transactions.json"))
+    assert fresh_load(store) == [{"id": 1, "user_id": 1, "amount": 5}, {"id": 1, "user_id": 2}]
+
+    data[1]["id"] = 2
+    store.save("transactions.json", data)
+    add_rows(store, {"id": 3})
+    assert os.path.exists(store.log_path("transactions.json"))  # unique again: journaled
+
+def test_log_store_journals_aggregate_deltas(log_store):
+    from app import aggregates
+    rows = [{"user_id": 1, "category_id": 1, "type": "expense", "amount": 10, "transaction_date": "2024-01-02"},
+            {"user_id": 1, "category_id": 2, "type": "expense", "amount": 5, "transaction_date": "2024-01-03"}]
+    table = aggregates.build_aggregates(rows[:1])
+    log_store.save("aggregates.json", table)
+    snapshot_mtime = os.stat(log_store.path("aggregates.json")).st_mtime_ns
+
+    log_store.append("aggregates.json", table, [aggregates.apply_transaction(table, rows[1])])
+    assert os.stat(log_store.path("aggregates.json")).st_mtime_ns == snapshot_mtime
+    assert LogStore(log_store.data_path).load("aggregates.json") == aggregates.build_aggregates(rows)
+
+    entries = [aggregates.apply_transaction(table, rows[1], -1) for _ in range(4)]
+    log_store.append("aggregates.json", table, entries)
+    assert not os.path.exists(log_store.log_path("aggregates.json"))
+    with open(log_store.path("aggregates.json")) as f:
+        assert json.load(f) == table
+
+@pytest.mark.parametrize("data_format", AVAILABLE_FORMATS)
+def test_log_store_journal_in_any_format(tmp_path, data_format):
+    store = LogStore(str(tmp_path), data_format=data_format)
+    data = add_rows(store, {"id": 1, "amount": 10})
+    data = add_rows(store, {"id": 2, "amount": 20})
+    assert LogStore(str(tmp_path)).load("transactions.json") == data
+
+def test_get_store_backend_from_config(tmp_path):
+    assert isinstance(get_store(tmp_path, {}), LogStore)
+    assert type(get_store(tmp_path, {"STORAGE_BACKEND": "json"})) is JsonStore
+    with pytest.raises(ValueError):
+        get_store(tmp_path, {"STORAGE_BACKEND": "nope"})
@@ -0,0 +1,40 @@
+import pytest
+from datetime import date, datetime
+from app import timeseries
+
+DAILY = {"2025-06-30": 5, "2025-07-01": 10, "2025-07-06": 2.5, "2026-01-02": 1}
+
+
+def totals(buckets):
+    return [(b["period"], b["total"]) for b in buckets]
+
+
+def test_buckets_cover_the_range_with_zeros():
+    assert totals(timeseries.series(DAILY, "day", "2025-06-29", date(2025, 7, 2))) == [
+        ("2025-06-29", 0), ("2025-06-30", 5), ("2025-07-01", 10), ("2025-07-02", 0)
+    ]
+    # ISO weeks run Monday to Sunday: 2025-06-30 .. 2025-07-06 is week 27
+    assert totals(timeseries.series(DAILY, "week", "2025-06-30", "2025-07-07")) == [
+        ("2025-W27", 17.5), ("2025-W28", 0)
+    ]
+
+def test_default_range_spans_the_rollup():
+    assert totals(timeseries.series(DAILY, "month"))[:2] == [("2025-06", 5), ("2025-07", 12.5)]
+    assert totals(timeseries.series(DAILY, "year")) == [("2025", 17.5), ("2026", 1)]
+    assert timeseries.series({}, "day") == []
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        timeseries.series(DAILY, "hour")
+    with pytest.raises(ValueError):
+        timeseries.series(DAILY, "day", "last week")
+    assert timeseries.as_date(datetime(2025, 7, 1, 12)) == date(2025, 7, 1)
+
+def test_ranges_are_bounded():
+    with pytest.raises(ValueError):
+        timeseries.series(DAILY, "day", "2025-07-02", "2025-07-01")
+    with pytest.raises(ValueError):
+        timeseries.series(DAILY, "day", "2025-01-01", "9999-12-31")
+    # Coarse buckets step a period at a time, up to the last representable day
+    assert len(timeseries.series(DAILY, "month", "9900-01-01", "9999-12-31")) == 1200
+    assert totals(timeseries.series(DAILY, "week", "2025-12-31", "2026-01-05")) == [("2026-W01", 1), ("2026-W02", 0)]